@@ -0,0 +1,51 @@
+from typing import List, Optional, Tuple
+
+from matching import normalize_ingredients
+
+SCORE_FIELD = "suggestion_score"
+
+
+def suggestion_pipeline(available_ingredients: List[str], max_results: Optional[int],
+                        projection: Optional[dict] = None, min_score: float = 0.2) -> List[dict]:
+    """Aggregation pipeline ranking recipes against a pantry inside MongoDB.
+
+    Scores are computed over the stored ``normalized_ingredients`` with exact
+    name equality, so they agree with ``calculate_recipe_match`` whenever no
+    name is a substring of another ("egg" does not find "eggplant" here).
+    Duplicate ingredients count once per occurrence, as in the Python scorer.
+    Ties are broken by ``_id``, i.e. insertion order.
+    """
+    available = list(dict.fromkeys(normalize_ingredients(available_ingredients)))
+    matched = {"$size": {"$filter": {"input": "$normalized_ingredients", "cond": {"$in": ["$$this", available]}}}}
+    pipeline = [
+        # Multikey index on normalized_ingredients narrows this to candidates
+        {"$match": {"normalized_ingredients": {"$in": available}}},
+        {"$addFields": {SCORE_FIELD: {"$cond": [
+            {"$gt": ["$ingredient_count", 0]},
+            {"$divide": [matched, "$ingredient_count"]},
+            0,
+        ]}}},
+        {"$match": {SCORE_FIELD: {"$gte": min_score}}},
+        {"$sort": {SCORE_FIELD: -1, "_id": 1}},
+    ]
+    if max_results is not None and max_results >= 0:
+        pipeline.append({"$limit": max_results})
+    if projection:
+        # Inclusion projections must name the score to keep it
+        if any(value for key, value in projection.items() if key != "_id"):
+            projection = {**projection, SCORE_FIELD: 1}
+        pipeline.append({"$project": projection})
+    return pipeline
+
+
+async def aggregate_top_matches(collection, available_ingredients: List[str], max_results: Optional[int],
+                                projection: Optional[dict] = None) -> List[Tuple[dict, float]]:
+    """Return ``(recipe, score)`` for the best matches, best first, projected as given"""
+    if max_results == 0:
+        return []
+    pipeline = suggestion_pipeline(available_ingredients, max_results, projection)
+    ranked = [(doc, doc.pop(SCORE_FIELD)) async for doc in collection.aggregate(pipeline)]
+    if max_results is not None and max_results < 0:
+        # Same slice semantics as the in-memory engines
+        ranked = ranked[:max_results]
+    return ranked
@@ -0,0 +1,51 @@
+import json
+from datetime import datetime
+from typing import AsyncIterator, Optional, Tuple
+
+
+async def iter_ndjson_lines(chunks: AsyncIterator[bytes],
+                            max_line_length: Optional[int] = None) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """Yield ``(line_number, line)`` for each non-blank line of a streamed NDJSON body.
+
+    A line longer than ``max_line_length`` bytes is yielded as ``None`` and
+    the rest of it is discarded up to the next newline, so it is never held
+    in memory whole.
+    """
+    buffer = b""
+    line_number = 0
+    skipping = False
+    async for chunk in chunks:
+        if skipping:
+            end = chunk.find(b"\n")
+            if end < 0:
+                continue
+            skipping = False
+            line_number += 1
+            yield line_number, None
+            chunk = chunk[end + 1:]
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            if max_line_length is not None and len(line) > max_line_length:
+                yield line_number, None
+            elif line.strip():
+                yield line_number, line
+        if max_line_length is not None and len(buffer) > max_line_length:
+            buffer = b""
+            skipping = True
+    if skipping:
+        yield line_number + 1, None
+    elif buffer.strip():
+        yield line_number + 1, buffer
+
+
+def _encode_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def ndjson_line(doc: dict) -> bytes:
+    """One document as a newline-terminated JSON line"""
+    return (json.dumps(doc, default=_encode_default, separators=(",", ":")) + "\n").encode()
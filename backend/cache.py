@@ -0,0 +1,367 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from pymongo.errors import PyMongoError
+
+# Cache-status values reported to clients (e.g. in an X-Cache header)
+HIT = "HIT"
+STALE = "STALE"
+MISS = "MISS"
+
+FRESH = "fresh"
+EXPIRED = "expired"
+
+
+class CacheStats:
+    """Counters for one cache; ``hit_ratio`` counts stale hits as hits"""
+
+    def __init__(self):
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.shared_hits = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.stale_hits + self.misses
+        return (self.hits + self.stale_hits) / lookups if lookups else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "shared_hits": self.shared_hits,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "hit_ratio": self.hit_ratio,
+        }
+
+
+class TTLCache:
+    """In-process LRU cache whose entries go stale after ``ttl`` seconds.
+
+    Stale entries are kept for another ``stale_ttl`` seconds so callers can
+    serve them while a refresh runs; after that they count as missing. With
+    ``max_bytes``, least recently used entries are also evicted while the
+    values' total ``sizeof`` exceeds it.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = 300.0,
+                 stale_ttl: float = 0.0, clock: Callable[[], float] = time.time,
+                 max_bytes: Optional[int] = None, sizeof: Callable[[Any], int] = len):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.clock = clock
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.size = 0
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float, int]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, key: Hashable) -> Tuple[Any, str]:
+        """Return ``(value, state)`` where state is fresh, stale or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, EXPIRED
+
+        value, stored_at, _ = entry
+        state = self.state(stored_at)
+        if state == EXPIRED:
+            self.invalidate(key)
+            return None, EXPIRED
+
+        self._entries.move_to_end(key)
+        return value, state
+
+    def state(self, stored_at: float) -> str:
+        if self.ttl is None:
+            return FRESH
+        age = self.clock() - stored_at
+        if age < self.ttl:
+            return FRESH
+        if age < self.ttl + self.stale_ttl:
+            return STALE
+        return EXPIRED
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        value, state = self.lookup(key)
+        return value if state == FRESH else default
+
+    def set(self, key: Hashable, value: Any, stored_at: Optional[float] = None):
+        self.invalidate(key)
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        self._entries[key] = (value, self.clock() if stored_at is None else stored_at, size)
+        self.size += size
+        while len(self._entries) > self.max_entries or (self.max_bytes is not None and self.size > self.max_bytes):
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self.size -= evicted_size
+
+    def invalidate(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[2]
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+
+class MongoCacheTier:
+    """Second cache tier in a Mongo collection, shared by every worker.
+
+    Documents are ``{_id: key, value, stored_at, expires_at}``; a TTL index on
+    ``expires_at`` lets Mongo drop entries once they are past serving. Any
+    database error is treated as a miss so the cache never fails a request.
+    """
+
+    def __init__(self, collection, retention: float):
+        self.collection = collection
+        self.retention = retention
+        self._index_ready = False
+
+    async def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        try:
+            doc = await self.collection.find_one({"_id": key})
+        except PyMongoError:
+            return None
+        if doc is None:
+            return None
+        return doc["value"], doc["stored_at"]
+
+    async def set(self, key: str, value: Any, stored_at: float):
+        try:
+            if not self._index_ready:
+                await self.collection.create_index("expires_at", expireAfterSeconds=0)
+                self._index_ready = True
+            await self.collection.replace_one(
+                {"_id": key},
+                {
+                    "value": value,
+                    "stored_at": stored_at,
+                    "expires_at": datetime.fromtimestamp(stored_at + self.retention, timezone.utc),
+                },
+                upsert=True,
+            )
+        except PyMongoError:
+            pass
+
+    async def delete(self, key: str):
+        try:
+            await self.collection.delete_one({"_id": key})
+        except PyMongoError:
+            pass
+
+
+class ReadThroughCache:
+    """Read-through cache with request coalescing and stale-while-revalidate.
+
+    ``get_or_load`` answers from the local tier, then the optional shared
+    tier, and only then calls ``loader``. Concurrent misses for one key share
+    a single loader call, and a stale hit is served immediately while a
+    background task refreshes it. ``encode``/``decode`` convert values to and
+    from a form the shared tier can store; any object with async ``get``,
+    ``set`` and ``delete`` like ``MongoCacheTier`` can serve as that tier.
+    """
+
+    def __init__(self, local: TTLCache, shared: Optional[MongoCacheTier] = None,
+                 encode: Callable[[Any], Any] = lambda value: value,
+                 decode: Callable[[Any], Any] = lambda value: value):
+        self.local = local
+        self.shared = shared
+        self.encode = encode
+        self.decode = decode
+        self.stats = CacheStats()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Tuple[Any, str]:
+        """Return ``(value, cache_status)`` for ``key``"""
+        value, state = self.local.lookup(key)
+        if state == FRESH:
+            self.stats.hits += 1
+            return value, HIT
+        if state == STALE:
+            self.stats.stale_hits += 1
+            self._refresh_in_background(key, loader)
+            return value, STALE
+
+        if self.shared is not None:
+            shared_entry = await self.shared.get(key)
+            if shared_entry is not None:
+                encoded, stored_at = shared_entry
+                shared_state = self.local.state(stored_at)
+                if shared_state != EXPIRED:
+                    value = self.decode(encoded)
+                    self.local.set(key, value, stored_at)
+                    self.stats.shared_hits += 1
+                    if shared_state == FRESH:
+                        self.stats.hits += 1
+                        return value, HIT
+                    self.stats.stale_hits += 1
+                    self._refresh_in_background(key, loader)
+                    return value, STALE
+
+        self.stats.misses += 1
+        if key in self._inflight:
+            self.stats.coalesced += 1
+        return await self._load(key, loader), MISS
+
+    async def get_many_or_load(self, keys: List[str],
+                               load_many: Callable[[List[str]], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Look up several keys, loading the ones not fresh in the local tier in one call.
+
+        ``load_many`` returns a dict of the keys it could load; keys it leaves
+        out are treated as not found and are not cached.
+        """
+        found = {}
+        missing = []
+        for key in dict.fromkeys(keys):
+            value = self.local.get(key)
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+        self.stats.hits += len(found)
+        self.stats.misses += len(missing)
+
+        if missing:
+            loaded = await load_many(missing)
+            stored_at = self.local.clock()
+            for key, value in loaded.items():
+                self.local.set(key, value, stored_at)
+                if self.shared is not None:
+                    await self.shared.set(key, self.encode(value), stored_at)
+            found.update(loaded)
+        return found
+
+    def clear(self):
+        """Drop every local entry; loads already in flight are not stored"""
+        self.local.clear()
+        self._inflight.clear()
+
+    async def invalidate(self, key: str):
+        """Drop ``key`` from both tiers; a load already in flight is not stored"""
+        self.local.invalidate(key)
+        self._inflight.pop(key, None)
+        if self.shared is not None:
+            await self.shared.delete(key)
+
+    def _start_load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._load_and_store(key, loader))
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._forget_load(key, done))
+        return future
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        # Shield so one cancelled waiter does not cancel the shared upstream call
+        return await asyncio.shield(self._start_load(key, loader))
+
+    def _forget_load(self, key: str, future: asyncio.Future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+
+    async def _load_and_store(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        value = await loader()
+        # An invalidate during the load means the value may predate a write
+        if self._inflight.get(key) is not asyncio.current_task():
+            return value
+        stored_at = self.local.clock()
+        self.local.set(key, value, stored_at)
+        if self.shared is not None:
+            await self.shared.set(key, self.encode(value), stored_at)
+        return value
+
+    def _refresh_in_background(self, key: str, loader: Callable[[], Awaitable[Any]]):
+        if key in self._inflight:
+            return
+        self.stats.refreshes += 1
+        self._start_load(key, loader).add_done_callback(self._record_refresh)
+
+    def _record_refresh(self, future: asyncio.Future):
+        # Keep serving the stale value on failure; the next lookup retries
+        if not future.cancelled() and future.exception() is not None:
+            self.stats.refresh_errors += 1
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an ``If-None-Match`` header value covers ``etag`` (weak comparison)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == bare:
+            return True
+    return False
+
+
+class MaterializedResponse:
+    """A response body rendered once and served as bytes until invalidated.
+
+    ``render`` builds the body; ``get`` returns ``(body, etag, cache_status)``.
+    The ETag hashes the body, so every worker holding the same content hands
+    out the same tag. Concurrent misses share one render, and a body rendered
+    across an ``invalidate`` is returned to its waiters but not kept. ``ttl``
+    bounds how long a body lives when writes elsewhere cannot invalidate it.
+    """
+
+    def __init__(self, render: Callable[[], Awaitable[bytes]], ttl: Optional[float] = None,
+                 clock: Callable[[], float] = time.time):
+        self.render = render
+        self.ttl = ttl
+        self.clock = clock
+        self.stats = CacheStats()
+        self._entry: Optional[Tuple[bytes, str, float]] = None
+        self._generation = 0
+        self._inflight: Optional[asyncio.Future] = None
+
+    async def get(self) -> Tuple[bytes, str, str]:
+        entry = self._entry
+        if entry is not None and (self.ttl is None or self.clock() - entry[2] < self.ttl):
+            self.stats.hits += 1
+            return entry[0], entry[1], HIT
+
+        self.stats.misses += 1
+        if self._inflight is None:
+            future = self._inflight = asyncio.ensure_future(self._render(self._generation))
+            future.add_done_callback(self._clear_inflight)
+        else:
+            self.stats.coalesced += 1
+        # Shield so one cancelled request does not cancel the shared render
+        body, etag = await asyncio.shield(self._inflight)
+        return body, etag, MISS
+
+    def invalidate(self):
+        self._generation += 1
+        self._entry = None
+        # Later callers must not join a render that may predate the write
+        self._inflight = None
+
+    async def _render(self, generation: int) -> Tuple[bytes, str]:
+        stored_at = self.clock()
+        body = await self.render()
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        if generation == self._generation:
+            self._entry = (body, etag, stored_at)
+        return body, etag
+
+    def _clear_inflight(self, future: asyncio.Future):
+        if self._inflight is future:
+            self._inflight = None
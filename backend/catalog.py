@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+
+from matching import IngredientIndex, stored_normalized
+
+logger = logging.getLogger(__name__)
+
+IndexT = TypeVar("IndexT")
+
+
+async def scan_collection(collection, index):
+    """Default loader: feed every document, projected to ``index.PROJECTION``"""
+    cursor = collection.find({}, {"_id": 0, **index.PROJECTION})
+    async for doc in cursor:
+        index.add_document(doc)
+
+
+class LiveIndex(Generic[IndexT]):
+    """An in-memory recipe index loaded lazily and kept in step with writes.
+
+    ``factory`` builds an empty index exposing ``PROJECTION`` (the recipe
+    fields it needs), ``add_document(doc)`` and ``remove(recipe_id)``. The
+    first ``get`` reads the collection once; later writes are applied
+    incrementally through ``upsert``/``remove``. ``load(collection, index)``
+    replaces the single projected scan when an index needs more than one query.
+    ``get(max_age=...)`` refreshes an index read longer ago than that, for when
+    writes from other workers cannot be followed: the current index keeps
+    being served while ``refreshing`` builds its replacement in the
+    background. Writes applied during any load are replayed onto the new
+    index before it is swapped in.
+    """
+
+    def __init__(self, factory: Callable[[], IndexT],
+                 load: Callable[[Any, IndexT], Awaitable[None]] = scan_collection,
+                 clock: Callable[[], float] = time.monotonic):
+        self.factory = factory
+        self.load = load
+        self.clock = clock
+        self.index: Optional[IndexT] = None
+        self.loaded_at = 0.0
+        self.refreshing: Optional[asyncio.Task] = None
+        self._generation = 0
+        self._pending: Optional[List[Tuple[str, Any]]] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self.index is not None
+
+    async def get(self, collection, max_age: Optional[float] = None) -> IndexT:
+        """Return the index, loading it from ``collection`` on first use; refresh it once older than ``max_age``"""
+        if self.index is None:
+            async with self._lock:
+                # Another caller may have loaded it while this one waited for the lock
+                while self.index is None:
+                    await self._build(collection)
+        elif self._expired(max_age) and (self.refreshing is None or self.refreshing.done()):
+            self.refreshing = asyncio.ensure_future(self._refresh(collection))
+        return self.index
+
+    async def _refresh(self, collection):
+        async with self._lock:
+            if self.index is None:
+                return
+            try:
+                await self._build(collection)
+            except Exception as e:
+                # Keep serving the index it was meant to replace; try again after another max_age
+                logger.warning("Could not refresh the %s: %s", self.factory.__name__, e)
+                self.loaded_at = self.clock()
+
+    async def _build(self, collection):
+        """Read the collection into a new index and swap it in, unless ``reset`` was called meanwhile"""
+        generation = self._generation
+        loaded_at = self.clock()
+        index = self.factory()
+        self._pending = []
+        try:
+            await self.load(collection, index)
+            pending = self._pending
+        finally:
+            self._pending = None
+        if generation != self._generation:
+            return
+        for operation, value in pending:
+            if operation == "upsert":
+                index.add_document(value)
+            else:
+                index.remove(value)
+        self.index = index
+        self.loaded_at = loaded_at
+
+    def _expired(self, max_age: Optional[float]) -> bool:
+        return max_age is not None and self.index is not None and self.clock() - self.loaded_at >= max_age
+
+    def upsert(self, doc: dict):
+        """Apply a created or updated recipe document"""
+        if self._pending is not None:
+            self._pending.append(("upsert", doc))
+        if self.index is not None:
+            self.index.add_document(doc)
+
+    def remove(self, recipe_id: str):
+        """Apply a recipe delete"""
+        if self._pending is not None:
+            self._pending.append(("remove", recipe_id))
+        if self.index is not None:
+            self.index.remove(recipe_id)
+
+    def reset(self):
+        """Drop the index so the next ``get`` reloads it"""
+        self._generation += 1
+        self.index = None
+
+
+class RecipeKeys:
+    """Recipe ids by Mongo ``_id``.
+
+    Change-stream delete events only carry the deleted document's ``_id``;
+    this resolves it to the recipe id so the delete can be applied to the
+    other indexes incrementally. An ``_id`` it does not know was already
+    removed here, by this worker's own delete.
+    """
+
+    PROJECTION = {"_id": 1, "id": 1}
+
+    def __init__(self):
+        self._recipe_ids: Dict[Any, str] = {}
+        self._object_ids: Dict[str, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self._recipe_ids)
+
+    def add_document(self, doc: dict):
+        """Record a document's ``_id``; documents read without one are ignored"""
+        object_id = doc.get("_id")
+        if object_id is None:
+            return
+        self.remove(doc["id"])
+        self._recipe_ids[object_id] = doc["id"]
+        self._object_ids[doc["id"]] = object_id
+
+    def remove(self, recipe_id: str):
+        object_id = self._object_ids.pop(recipe_id, None)
+        if object_id is not None:
+            del self._recipe_ids[object_id]
+
+    def recipe_id(self, object_id) -> Optional[str]:
+        return self._recipe_ids.get(object_id)
+
+
+async def load_ingredient_index(collection, index: IngredientIndex, batch_size: int = 1000):
+    """Load an ``IngredientIndex`` from the match data stored on each recipe.
+
+    Only documents written before the current ``DERIVED_SCHEMA_VERSION`` are
+    read a second time for their raw ingredients, which are normalized here.
+    """
+    stale_ids = []
+    cursor = collection.find({}, {"_id": 0, **IngredientIndex.PROJECTION})
+    async for doc in cursor:
+        if stored_normalized(doc) is None:
+            # Hold the recipe's place so ties still rank in collection order
+            index.add(doc["id"], [], [])
+            stale_ids.append(doc["id"])
+        else:
+            index.add_document(doc)
+
+    if stale_ids:
+        logger.warning("%d recipes have outdated match data; run migrations.py to backfill them", len(stale_ids))
+    for start in range(0, len(stale_ids), batch_size):
+        cursor = collection.find({"id": {"$in": stale_ids[start:start + batch_size]}}, {"_id": 0, "id": 1, "ingredients": 1})
+        async for doc in cursor:
+            index.add_document(doc)
@@ -0,0 +1,89 @@
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple, Type
+
+import orjson
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+from cache import CacheStats, TTLCache
+
+# Matches pydantic's JSON output (UTC datetimes end in "Z"); the rest are ORJSONResponse's options
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def dumps(value: Any) -> bytes:
+    """Compact JSON bytes for plain Python data"""
+    return orjson.dumps(value, option=ORJSON_OPTIONS)
+
+
+class JSONResponse(ORJSONResponse):
+    """Default response class: orjson with the same datetime format as the pre-encoded bodies"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def json_array(fragments: Iterable[bytes]) -> bytes:
+    return b"[" + b",".join(fragments) + b"]"
+
+
+def json_object(fields: Iterable[Tuple[str, bytes]]) -> bytes:
+    """Join already encoded values into an object, in the given key order"""
+    return b"{" + b",".join(dumps(name) + b":" + value for name, value in fields) + b"}"
+
+
+class FragmentCache:
+    """Encoded JSON for stored recipes, keyed by model, ``id`` and ``updated_at``.
+
+    Every API write bumps ``updated_at``, so a cached fragment normally never
+    outlives the version it was encoded from. Writes that keep it (imports
+    carrying exported timestamps, migrations, edits made outside the API)
+    are covered by the ``derived_version`` in the key and by ``invalidate``,
+    which moves a recipe on to a new generation of keys. Documents
+    read back from the recipes collection were validated when they were
+    written; one that carries every field of the model is encoded as stored,
+    without building the model again. Anything else goes through
+    ``model_validate`` as before.
+    """
+
+    def __init__(self, max_entries: int = 10000, max_bytes: Optional[int] = None):
+        self.local = TTLCache(max_entries=max_entries, ttl=None, max_bytes=max_bytes)
+        self.stats = CacheStats()
+        self._generations: Dict[Any, int] = {}
+
+    def encode(self, model: Type[BaseModel], doc: dict) -> bytes:
+        key = self.key(model, doc)
+        if key is not None:
+            encoded = self.local.get(key)
+            if encoded is not None:
+                self.stats.hits += 1
+                return encoded
+        self.stats.misses += 1
+
+        fields = model.model_fields
+        if doc.keys() >= fields.keys():
+            encoded = dumps({name: doc[name] for name in fields})
+        else:
+            encoded = model.model_validate(doc).model_dump_json().encode()
+        if key is not None:
+            self.local.set(key, encoded)
+        return encoded
+
+    def key(self, model: Type[BaseModel], doc: dict) -> Optional[Hashable]:
+        updated_at = doc.get("updated_at")
+        if "id" not in doc or updated_at is None:
+            return None
+        recipe_id = doc["id"]
+        return model.__name__, recipe_id, updated_at, doc.get("derived_version"), self._generations.get(recipe_id, 0)
+
+    def invalidate(self, recipe_id: Any):
+        """Stop serving fragments encoded before now; the old entries age out of the LRU"""
+        self._generations[recipe_id] = self._generations.get(recipe_id, 0) + 1
+
+    def clear(self):
+        self.local.clear()
+        self._generations.clear()
+
+
+def sse_event(event: str, data: bytes) -> bytes:
+    """One Server-Sent Events message; ``data`` is compact JSON, so it never spans lines"""
+    return b"event: " + event.encode() + b"\ndata: " + data + b"\n\n"
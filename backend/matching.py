@@ -0,0 +1,415 @@
+import heapq
+import os
+import re
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+# Cached normalizations kept per process (raw ingredient string -> normalized)
+NORMALIZE_CACHE_SIZE = int(os.environ.get("NORMALIZE_CACHE_SIZE", "65536"))
+
+# Version of the match data stored on recipe documents; bump it whenever
+# normalize_ingredient changes so stored fields are recomputed (migrations.py)
+DERIVED_SCHEMA_VERSION = 1
+DERIVED_FIELDS = ("normalized_ingredients", "ingredient_tokens", "ingredient_count", "derived_version")
+
+# Measurements and parenthesised notes never overlap, so one pass removes both
+_MEASUREMENT_OR_PARENS_RE = re.compile(
+    r'\d+(?:\.\d+)?\s*(?:cups?|tbsp|tsp|oz|lbs?|g|kg|ml|l|cloves?|pieces?|slices?)|\([^)]*\)',
+    re.IGNORECASE,
+)
+_MODIFIERS_RE = re.compile(
+    r'\b(?:fresh|dried|chopped|minced|diced|sliced|grated|to taste|optional)\b',
+    re.IGNORECASE,
+)
+_PUNCTUATION_TABLE = str.maketrans('', '', ',.')
+
+# Smart recipe suggestion helper functions
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_ingredient(ingredient: str) -> str:
+    """Normalize ingredient name for better matching.
+
+    Results are memoized; ``normalize_ingredient.cache_info()`` reports the
+    cache hits, misses and current size.
+    """
+    # Remove measurements, parentheses, and common modifiers
+    ingredient = _MEASUREMENT_OR_PARENS_RE.sub('', ingredient)
+    ingredient = _MODIFIERS_RE.sub('', ingredient)
+    ingredient = ingredient.translate(_PUNCTUATION_TABLE)  # Remove commas and periods
+    ingredient = ingredient.strip().lower()
+    return ingredient
+
+def normalize_ingredients(ingredients: List[str]) -> List[str]:
+    """Normalize a recipe's ingredient list, as stored on the document"""
+    return [normalize_ingredient(ing) for ing in ingredients]
+
+def pantry_key(available_ingredients: List[str]) -> Tuple[str, ...]:
+    """Canonical form of a pantry: matching ignores order, casing and repeats"""
+    return tuple(sorted(set(normalize_ingredients(available_ingredients))))
+
+def derived_fields(ingredients: List[str]) -> dict:
+    """Match data stored on a recipe document alongside its raw ingredients"""
+    normalized = normalize_ingredients(ingredients)
+    return {
+        "normalized_ingredients": normalized,
+        "ingredient_tokens": sorted({token for name in normalized for token in name.split()}),
+        "ingredient_count": len(normalized),
+        "derived_version": DERIVED_SCHEMA_VERSION,
+    }
+
+def stored_normalized(doc: dict) -> Optional[List[str]]:
+    """The document's normalized ingredients, if stored by the current normalizer"""
+    if doc.get("derived_version") != DERIVED_SCHEMA_VERSION:
+        return None
+    return doc.get("normalized_ingredients")
+
+class IngredientMatcher:
+    """Match recipe ingredients against one request's available ingredients.
+
+    A recipe ingredient matches when it contains an available ingredient or
+    is contained in one. Both directions are answered in a single pass over
+    the recipe ingredient: an Aho-Corasick automaton over the available names
+    finds any of them inside it, and a generalized suffix automaton over the
+    same names checks whether it is a substring of one of them.
+    """
+
+    def __init__(self, normalized_available: Iterable[str]):
+        names = set(normalized_available)
+        self._has_available = bool(names)
+        self._has_empty = "" in names
+        self._memo: Dict[str, bool] = {}
+
+        # Aho-Corasick trie: goto transitions, failure links and output flags
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[bool] = [False]
+        # Generalized suffix automaton: transitions, suffix links and lengths
+        self._next: List[Dict[str, int]] = [{}]
+        self._link: List[int] = [-1]
+        self._len: List[int] = [0]
+
+        for name in names:
+            if name:
+                self._add_pattern(name)
+                last = 0
+                for char in name:
+                    last = self._extend(last, char)
+        self._build_failure_links()
+
+    def matches(self, recipe_ing: str) -> bool:
+        """True if ``recipe_ing`` contains, or is contained in, an available name"""
+        result = self._memo.get(recipe_ing)
+        if result is None:
+            result = self._memo[recipe_ing] = self._scan(recipe_ing)
+        return result
+
+    def _scan(self, recipe_ing: str) -> bool:
+        if not self._has_available:
+            return False
+        if self._has_empty:
+            return True
+
+        goto, fail, output, transitions = self._goto, self._fail, self._output, self._next
+        node = 0
+        substate = 0
+        for char in recipe_ing:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node]:
+                return True
+            if substate is not None:
+                substate = transitions[substate].get(char)
+        return substate is not None
+
+    def _add_pattern(self, name: str):
+        node = 0
+        for char in name:
+            child = self._goto[node].get(char)
+            if child is None:
+                child = len(self._goto)
+                self._goto[node][char] = child
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(False)
+            node = child
+        self._output[node] = True
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._output[child] = self._output[child] or self._output[self._fail[child]]
+                queue.append(child)
+
+    def _new_state(self, length: int, transitions: Dict[str, int], link: int) -> int:
+        self._next.append(transitions)
+        self._link.append(link)
+        self._len.append(length)
+        return len(self._len) - 1
+
+    def _clone(self, p: int, q: int, char: str) -> int:
+        clone = self._new_state(self._len[p] + 1, dict(self._next[q]), self._link[q])
+        while p != -1 and self._next[p].get(char) == q:
+            self._next[p][char] = clone
+            p = self._link[p]
+        self._link[q] = clone
+        return clone
+
+    def _extend(self, last: int, char: str) -> int:
+        transitions, link, length = self._next, self._link, self._len
+
+        existing = transitions[last].get(char)
+        if existing is not None:
+            # Substring already known from an earlier name
+            if length[last] + 1 == length[existing]:
+                return existing
+            return self._clone(last, existing, char)
+
+        cur = self._new_state(length[last] + 1, {}, 0)
+        p = last
+        while p != -1 and char not in transitions[p]:
+            transitions[p][char] = cur
+            p = link[p]
+        if p != -1:
+            q = transitions[p][char]
+            if length[p] + 1 == length[q]:
+                link[cur] = q
+            else:
+                link[cur] = self._clone(p, q, char)
+        return cur
+
+
+def calculate_recipe_match(recipe_ingredients: List[str], available_ingredients: List[str],
+                           normalized_recipe_ingredients: Optional[List[str]] = None,
+                           matcher: Optional[IngredientMatcher] = None) -> tuple:
+    """Calculate how well a recipe matches available ingredients.
+
+    ``matcher`` may be passed in when the same available ingredients are
+    matched against many recipes.
+    """
+    if matcher is None:
+        matcher = IngredientMatcher(normalize_ingredients(available_ingredients))
+    if normalized_recipe_ingredients is None or len(normalized_recipe_ingredients) != len(recipe_ingredients):
+        normalized_recipe_ingredients = normalize_ingredients(recipe_ingredients)
+
+    matching_ingredients = []
+    missing_ingredients = []
+
+    for recipe_ing, original_recipe_ing in zip(normalized_recipe_ingredients, recipe_ingredients):
+        # Available ingredient contains recipe ingredient or vice versa
+        if matcher.matches(recipe_ing):
+            matching_ingredients.append(original_recipe_ing)
+        else:
+            missing_ingredients.append(original_recipe_ing)
+
+    # Calculate match score (percentage of ingredients available)
+    if len(recipe_ingredients) == 0:
+        match_score = 0.0
+    else:
+        match_score = len(matching_ingredients) / len(recipe_ingredients)
+
+    return match_score, matching_ingredients, missing_ingredients
+
+
+class IngredientIndex:
+    """In-memory inverted index from normalized ingredient names to recipe ids.
+
+    Matching is bidirectional substring containment, so the index is keyed on
+    the full normalized ingredient rather than on individual words: a lookup
+    scans the (small) ingredient vocabulary instead of every recipe, and only
+    recipes sharing at least one matching ingredient are returned.
+
+    ``view()`` hands scoring threads a read-only index sharing these
+    containers. Writes are copy-on-write while a view is out: the next write
+    copies the dicts, and each posting set is copied before its first change,
+    so a running job never sees the index change under it.
+    """
+
+    # Only the stored match data; documents written before the current
+    # DERIVED_SCHEMA_VERSION need their raw ``ingredients`` as well
+    PROJECTION = {"id": 1, "normalized_ingredients": 1, "derived_version": 1}
+
+    def __init__(self):
+        self._postings: Dict[str, Set[str]] = {}
+        self._normalized: Dict[str, List[str]] = {}
+        self._order: Dict[str, int] = {}
+        self._next_order = 0
+        # Bumped on every change so derived structures know when to rebuild
+        self.version = 0
+        # The view handed out for this version, and whether the containers are shared with one
+        self._view: Optional["IngredientIndex"] = None
+        self._shared = False
+        # Posting sets created or copied since the containers were last shared
+        self._owned: Set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._normalized)
+
+    def __contains__(self, recipe_id: str) -> bool:
+        return recipe_id in self._normalized
+
+    def add(self, recipe_id: str, ingredients: List[str], normalized: Optional[List[str]] = None):
+        """Index a recipe, replacing any previous entry for the same id.
+
+        ``normalized`` is the list stored on the document at write time; it is
+        only recomputed when missing or out of step with ``ingredients``.
+        """
+        self._detach()
+        if recipe_id in self._normalized:
+            self._unlink(recipe_id)
+        else:
+            # Keep first-seen order so ties rank the same way as a collection scan
+            self._order[recipe_id] = self._next_order
+            self._next_order += 1
+
+        if normalized is None or len(normalized) != len(ingredients):
+            normalized = normalize_ingredients(ingredients)
+        self._normalized[recipe_id] = normalized
+        for name in set(normalized):
+            self._own_postings(name).add(recipe_id)
+        self.version += 1
+
+    def add_document(self, doc: dict):
+        """Index a recipe document; a no-op when its normalized ingredients are unchanged"""
+        normalized = stored_normalized(doc)
+        if normalized is None:
+            normalized = normalize_ingredients(doc.get("ingredients") or [])
+        if self._normalized.get(doc["id"]) == normalized:
+            return
+        self.add(doc["id"], normalized, normalized)
+
+    def remove(self, recipe_id: str):
+        """Drop a recipe from the index; unknown ids are ignored"""
+        if recipe_id not in self._normalized:
+            return
+        self._detach()
+        self._unlink(recipe_id)
+        del self._normalized[recipe_id]
+        del self._order[recipe_id]
+        self.version += 1
+
+    def view(self) -> "IngredientIndex":
+        """Read-only index as it is now, safe to score from other threads while this one changes"""
+        if self._view is None:
+            view = IngredientIndex()
+            view._postings, view._normalized, view._order = self._postings, self._normalized, self._order
+            view._next_order = self._next_order
+            view.version = self.version
+            view._shared = self._shared = True
+            self._view = view
+        return self._view
+
+    def recipe_ids(self) -> List[str]:
+        """All indexed recipe ids, in index order"""
+        return list(self._order)
+
+    def normalized(self, recipe_id: str) -> List[str]:
+        return self._normalized[recipe_id]
+
+    def order(self, recipe_id: str) -> int:
+        return self._order[recipe_id]
+
+    def candidates(self, matcher: IngredientMatcher) -> List[str]:
+        """Return ids of recipes sharing at least one ingredient, in index order"""
+        recipe_ids: Set[str] = set()
+        for name, postings in self._postings.items():
+            if matcher.matches(name):
+                recipe_ids |= postings
+
+        return sorted(recipe_ids, key=self._order.__getitem__)
+
+    def _detach(self):
+        """Stop sharing the containers with a handed-out view before a write"""
+        self._view = None
+        if self._shared:
+            self._postings = dict(self._postings)
+            self._normalized = dict(self._normalized)
+            self._order = dict(self._order)
+            self._owned = set()
+            self._shared = False
+
+    def _own_postings(self, name: str) -> Set[str]:
+        """The posting set for ``name``, copied first if a view may still be reading it"""
+        postings = self._postings.get(name)
+        if name not in self._owned:
+            postings = self._postings[name] = set(postings or ())
+            self._owned.add(name)
+        return postings
+
+    def _unlink(self, recipe_id: str):
+        for name in set(self._normalized[recipe_id]):
+            if name not in self._postings:
+                continue
+            postings = self._own_postings(name)
+            postings.discard(recipe_id)
+            if not postings:
+                del self._postings[name]
+                self._owned.discard(name)
+
+
+def top_matches(index: IngredientIndex, available_ingredients: List[str],
+                max_results: Optional[int], min_score: float = 0.2) -> List[Tuple[str, float]]:
+    """Rank indexed recipes against available ingredients, best first.
+
+    Keeps a bounded min-heap of the best ``max_results`` recipes and stops
+    scoring a recipe as soon as it can no longer beat the current worst entry.
+    Ties keep index order, the same as a stable sort over a collection scan.
+    """
+    matcher = IngredientMatcher(normalize_ingredients(available_ingredients))
+    bounded = max_results is not None and max_results >= 0
+    if bounded and max_results == 0:
+        return []
+
+    # Heap entries are (score, -order, recipe_id) so heap[0] is the entry to evict
+    heap: List[Tuple[float, int, str]] = []
+    for recipe_id in index.candidates(matcher):
+        normalized = index.normalized(recipe_id)
+        total = len(normalized)
+        if total == 0:
+            continue
+
+        floor = heap[0][0] if bounded and len(heap) == max_results else None
+        matched = 0
+        remaining = total
+        for recipe_ing in normalized:
+            remaining -= 1
+            if matcher.matches(recipe_ing):
+                matched += 1
+            best_possible = (matched + remaining) / total
+            if best_possible < min_score or (floor is not None and best_possible <= floor):
+                break
+        else:
+            match_score = matched / total
+            entry = (match_score, -index.order(recipe_id), recipe_id)
+            if floor is None:
+                heapq.heappush(heap, entry)
+            else:
+                heapq.heapreplace(heap, entry)
+
+    ranked = sorted(heap, reverse=True)
+    if not bounded:
+        ranked = ranked[:max_results]
+    return [(recipe_id, match_score) for match_score, _, recipe_id in ranked]
+
+
+# Compact, picklable copy of an index: recipe ids and their normalized ingredients
+CatalogSnapshot = Tuple[List[str], List[List[str]]]
+
+
+def snapshot_index(index: IngredientIndex) -> CatalogSnapshot:
+    recipe_ids = index.recipe_ids()
+    return recipe_ids, [index.normalized(recipe_id) for recipe_id in recipe_ids]
+
+
+def index_from_snapshot(snapshot: CatalogSnapshot) -> IngredientIndex:
+    index = IngredientIndex()
+    for recipe_id, normalized in zip(*snapshot):
+        index.add(recipe_id, normalized, normalized)
+    return index
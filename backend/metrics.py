@@ -0,0 +1,300 @@
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pymongo import monitoring
+
+from profiling import StackSampler, profile_body
+
+# Latency buckets in seconds, from sub-millisecond cache hits to slow upstream calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Mongo commands issued by one request
+CALL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Sequence[Tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    """Base for Prometheus-style metrics keyed by label values.
+
+    Updates take a lock because Mongo command events arrive on driver threads.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterable[Tuple[str, List[Tuple[str, str]], float]]:
+        for key, value in self._values.items():
+            yield self.name, list(zip(self.labelnames, key)), value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            samples = list(self.samples())
+        for name, labels, value in samples:
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, then sum and count
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][position] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        for key, (bucket_counts, total, count) in self._values.items():
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket", labels + [("le", _format_value(bound))], cumulative
+            yield f"{self.name}_bucket", labels + [("le", "+Inf")], count
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, count
+
+
+class MetricsRegistry:
+    """Metrics rendered together in the Prometheus text exposition format.
+
+    ``collectors`` are called at scrape time and return metrics built from
+    state kept elsewhere, such as cache statistics.
+    """
+
+    def __init__(self):
+        self.metrics: List[Metric] = []
+        self.collectors: List[Callable[[], Iterable[Metric]]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterable[Metric]]):
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collector in self.collectors:
+            for metric in collector():
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class RequestStats:
+    """Mongo work attributed to the request being handled"""
+
+    __slots__ = ("mongo_calls", "mongo_seconds")
+
+    def __init__(self):
+        self.mongo_calls = 0
+        self.mongo_seconds = 0.0
+
+
+# Motor runs driver calls with a copy of the caller's context, so command
+# events can find the request that issued them
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+_request_stats_lock = threading.Lock()
+
+
+class RequestMetrics:
+    """HTTP, Mongo and YouTube metrics for the API process"""
+
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+        self.requests = registry.register(Counter(
+            "recipecore_http_requests_total", "HTTP requests by route and status", ("method", "route", "status")))
+        self.latency = registry.register(Histogram(
+            "recipecore_http_request_duration_seconds", "HTTP request latency by route", ("method", "route")))
+        self.in_flight = registry.register(Gauge(
+            "recipecore_http_requests_in_flight", "HTTP requests being handled"))
+        self.request_mongo_calls = registry.register(Histogram(
+            "recipecore_http_request_mongo_calls", "Mongo commands issued per HTTP request", ("route",),
+            buckets=CALL_COUNT_BUCKETS))
+        self.request_mongo_seconds = registry.register(Histogram(
+            "recipecore_http_request_mongo_seconds", "Time spent in Mongo commands per HTTP request", ("route",)))
+        self.mongo_commands = registry.register(Counter(
+            "recipecore_mongo_commands_total", "Mongo commands by name and outcome", ("command", "outcome")))
+        self.mongo_latency = registry.register(Histogram(
+            "recipecore_mongo_command_duration_seconds", "Mongo command latency by name", ("command",)))
+        self.youtube_latency = registry.register(Histogram(
+            "recipecore_youtube_request_duration_seconds", "YouTube Data API latency by resource and status",
+            ("resource", "status")))
+
+    def observe_mongo(self, command: str, seconds: float, outcome: str):
+        self.mongo_commands.inc(command=command, outcome=outcome)
+        self.mongo_latency.observe(seconds, command=command)
+        stats = current_request.get()
+        if stats is not None:
+            with _request_stats_lock:
+                stats.mongo_calls += 1
+                stats.mongo_seconds += seconds
+
+    def observe_youtube(self, path: str, seconds: float, status: str):
+        self.youtube_latency.observe(seconds, resource=path.strip("/"), status=status)
+
+    def mongo_listener(self) -> monitoring.CommandListener:
+        return MongoCommandMetrics(self)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Pymongo command listener feeding ``RequestMetrics``"""
+
+    def __init__(self, metrics: RequestMetrics):
+        self.metrics = metrics
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self.metrics.observe_mongo(event.command_name, event.duration_micros / 1e6, "ok")
+
+    def failed(self, event):
+        self.metrics.observe_mongo(event.command_name, event.duration_micros / 1e6, "error")
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request by its route template.
+
+    Requests are labelled with the matched path template (``/api/recipes/{recipe_id}``),
+    never the raw path, so ids do not create new series. When
+    ``profile_interval`` is set, a request sent with an ``X-Profile`` header is
+    run under a stack sampler and answered with the profile instead of its body.
+    """
+
+    def __init__(self, app, metrics: RequestMetrics, profile_interval: Optional[float] = None):
+        self.app = app
+        self.metrics = metrics
+        self.profile_interval = profile_interval
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if self.profile_interval is not None and any(name == b"x-profile" for name, _ in scope["headers"]):
+            await self._profile(scope, receive, send)
+            return
+
+        status = 500
+        stats = RequestStats()
+        token = current_request.set(stats)
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.metrics.in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.metrics.in_flight.dec()
+            current_request.reset(token)
+            route = self._route(scope)
+            self.metrics.requests.inc(method=scope["method"], route=route, status=status)
+            self.metrics.latency.observe(elapsed, method=scope["method"], route=route)
+            self.metrics.request_mongo_calls.observe(stats.mongo_calls, route=route)
+            self.metrics.request_mongo_seconds.observe(stats.mongo_seconds, route=route)
+
+    async def _profile(self, scope, receive, send):
+        status = 500
+        stats = RequestStats()
+        token = current_request.set(stats)
+
+        async def discard_response(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        sampler = StackSampler(threading.get_ident(), self.profile_interval)
+        sampler.start()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, discard_response)
+        finally:
+            elapsed = time.perf_counter() - started
+            sampler.stop()
+            current_request.reset(token)
+
+        body = profile_body(sampler, elapsed, status, stats.mongo_calls, stats.mongo_seconds)
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    @staticmethod
+    def _route(scope) -> str:
+        route = scope.get("route")
+        return getattr(route, "path", None) or "unmatched"
@@ -0,0 +1,69 @@
+"""Backfill the derived match data stored on recipe documents.
+
+    cd backend && python migrations.py [--batch-size 1000] [--dry-run]
+
+Recomputes ``normalized_ingredients``, ``ingredient_tokens``,
+``ingredient_count`` and ``derived_version`` for every recipe not written by
+the current ``DERIVED_SCHEMA_VERSION`` of the normalizer. Safe to re-run and
+to run against a live database: a recipe rewritten by the API meanwhile
+already carries current data and is left alone.
+"""
+
+import argparse
+import asyncio
+import os
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+from matching import DERIVED_SCHEMA_VERSION, derived_fields
+
+OUTDATED = {"derived_version": {"$ne": DERIVED_SCHEMA_VERSION}}
+
+
+async def backfill_derived_fields(collection, batch_size: int = 1000) -> int:
+    """Bring every outdated recipe up to the current derived schema; return the count updated"""
+    updated = 0
+    batch = []
+
+    async def flush():
+        nonlocal updated
+        result = await collection.bulk_write(batch, ordered=False)
+        updated += result.modified_count
+        batch.clear()
+
+    cursor = collection.find(OUTDATED, {"_id": 1, "ingredients": 1, "derived_version": 1}).batch_size(batch_size)
+    async for doc in cursor:
+        batch.append(UpdateOne(
+            # Skip the recipe if the API rewrote it since it was read
+            {"_id": doc["_id"], "derived_version": doc.get("derived_version")},
+            {"$set": derived_fields(doc.get("ingredients") or [])},
+        ))
+        if len(batch) >= batch_size:
+            await flush()
+    if batch:
+        await flush()
+    return updated
+
+
+async def main(args):
+    load_dotenv()
+    client = AsyncIOMotorClient(os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    collection = client[os.environ.get("DB_NAME", "recipecore")].recipes
+    try:
+        if args.dry_run:
+            outdated = await collection.count_documents(OUTDATED)
+            print(f"{outdated} recipes need derived schema version {DERIVED_SCHEMA_VERSION}")
+        else:
+            updated = await backfill_derived_fields(collection, args.batch_size)
+            print(f"Updated {updated} recipes to derived schema version {DERIVED_SCHEMA_VERSION}")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true", help="only count the recipes that need updating")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,34 @@
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+
+# Newest first, with the id as a tie-breaker so every position is unique
+RECIPE_LIST_SORT = [("created_at", -1), ("id", -1)]
+
+
+def encode_cursor(recipe: dict) -> str:
+    """Opaque token pointing just past ``recipe`` in the newest-first listing"""
+    payload = json.dumps({"c": recipe["created_at"].isoformat(), "i": recipe["id"]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Inverse of ``encode_cursor``; raises ValueError for a malformed token"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload["c"]), str(payload["i"])
+    except (ValueError, TypeError, KeyError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def after_cursor(cursor: str) -> dict:
+    """Mongo filter for recipes after ``cursor`` in ``RECIPE_LIST_SORT`` order"""
+    created_at, recipe_id = decode_cursor(cursor)
+    return {
+        "$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "id": {"$lt": recipe_id}},
+        ]
+    }
@@ -0,0 +1,142 @@
+import asyncio
+from typing import Dict, List, Optional, Set, Tuple
+
+from matching import IngredientMatcher, calculate_recipe_match, normalize_ingredients, stored_normalized
+
+# (pantry_id, match_score, matching_ingredients, missing_ingredients)
+PantryMatch = Tuple[str, float, List[str], List[str]]
+
+
+class PantryIndex:
+    """Saved pantries, indexed by normalized ingredient name.
+
+    This is ``IngredientIndex`` turned around: one recipe is scored against
+    many pantries. Matching is symmetric, so a matcher built over the
+    recipe's ingredients scans the pantry vocabulary and only pantries
+    sharing at least one matching ingredient are scored, each with the
+    matcher built when the pantry was added.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Set[str]] = {}
+        self._pantries: Dict[str, Tuple[List[str], Set[str], IngredientMatcher]] = {}
+
+    def __len__(self) -> int:
+        return len(self._pantries)
+
+    def __contains__(self, pantry_id: str) -> bool:
+        return pantry_id in self._pantries
+
+    def add(self, pantry_id: str, ingredients: List[str]):
+        """Index a pantry, replacing any previous entry for the same id"""
+        self.remove(pantry_id)
+        names = set(normalize_ingredients(ingredients))
+        self._pantries[pantry_id] = (ingredients, names, IngredientMatcher(names))
+        for name in names:
+            self._postings.setdefault(name, set()).add(pantry_id)
+
+    def remove(self, pantry_id: str):
+        """Drop a pantry from the index; unknown ids are ignored"""
+        entry = self._pantries.pop(pantry_id, None)
+        if entry is None:
+            return
+        for name in entry[1]:
+            postings = self._postings[name]
+            postings.discard(pantry_id)
+            if not postings:
+                del self._postings[name]
+
+    def candidates(self, normalized_recipe: List[str]) -> Set[str]:
+        """Ids of pantries holding an ingredient that matches one of the recipe's"""
+        matcher = IngredientMatcher(normalized_recipe)
+        pantry_ids: Set[str] = set()
+        for name, postings in self._postings.items():
+            if matcher.matches(name):
+                pantry_ids |= postings
+        return pantry_ids
+
+    def match(self, recipe: dict, min_score: float = 0.2) -> List[PantryMatch]:
+        """Score a recipe document against the pantries it could match, by pantry id"""
+        ingredients = recipe.get("ingredients") or []
+        normalized = stored_normalized(recipe)
+        if normalized is None or len(normalized) != len(ingredients):
+            normalized = normalize_ingredients(ingredients)
+        if not ingredients:
+            return []
+
+        matches = []
+        for pantry_id in sorted(self.candidates(normalized)):
+            available, _, matcher = self._pantries[pantry_id]
+            match_score, matching, missing = calculate_recipe_match(ingredients, available, normalized, matcher)
+            if match_score >= min_score:
+                matches.append((pantry_id, match_score, matching, missing))
+        return matches
+
+
+class PantryNotifier:
+    """Pushes recipe matches to live subscribers of saved pantries.
+
+    Only pantries with a subscriber in this process are indexed, so a recipe
+    write does no scoring when nobody is listening. Every subscriber has a
+    bounded queue of ``(recipe, match)`` items; when a slow client lets it
+    fill up the oldest item is dropped rather than holding up the writer.
+    ``None`` on a queue means the pantry was deleted and the stream ends.
+    """
+
+    def __init__(self, queue_size: int = 100, min_score: float = 0.2):
+        self.index = PantryIndex()
+        self.queue_size = queue_size
+        self.min_score = min_score
+        self.delivered = 0
+        self.dropped = 0
+        self._subscribers: Dict[str, List[asyncio.Queue]] = {}
+
+    @property
+    def subscribers(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def subscribe(self, pantry: dict) -> asyncio.Queue:
+        """Start watching a pantry document; matches arrive on the returned queue"""
+        queues = self._subscribers.setdefault(pantry["id"], [])
+        if not queues:
+            self.index.add(pantry["id"], pantry["ingredients"])
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        queues.append(queue)
+        return queue
+
+    def unsubscribe(self, pantry_id: str, queue: asyncio.Queue):
+        queues = self._subscribers.get(pantry_id)
+        if queues is None or queue not in queues:
+            return
+        queues.remove(queue)
+        if not queues:
+            del self._subscribers[pantry_id]
+            self.index.remove(pantry_id)
+
+    def update(self, pantry: dict):
+        """Apply an edited pantry to its live subscriptions"""
+        if pantry["id"] in self._subscribers:
+            self.index.add(pantry["id"], pantry["ingredients"])
+
+    def close(self, pantry_id: str):
+        """End every stream of a deleted pantry"""
+        for queue in self._subscribers.pop(pantry_id, []):
+            self._put(queue, None)
+        self.index.remove(pantry_id)
+
+    def recipe_written(self, recipe: dict) -> int:
+        """Score a created or updated recipe against the watched pantries; return how many matched"""
+        if not self._subscribers:
+            return 0
+        matches = self.index.match(recipe, self.min_score)
+        for match in matches:
+            for queue in self._subscribers.get(match[0], ()):
+                self._put(queue, (recipe, match))
+                self.delivered += 1
+        return len(matches)
+
+    def _put(self, queue: asyncio.Queue, item: Optional[Tuple[dict, PantryMatch]]):
+        if queue.full():
+            queue.get_nowait()
+            self.dropped += 1
+        queue.put_nowait(item)
@@ -0,0 +1,73 @@
+import json
+import os
+import sys
+import threading
+from collections import Counter
+from typing import Optional
+
+# Stacks reported per profile, most sampled first
+MAX_REPORTED_STACKS = 50
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+class StackSampler:
+    """Sample one thread's Python stack every ``interval`` seconds from a helper thread.
+
+    Used on the event-loop thread, so samples include every task that ran
+    while the profiled request was in progress; samples inside the selector
+    are time the loop spent waiting on I/O (Mongo, upstream APIs). Work done
+    in other threads or worker processes is not seen.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            # Root first, the collapsed-stack format flame graph tools read
+            self.stacks[";".join(reversed(labels))] += 1
+            self.samples += 1
+
+
+def profile_body(sampler: StackSampler, elapsed: float, status: int, mongo_calls: int, mongo_seconds: float) -> bytes:
+    """JSON report of a profiled request: timings plus the most sampled stacks and functions"""
+    leaves: Counter = Counter()
+    for stack, count in sampler.stacks.items():
+        leaves[stack.rsplit(";", 1)[-1]] += count
+    report = {
+        "status": status,
+        "duration_ms": round(elapsed * 1000, 3),
+        "mongo_calls": mongo_calls,
+        "mongo_ms": round(mongo_seconds * 1000, 3),
+        "interval_ms": sampler.interval * 1000,
+        "samples": sampler.samples,
+        "top_functions": [{"function": name, "samples": count}
+                          for name, count in leaves.most_common(MAX_REPORTED_STACKS)],
+        "collapsed_stacks": [f"{stack} {count}" for stack, count in sampler.stacks.most_common(MAX_REPORTED_STACKS)],
+    }
+    return json.dumps(report).encode()
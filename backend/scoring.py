@@ -0,0 +1,200 @@
+import asyncio
+import itertools
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from matching import CatalogSnapshot, IngredientIndex, index_from_snapshot, snapshot_index
+from shared_catalog import SharedIngredientIndex
+
+POOL_MODES = ("thread", "process")
+
+Pantry = Tuple[List[str], Optional[int]]
+Ranked = List[Tuple[str, float]]
+# Threads get a copy-on-write view of the live index; worker processes get a compact
+# snapshot. A shared index is handed over as a frozen copy: its rows stay in the mapped file
+Snapshot = Union[CatalogSnapshot, IngredientIndex, SharedIngredientIndex]
+
+# Returned by a worker process that has not seen the snapshot it was asked to use
+SNAPSHOT_MISSING = "snapshot-missing"
+
+
+class Overloaded(Exception):
+    """Every worker is busy and the wait queue is full"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Scoring queue is full; retry in {retry_after:g}s")
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Exception):
+    """The scoring job did not finish before its deadline"""
+
+
+# Index rebuilt from the last snapshot a worker received, shared by its threads
+_worker_index: Optional[Tuple[int, IngredientIndex]] = None
+_worker_lock = threading.Lock()
+
+
+def freeze(index, mode: str = "process") -> Snapshot:
+    """Immutable copy of ``index`` for the workers, taken on the event loop"""
+    if isinstance(index, SharedIngredientIndex):
+        return index.frozen()
+    if mode == "thread":
+        return index.view()
+    return snapshot_index(index)
+
+
+def score_view(index, pantries: Sequence[Pantry], rank: Callable, deadline: float) -> List[Ranked]:
+    """Rank pantries against an index no one else writes to; ``deadline`` as for ``score_pantries``"""
+    if time.monotonic() > deadline:
+        raise DeadlineExceeded("Scoring deadline passed before the job started")
+    return [rank(index, available, max_results) for available, max_results in pantries]
+
+
+def score_pantries(token: int, snapshot: Optional[Snapshot], pantries: Sequence[Pantry],
+                   rank: Callable, deadline: float) -> List[Ranked]:
+    """Rank pantries against catalog snapshot ``token``.
+
+    Module-level so it can run in a worker process. The snapshot is turned
+    into an index once per token and kept for later jobs; a worker asked to
+    reuse a snapshot it does not hold (``snapshot`` is None) answers
+    ``SNAPSHOT_MISSING`` so the caller can resend it. ``deadline`` is a
+    ``time.monotonic()`` value; jobs picked up after it are skipped.
+    """
+    global _worker_index
+    if time.monotonic() > deadline:
+        raise DeadlineExceeded("Scoring deadline passed before the job started")
+
+    with _worker_lock:
+        if _worker_index is None or _worker_index[0] != token:
+            if snapshot is None:
+                return SNAPSHOT_MISSING
+            thawed = snapshot if isinstance(snapshot, SharedIngredientIndex) else index_from_snapshot(snapshot)
+            _worker_index = (token, thawed)
+        index = _worker_index[1]
+    return score_view(index, pantries, rank, deadline)
+
+
+class ScoringPool:
+    """Runs suggestion ranking off the event loop, with admission control.
+
+    Jobs run on a thread pool (``mode="thread"``; the numpy engine releases the
+    GIL, the Python one still shares it) or on worker processes. At most
+    ``workers + max_queue`` requests are admitted at once; beyond that ``rank``
+    raises ``Overloaded`` immediately instead of queueing without bound, and
+    a request still waiting after ``timeout`` seconds raises
+    ``DeadlineExceeded``. Batches of at least ``split_threshold`` pantries
+    are split across worker processes in either mode, since threads share one
+    interpreter. Threads score a copy-on-write view of the index and worker
+    processes a compact snapshot, each taken once per index version, so
+    writes never race with a running job.
+    """
+
+    def __init__(self, mode: str = "thread", workers: int = 4, max_queue: int = 64,
+                 timeout: Optional[float] = 5.0, retry_after: float = 1.0, split_threshold: int = 64):
+        if mode not in POOL_MODES:
+            raise ValueError(f"Unknown scoring pool mode: {mode}")
+        self.mode = mode
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.split_threshold = split_threshold
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._lock = threading.Lock()
+        self._executors: Dict[str, Executor] = {}
+        self._snapshots: Dict[str, Tuple[IngredientIndex, int, int, Snapshot]] = {}
+        self._tokens = itertools.count(1)
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.max_queue
+
+    def executor(self, mode: Optional[str] = None) -> Executor:
+        mode = mode or self.mode
+        if mode not in self._executors:
+            if mode == "process":
+                self._executors[mode] = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._executors[mode] = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="scoring")
+        return self._executors[mode]
+
+    def shutdown(self, mode: Optional[str] = None):
+        for name in [mode] if mode else list(self._executors):
+            executor = self._executors.pop(name, None)
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    def snapshot(self, index: IngredientIndex, mode: Optional[str] = None) -> Tuple[int, Snapshot]:
+        """The snapshot for the index as it is now, reused until it changes"""
+        mode = mode or self.mode
+        cached = self._snapshots.get(mode)
+        if cached is None or cached[0] is not index or cached[1] != index.version:
+            cached = self._snapshots[mode] = (index, index.version, next(self._tokens), freeze(index, mode))
+        return cached[2], cached[3]
+
+    async def rank(self, index: IngredientIndex, pantries: List[Pantry], rank: Callable) -> List[Ranked]:
+        """Rank every pantry against ``index``, in order, without blocking the event loop"""
+        with self._lock:
+            if self.admitted >= self.capacity:
+                self.rejected += 1
+                raise Overloaded(self.retry_after)
+            self.admitted += 1
+
+        try:
+            deadline = time.monotonic() + (self.timeout if self.timeout is not None else float("inf"))
+            # Only worker processes run in parallel; threads share one interpreter
+            if len(pantries) >= self.split_threshold:
+                mode = "process"
+                size = -(-len(pantries) // self.workers)
+                chunks = [pantries[start:start + size] for start in range(0, len(pantries), size)]
+            else:
+                mode = self.mode
+                chunks = [pantries]
+            token, snapshot = self.snapshot(index, mode)
+            jobs = [self._run(mode, token, snapshot, chunk, rank, deadline) for chunk in chunks]
+            try:
+                results = await asyncio.wait_for(asyncio.gather(*jobs), self.timeout)
+            except asyncio.TimeoutError:
+                self.timed_out += 1
+                raise DeadlineExceeded(f"Scoring took longer than {self.timeout:g}s") from None
+        finally:
+            with self._lock:
+                self.admitted -= 1
+        return [ranked for chunk_result in results for ranked in chunk_result]
+
+    async def _run(self, mode: str, token: int, snapshot: Snapshot, pantries: Sequence[Pantry],
+                   rank: Callable, deadline: float) -> List[Ranked]:
+        if mode == "thread":
+            return await self._submit(mode, score_view, snapshot, pantries, rank, deadline)
+
+        # Worker processes keep the last snapshot; only send it to one that lacks it
+        for attempt in range(2):
+            try:
+                result = await self._submit(mode, score_pantries, token, None, pantries, rank, deadline)
+                if result == SNAPSHOT_MISSING:
+                    result = await self._submit(mode, score_pantries, token, snapshot, pantries, rank, deadline)
+                return result
+            except BrokenProcessPool:
+                # A crashed worker should not fail the request; respawn the pool and retry once
+                self.shutdown(mode)
+                if attempt:
+                    raise
+
+    async def _submit(self, mode: str, fn, *args):
+        future: Future = self.executor(mode).submit(fn, *args)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # Drop the job if no worker has started it yet
+            future.cancel()
+            raise
@@ -0,0 +1,143 @@
+import heapq
+import math
+import re
+from bisect import bisect_left
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# How much a term found in each field counts toward relevance
+FIELD_WEIGHTS = {
+    "title": 3.0,
+    "cuisine": 2.0,
+    "ingredients": 2.0,
+    "description": 1.0,
+}
+# A query word that is only a prefix of a term counts for less than an exact word
+PREFIX_MATCH_FACTOR = 0.5
+# Shorter query words only match whole terms; "c" would otherwise expand to most of the vocabulary
+MIN_PREFIX_LENGTH = 3
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens; anything else is ignored"""
+    return _TOKEN_RE.findall(text.lower())
+
+
+class SearchIndex:
+    """In-memory token index over recipe title, description, cuisine and ingredients.
+
+    Every query word must match a term exactly or, from ``MIN_PREFIX_LENGTH``
+    characters on, as a prefix ("chick" finds "chicken"). Results are ranked by field-weighted, idf-scaled relevance,
+    newest first among equal scores. The query is tokenized, never compiled
+    as a pattern, so user input cannot change how it is interpreted.
+    """
+
+    PROJECTION = {"id": 1, "created_at": 1, **{field: 1 for field in FIELD_WEIGHTS}}
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._terms: Dict[str, Set[str]] = {}
+        self._created_at: Dict[str, float] = {}
+        self._vocabulary: List[str] = []
+        self._vocabulary_dirty = False
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def add_document(self, doc: dict):
+        """Index a recipe document, replacing any previous entry for its id"""
+        recipe_id = doc["id"]
+        self.remove(recipe_id)
+
+        weights: Dict[str, float] = {}
+        for field, field_weight in FIELD_WEIGHTS.items():
+            value = doc.get(field)
+            if not value:
+                continue
+            texts = value if isinstance(value, list) else [value]
+            for text in texts:
+                for token in tokenize(text):
+                    weights[token] = weights.get(token, 0.0) + field_weight
+
+        for token, weight in weights.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                self._vocabulary_dirty = True
+            postings[recipe_id] = weight
+        self._terms[recipe_id] = set(weights)
+        created_at = doc.get("created_at")
+        if isinstance(created_at, datetime):
+            # Mongo hands back naive datetimes, which are UTC
+            if created_at.tzinfo is None:
+                created_at = created_at.replace(tzinfo=timezone.utc)
+            self._created_at[recipe_id] = created_at.timestamp()
+        else:
+            self._created_at[recipe_id] = 0.0
+
+    def remove(self, recipe_id: str):
+        terms = self._terms.pop(recipe_id, None)
+        if terms is None:
+            return
+        del self._created_at[recipe_id]
+        for token in terms:
+            postings = self._postings[token]
+            del postings[recipe_id]
+            if not postings:
+                del self._postings[token]
+                self._vocabulary_dirty = True
+
+    def search(self, query: str, skip: int = 0, limit: Optional[int] = None) -> Tuple[List[str], int]:
+        """Return one page of matching recipe ids, best first, and the total match count"""
+        words = list(dict.fromkeys(tokenize(query)))
+        if not words:
+            return [], 0
+
+        total_docs = len(self._terms)
+        scores: Optional[Dict[str, float]] = None
+        for word in words:
+            word_scores: Dict[str, float] = {}
+            for term in self._expand(word):
+                postings = self._postings[term]
+                idf = math.log(1.0 + total_docs / len(postings))
+                factor = idf if term == word else idf * PREFIX_MATCH_FACTOR
+                for recipe_id, weight in postings.items():
+                    score = weight * factor
+                    if score > word_scores.get(recipe_id, 0.0):
+                        word_scores[recipe_id] = score
+
+            # Every query word has to match
+            if scores is None:
+                scores = word_scores
+            else:
+                scores = {recipe_id: score + word_scores[recipe_id]
+                          for recipe_id, score in scores.items() if recipe_id in word_scores}
+            if not scores:
+                return [], 0
+
+        def rank(recipe_id: str) -> Tuple[float, float]:
+            return -scores[recipe_id], -self._created_at[recipe_id]
+
+        # A page only needs its own and the skipped results in order, not every match
+        if limit is None:
+            ranked = sorted(scores, key=rank)
+        else:
+            ranked = heapq.nsmallest(skip + limit, scores, key=rank)
+        return ranked[skip:], len(scores)
+
+    def _expand(self, word: str) -> List[str]:
+        """Index terms equal to or starting with ``word``"""
+        if len(word) < MIN_PREFIX_LENGTH:
+            return [word] if word in self._postings else []
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_dirty = False
+
+        terms = []
+        position = bisect_left(self._vocabulary, word)
+        while position < len(self._vocabulary) and self._vocabulary[position].startswith(word):
+            terms.append(self._vocabulary[position])
+            position += 1
+        return terms
@@ -1,20 +1,62 @@
+import logging
 import os
+import time
 import uuid
 from datetime import datetime, timezone
-from typing import List, Optional
-import requests
-import re
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Literal, Optional, Tuple, Type, Union
+import asyncio
+import heapq
+import json
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorClient
-from pydantic import BaseModel, Field
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import BulkWriteError, PyMongoError
+from pydantic import BaseModel, Field, ValidationError
 from dotenv import load_dotenv
 
+from aggregation import aggregate_top_matches
+from bulk import iter_ndjson_lines, ndjson_line
+from cache import MaterializedResponse, MongoCacheTier, ReadThroughCache, TTLCache, etag_matches
+from encoding import FragmentCache, JSONResponse, dumps, json_array, json_object, sse_event
+from catalog import LiveIndex, RecipeKeys, load_ingredient_index
+from metrics import Counter, Gauge, MetricsMiddleware, MetricsRegistry, RequestMetrics
+from matching import (
+    DERIVED_FIELDS,
+    IngredientIndex,
+    calculate_recipe_match,
+    derived_fields,
+    normalize_ingredient,
+    pantry_key,
+    stored_normalized,
+    top_matches,
+)
+from pantries import PantryNotifier
+from pagination import RECIPE_LIST_SORT, after_cursor, encode_cursor
+from scoring import DeadlineExceeded, Overloaded, ScoringPool
+from search import SearchIndex
+from shared_catalog import SharedCatalogStore, SharedIngredientIndex
+from vector_scoring import vector_top_matches
+from youtube import (
+    DEFAULT_YOUTUBE_API_BASE_URL,
+    MAX_VIDEO_IDS_PER_REQUEST,
+    VideoBatcher,
+    YouTubeClient,
+    YouTubeVideo,
+    decode_videos,
+    encode_videos,
+    search_cache_key,
+    video_cache_key,
+)
+
 # Load environment variables
 load_dotenv()
 
-app = FastAPI(title="RecipeCore API", version="1.0.0")
+logger = logging.getLogger(__name__)
+
+app = FastAPI(title="RecipeCore API", version="1.0.0", default_response_class=JSONResponse)
 
 # CORS setup
 app.add_middleware(
@@ -30,18 +72,113 @@ MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
 DB_NAME = os.environ.get("DB_NAME", "recipecore")
 YOUTUBE_API_KEY = os.environ.get("YOUTUBE_API_KEY")
 
-client = AsyncIOMotorClient(MONGO_URL)
+# Bulk import/export: documents per insert_many and cursor batch, errors listed per import,
+# and the longest import line accepted (longer lines are reported and skipped without being buffered)
+BULK_BATCH_SIZE = int(os.environ.get("BULK_BATCH_SIZE", "1000"))
+BULK_MAX_REPORTED_ERRORS = int(os.environ.get("BULK_MAX_REPORTED_ERRORS", "1000"))
+BULK_MAX_LINE_BYTES = int(os.environ.get("BULK_MAX_LINE_BYTES", str(1024 * 1024)))
+# Recipe lists with a larger page size are streamed item by item instead of buffered
+LIST_STREAM_THRESHOLD = int(os.environ.get("LIST_STREAM_THRESHOLD", "100"))
+# Featured lists are rebuilt on writes; the TTL covers writes from other workers without change streams
+FEATURED_CACHE_TTL = float(os.environ.get("FEATURED_CACHE_TTL", "60"))
+# Suggestion responses cached per canonical pantry until the next recipe write
+SUGGESTION_CACHE_MAX_ENTRIES = int(os.environ.get("SUGGESTION_CACHE_MAX_ENTRIES", "4096"))
+SUGGESTION_CACHE_MAX_BYTES = int(os.environ.get("SUGGESTION_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+# Without a change stream, other workers' writes cannot clear it; cached responses then expire after this
+SUGGESTION_CACHE_TTL = float(os.environ.get("SUGGESTION_CACHE_TTL", "60"))
+# Encoded recipe JSON reused by list and suggestion responses until the recipe's next write
+RECIPE_FRAGMENT_CACHE_MAX_ENTRIES = int(os.environ.get("RECIPE_FRAGMENT_CACHE_MAX_ENTRIES", "10000"))
+RECIPE_FRAGMENT_CACHE_MAX_BYTES = int(os.environ.get("RECIPE_FRAGMENT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Single-recipe reads: LRU size, seconds an entry is trusted ("0" keeps it until a write), shared tier
+RECIPE_CACHE_MAX_ENTRIES = int(os.environ.get("RECIPE_CACHE_MAX_ENTRIES", "1024"))
+RECIPE_CACHE_TTL = float(os.environ.get("RECIPE_CACHE_TTL", "300")) or None
+RECIPE_CACHE_SHARED = os.environ.get("RECIPE_CACHE_SHARED", "false").lower() in ("1", "true", "yes")
+RECIPE_CHANGE_STREAM = os.environ.get("RECIPE_CHANGE_STREAM", "true").lower() in ("1", "true", "yes")
+YOUTUBE_API_BASE_URL = os.environ.get("YOUTUBE_API_BASE_URL", DEFAULT_YOUTUBE_API_BASE_URL)
+YOUTUBE_TIMEOUT = float(os.environ.get("YOUTUBE_TIMEOUT", "10"))
+YOUTUBE_MAX_CONNECTIONS = int(os.environ.get("YOUTUBE_MAX_CONNECTIONS", "20"))
+YOUTUBE_MAX_CONCURRENCY = int(os.environ.get("YOUTUBE_MAX_CONCURRENCY", "10"))
+YOUTUBE_CACHE_TTL = float(os.environ.get("YOUTUBE_CACHE_TTL", "3600"))
+YOUTUBE_CACHE_STALE_TTL = float(os.environ.get("YOUTUBE_CACHE_STALE_TTL", "86400"))
+YOUTUBE_CACHE_MAX_ENTRIES = int(os.environ.get("YOUTUBE_CACHE_MAX_ENTRIES", "2048"))
+YOUTUBE_BATCH_WINDOW = float(os.environ.get("YOUTUBE_BATCH_WINDOW", "0.005"))
+YOUTUBE_CACHE_SHARED = os.environ.get("YOUTUBE_CACHE_SHARED", "false").lower() in ("1", "true", "yes")
+
+# Seconds the in-memory recipe indexes are trusted when no change stream reports other workers' writes
+INDEX_RELOAD_TTL = float(os.environ.get("INDEX_RELOAD_TTL", "60"))
+
+# Suggestion scoring backend: "python" (reference loop) or "numpy" (incidence matrix) over the
+# in-memory index, or "mongo" (aggregation pipeline, exact ingredient names only)
+SUGGESTION_ENGINES = {"python": top_matches, "numpy": vector_top_matches}
+MONGO_SUGGESTION_ENGINE = "mongo"
+SUGGESTION_ENGINE = os.environ.get("SUGGESTION_ENGINE", "python")
+if SUGGESTION_ENGINE not in SUGGESTION_ENGINES and SUGGESTION_ENGINE != MONGO_SUGGESTION_ENGINE:
+    raise ValueError(f"Unknown SUGGESTION_ENGINE: {SUGGESTION_ENGINE}")
+
+# Multi-worker deployments: workers map one shared ingredient catalog file kept in this directory,
+# check it for new versions every POLL_INTERVAL seconds, and republish it PUBLISH_DELAY seconds after a write
+SHARED_CATALOG_DIR = os.environ.get("SHARED_CATALOG_DIR") or None
+SHARED_CATALOG_POLL_INTERVAL = float(os.environ.get("SHARED_CATALOG_POLL_INTERVAL", "1"))
+SHARED_CATALOG_PUBLISH_DELAY = float(os.environ.get("SHARED_CATALOG_PUBLISH_DELAY", "5"))
+
+# Suggestion scoring runs off the event loop on a "thread" or "process" pool. Requests beyond
+# the busy workers plus SUGGESTION_QUEUE_SIZE get a 503, as do those not scored within SUGGESTION_TIMEOUT
+SUGGESTION_POOL = os.environ.get("SUGGESTION_POOL", "thread")
+SUGGESTION_WORKERS = int(os.environ.get(
+    "SUGGESTION_WORKERS", os.environ.get("SUGGESTION_BATCH_WORKERS", str(os.cpu_count() or 1))))
+SUGGESTION_QUEUE_SIZE = int(os.environ.get("SUGGESTION_QUEUE_SIZE", "64"))
+SUGGESTION_TIMEOUT = float(os.environ.get("SUGGESTION_TIMEOUT", "5")) or None
+SUGGESTION_RETRY_AFTER = int(os.environ.get("SUGGESTION_RETRY_AFTER", "1"))
+# Batches at least this large are split across worker processes, whichever pool scores single requests
+SUGGESTION_BATCH_PROCESS_THRESHOLD = int(os.environ.get("SUGGESTION_BATCH_PROCESS_THRESHOLD", "64"))
+# With the mongo engine, at most this many of a batch's aggregation pipelines run at once
+SUGGESTION_BATCH_MONGO_CONCURRENCY = int(os.environ.get("SUGGESTION_BATCH_MONGO_CONCURRENCY", "8"))
+
+# Requests sent with an X-Profile header are answered with a sampled stack profile (off in production)
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILE_SAMPLE_INTERVAL = float(os.environ.get("PROFILE_SAMPLE_INTERVAL", "0.001"))
+
+# Saved pantry match streams: matches queued for a slow client before the oldest is dropped,
+# and seconds between keep-alive comments on an idle stream
+PANTRY_STREAM_QUEUE_SIZE = int(os.environ.get("PANTRY_STREAM_QUEUE_SIZE", "100"))
+PANTRY_STREAM_HEARTBEAT = float(os.environ.get("PANTRY_STREAM_HEARTBEAT", "15"))
+
+# Request timing, Mongo command and YouTube latency metrics, served on /api/metrics
+metrics_registry = MetricsRegistry()
+request_metrics = RequestMetrics(metrics_registry)
+app.add_middleware(
+    MetricsMiddleware,
+    metrics=request_metrics,
+    profile_interval=PROFILE_SAMPLE_INTERVAL if PROFILING_ENABLED else None,
+)
+
+client = AsyncIOMotorClient(MONGO_URL, event_listeners=[request_metrics.mongo_listener()])
 db = client[DB_NAME]
 recipes_collection = db.recipes
+pantries_collection = db.pantries
 
-# Pydantic models
-class YouTubeVideo(BaseModel):
-    video_id: str
-    title: str
-    thumbnail: str
-    channel_title: str
-    duration: Optional[str] = None
+# In-memory indexes: ingredients narrow suggestion scoring, tokens serve text search
+shared_catalog = SharedCatalogStore(SHARED_CATALOG_DIR) if SHARED_CATALOG_DIR else None
+ingredient_index = (
+    LiveIndex(SharedIngredientIndex, load=shared_catalog.load) if shared_catalog is not None
+    else LiveIndex(IngredientIndex, load=load_ingredient_index)
+)
+search_index = LiveIndex(SearchIndex)
+# Only loaded while the change stream is open, to resolve its delete events
+recipe_keys = LiveIndex(RecipeKeys)
+scoring_pool = ScoringPool(
+    SUGGESTION_POOL,
+    workers=SUGGESTION_WORKERS,
+    max_queue=SUGGESTION_QUEUE_SIZE,
+    timeout=SUGGESTION_TIMEOUT,
+    retry_after=SUGGESTION_RETRY_AFTER,
+    split_threshold=SUGGESTION_BATCH_PROCESS_THRESHOLD,
+)
+
+# Recipe writes are scored against the saved pantries that have a live match stream here
+pantry_notifier = PantryNotifier(queue_size=PANTRY_STREAM_QUEUE_SIZE)
 
+# Pydantic models
 class Recipe(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     title: str
@@ -58,6 +195,20 @@ class Recipe(BaseModel):
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+class RecipeSummary(BaseModel):
+    """The fields a recipe card needs; list endpoints return it with ``view=summary``"""
+    id: str
+    title: str
+    description: str
+    prep_time: int
+    cook_time: int
+    servings: int
+    difficulty: str
+    cuisine: Optional[str] = None
+    image_url: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
 class RecipeCreate(BaseModel):
     title: str
     description: str
@@ -89,116 +240,503 @@ class IngredientSuggestionRequest(BaseModel):
     max_results: Optional[int] = 5
 
 class RecipeSuggestion(BaseModel):
-    recipe: Recipe
+    recipe: Union[Recipe, RecipeSummary]
     match_score: float
     matching_ingredients: List[str]
     missing_ingredients: List[str]
 
+class RecipeSuggestionList(BaseModel):
+    suggestions: List[RecipeSuggestion]
+
+class Pantry(BaseModel):
+    """A saved set of ingredients; its match stream reports new recipes that fit it"""
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    name: str
+    ingredients: List[str]
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class PantryCreate(BaseModel):
+    name: str
+    ingredients: List[str]
+
+class PantryUpdate(BaseModel):
+    name: Optional[str] = None
+    ingredients: Optional[List[str]] = None
+
 # YouTube API helper functions
-def search_youtube_videos(query: str, max_results: int = 10):
-    """Search YouTube videos using the YouTube Data API"""
-    if not YOUTUBE_API_KEY:
-        raise HTTPException(status_code=500, detail="YouTube API key not configured")
-    
-    url = "https://www.googleapis.com/youtube/v3/search"
-    params = {
-        "part": "snippet",
-        "q": query,
-        "type": "video",
-        "maxResults": max_results,
-        "key": YOUTUBE_API_KEY
-    }
+youtube_client = YouTubeClient(
+    YOUTUBE_API_KEY,
+    base_url=YOUTUBE_API_BASE_URL,
+    timeout=YOUTUBE_TIMEOUT,
+    max_connections=YOUTUBE_MAX_CONNECTIONS,
+    max_concurrency=YOUTUBE_MAX_CONCURRENCY,
+    on_call=request_metrics.observe_youtube,
+)
+video_batcher = VideoBatcher(youtube_client, window=YOUTUBE_BATCH_WINDOW)
+
+# Search results and video details are cached per process, optionally backed by Mongo
+youtube_cache = ReadThroughCache(
+    TTLCache(
+        max_entries=YOUTUBE_CACHE_MAX_ENTRIES,
+        ttl=YOUTUBE_CACHE_TTL,
+        stale_ttl=YOUTUBE_CACHE_STALE_TTL,
+    ),
+    shared=(
+        MongoCacheTier(db.youtube_cache, retention=YOUTUBE_CACHE_TTL + YOUTUBE_CACHE_STALE_TTL)
+        if YOUTUBE_CACHE_SHARED else None
+    ),
+    encode=encode_videos,
+    decode=decode_videos,
+)
+
+async def search_youtube_videos(query: str, max_results: int = 10) -> Tuple[List[YouTubeVideo], str]:
+    """Search YouTube videos using the YouTube Data API.
+    
+    Returns the videos and the cache status (HIT, STALE or MISS).
+    """
+    async def search_with_durations():
+        videos = await youtube_client.search_videos(query, max_results)
+        try:
+            await video_batcher.fill_durations(videos)
+        except HTTPException:
+            # Durations are a nice-to-have; keep the search results without them
+            pass
+        return videos
     
+    return await youtube_cache.get_or_load(search_cache_key(query, max_results), search_with_durations)
+
+async def get_video_details(video_id: str) -> Tuple[YouTubeVideo, str]:
+    """Get detailed information about a specific YouTube video, with its cache status"""
+    return await youtube_cache.get_or_load(video_cache_key(video_id), lambda: video_batcher.get_one(video_id))
+
+async def get_videos_details(video_ids: List[str]) -> Dict[str, YouTubeVideo]:
+    """Get details for many videos, using cached entries and batched upstream calls"""
+    async def load_many(keys: List[str]) -> Dict[str, YouTubeVideo]:
+        videos = await video_batcher.get_many(key.split(":", 1)[1] for key in keys)
+        return {video_cache_key(video_id): video for video_id, video in videos.items()}
+    
+    found = await youtube_cache.get_many_or_load([video_cache_key(video_id) for video_id in video_ids], load_many)
+    return {video.video_id: video for video in found.values()}
+
+@app.on_event("shutdown")
+async def close_youtube_client():
+    await youtube_client.aclose()
+
+# Database indexes backing the hot queries: lookups by id and the newest-first listing
+RECIPE_INDEXES = [
+    {"keys": [("id", ASCENDING)], "name": "id_unique", "unique": True},
+    {"keys": RECIPE_LIST_SORT, "name": "created_at_id"},
+]
+if SUGGESTION_ENGINE == MONGO_SUGGESTION_ENGINE:
+    # Candidate lookup for the suggestion pipeline
+    RECIPE_INDEXES.append({"keys": [("normalized_ingredients", ASCENDING)], "name": "normalized_ingredients"})
+# Catch-up read of the recipes written since a shared catalog file was scanned
+UPDATED_AT_INDEX = {"keys": [("updated_at", ASCENDING)], "name": "updated_at"}
+if SHARED_CATALOG_DIR:
+    RECIPE_INDEXES.append(UPDATED_AT_INDEX)
+
+@app.on_event("startup")
+async def ensure_pantry_indexes():
     try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-        
-        videos = []
-        for item in data.get("items", []):
-            video = YouTubeVideo(
-                video_id=item["id"]["videoId"],
-                title=item["snippet"]["title"],
-                thumbnail=item["snippet"]["thumbnails"]["medium"]["url"],
-                channel_title=item["snippet"]["channelTitle"]
+        await pantries_collection.create_index([("id", ASCENDING)], name="id_unique", unique=True)
+    except PyMongoError as e:
+        logger.warning("Could not create pantries index id_unique: %s", e)
+
+@app.on_event("startup")
+async def ensure_recipe_indexes():
+    """Create the recipe collection indexes if they do not exist yet"""
+    for spec in RECIPE_INDEXES:
+        try:
+            await recipes_collection.create_index(
+                spec["keys"], name=spec["name"], unique=spec.get("unique", False)
             )
-            videos.append(video)
-        
-        return videos
-    except requests.RequestException as e:
-        raise HTTPException(status_code=500, detail=f"YouTube API error: {str(e)}")
-
-def get_video_details(video_id: str):
-    """Get detailed information about a specific YouTube video"""
-    if not YOUTUBE_API_KEY:
-        raise HTTPException(status_code=500, detail="YouTube API key not configured")
-    
-    url = "https://www.googleapis.com/youtube/v3/videos"
-    params = {
-        "part": "snippet,contentDetails",
-        "id": video_id,
-        "key": YOUTUBE_API_KEY
-    }
+        except PyMongoError as e:
+            # Keep serving; queries still work without the index, only slower
+            logger.warning("Could not create recipes index %s: %s", spec["name"], e)
+
+# Recipe documents as stored
+def recipe_document(recipe: Recipe) -> dict:
+    """Build the stored document for a validated recipe, with derived fields"""
+    recipe_data = recipe.dict()
+    # Mongo keeps naive UTC milliseconds; store that form so responses match later reads
+    for field in ("created_at", "updated_at"):
+        value = recipe_data[field]
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        recipe_data[field] = value.replace(microsecond=value.microsecond // 1000 * 1000, tzinfo=None)
+    recipe_data.update(derived_fields(recipe_data["ingredients"]))
+    return recipe_data
+
+# Derived fields are rebuilt on import, so they are left out of exports
+EXPORT_PROJECTION = {"_id": 0, **{field: 0 for field in DERIVED_FIELDS}}
+
+# List views: full recipes, or summaries for which Mongo sends only the card fields
+RecipeView = Literal["full", "summary"]
+RECIPE_VIEWS: Dict[str, Tuple[Type[BaseModel], dict]] = {
+    "full": (Recipe, EXPORT_PROJECTION),
+    "summary": (RecipeSummary, {"_id": 0, **{field: 1 for field in RecipeSummary.model_fields}}),
+}
+
+recipe_fragments = FragmentCache(
+    max_entries=RECIPE_FRAGMENT_CACHE_MAX_ENTRIES, max_bytes=RECIPE_FRAGMENT_CACHE_MAX_BYTES
+)
+
+def json_response(body: bytes, **kwargs) -> Response:
+    return Response(body, media_type="application/json", **kwargs)
+
+def wants_ndjson(request: Request) -> bool:
+    return "application/x-ndjson" in request.headers.get("accept", "")
+
+async def stream_recipe_list(recipes: AsyncIterable[dict], model: Type[BaseModel], ndjson: bool,
+                             page_size: Optional[int] = None) -> AsyncIterator[bytes]:
+    """Encode recipes one at a time as NDJSON lines or a ``{"recipes": [...]}`` body.
     
+    With ``page_size`` the JSON body ends with the ``next_cursor`` for a full page.
+    """
+    count = 0
+    last_recipe = None
+    if not ndjson:
+        yield b'{"recipes":['
+    async for recipe in recipes:
+        encoded = recipe_fragments.encode(model, recipe)
+        if ndjson:
+            yield encoded + b"\n"
+        else:
+            yield encoded if count == 0 else b"," + encoded
+        count += 1
+        last_recipe = recipe
+    if ndjson:
+        return
+    yield b"]"
+    if page_size is not None:
+        next_cursor = encode_cursor(last_recipe) if count and count == page_size else None
+        yield b',"next_cursor":' + dumps(next_cursor)
+    yield b"}"
+
+def recipe_list_response(recipes: AsyncIterable[dict], model: Type[BaseModel], ndjson: bool,
+                         page_size: Optional[int] = None) -> StreamingResponse:
+    return StreamingResponse(
+        stream_recipe_list(recipes, model, ndjson, page_size),
+        media_type="application/x-ndjson" if ndjson else "application/json",
+    )
+
+# In-memory catalog index maintenance
+def index_recipe(recipe: dict):
+    """Apply a created or updated recipe to the in-memory indexes"""
+    ingredient_index.upsert(recipe)
+    search_index.upsert(recipe)
+    recipe_fragments.invalidate(recipe["id"])
+    invalidate_featured()
+    invalidate_suggestions()
+    schedule_catalog_publish()
+    # The change stream reports every worker's writes; without one, match this worker's own
+    if not recipe_change_stream_open:
+        pantry_notifier.recipe_written(recipe)
+
+def unindex_recipe(recipe_id: str):
+    """Apply a recipe delete to the in-memory indexes"""
+    ingredient_index.remove(recipe_id)
+    search_index.remove(recipe_id)
+    recipe_keys.remove(recipe_id)
+    recipe_fragments.invalidate(recipe_id)
+    invalidate_featured()
+    invalidate_suggestions()
+    schedule_catalog_publish()
+
+async def current_index(live: LiveIndex):
+    """A recipe index, refreshed every INDEX_RELOAD_TTL seconds when other workers' writes cannot be followed"""
+    return await live.get(recipes_collection, max_age=None if recipe_change_stream_open else INDEX_RELOAD_TTL)
+
+# Suggestion response bodies, keyed by catalog version, canonical pantry, max_results and view.
+# Every recipe write seen here bumps the version, so a body rendered before it is never served after it;
+# the TTL only applies while no change stream reports the other workers' writes
+catalog_version = 0
+suggestion_cache = ReadThroughCache(
+    TTLCache(max_entries=SUGGESTION_CACHE_MAX_ENTRIES, ttl=SUGGESTION_CACHE_TTL, max_bytes=SUGGESTION_CACHE_MAX_BYTES)
+)
+
+def invalidate_suggestions():
+    global catalog_version
+    catalog_version += 1
+    suggestion_cache.clear()
+
+# Featured recipes, materialized as response bytes per view
+FEATURED_LIMIT = 6
+
+async def render_featured(view: RecipeView) -> bytes:
+    model, projection = RECIPE_VIEWS[view]
+    cursor = recipes_collection.find({}, projection).sort("created_at", -1).limit(FEATURED_LIMIT)
+    return b"".join([chunk async for chunk in stream_recipe_list(cursor, model, ndjson=False)])
+
+featured_responses: Dict[str, MaterializedResponse] = {
+    view: MaterializedResponse(lambda view=view: render_featured(view), ttl=FEATURED_CACHE_TTL)
+    for view in RECIPE_VIEWS
+}
+recipe_change_watcher: Optional[asyncio.Task] = None
+
+def invalidate_featured():
+    for response in featured_responses.values():
+        response.invalidate()
+
+# True while the recipe change stream is open; saved pantries are then notified from it
+recipe_change_stream_open = False
+
+async def apply_recipe_change(change: dict):
+    """Apply a write reported by the change stream, from this or any other worker or tool"""
+    invalidate_featured()
+    invalidate_suggestions()
+    recipe = change.get("fullDocument")
+    if change["operationType"] in ("insert", "update", "replace") and recipe is not None:
+        # A no-op for this worker's own writes, which are already applied
+        ingredient_index.upsert(recipe)
+        search_index.upsert(recipe)
+        recipe_keys.upsert(recipe)
+        recipe_fragments.invalidate(recipe["id"])
+        if change["operationType"] != "insert":
+            await recipe_cache.invalidate(recipe_cache_key(recipe["id"]))
+        pantry_notifier.recipe_written(recipe)
+    elif change["operationType"] == "delete" and recipe_keys.loaded:
+        # Delete events only carry the Mongo _id; an unknown one is this worker's own delete, already applied
+        recipe_id = recipe_keys.index.recipe_id(change["documentKey"]["_id"])
+        if recipe_id is None:
+            return
+        ingredient_index.remove(recipe_id)
+        search_index.remove(recipe_id)
+        recipe_keys.remove(recipe_id)
+        recipe_fragments.invalidate(recipe_id)
+        await recipe_cache.invalidate(recipe_cache_key(recipe_id))
+
+async def watch_recipe_changes():
+    """Follow writes made by any worker or tool: invalidate materialized responses, notify saved pantries"""
+    global recipe_change_stream_open
     try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-        
-        if not data.get("items"):
-            raise HTTPException(status_code=404, detail="Video not found")
-        
-        item = data["items"][0]
-        video = YouTubeVideo(
-            video_id=video_id,
-            title=item["snippet"]["title"],
-            thumbnail=item["snippet"]["thumbnails"]["medium"]["url"],
-            channel_title=item["snippet"]["channelTitle"],
-            duration=item["contentDetails"]["duration"]
-        )
-        
-        return video
-    except requests.RequestException as e:
-        raise HTTPException(status_code=500, detail=f"YouTube API error: {str(e)}")
-
-# Smart recipe suggestion helper functions
-def normalize_ingredient(ingredient: str) -> str:
-    """Normalize ingredient name for better matching"""
-    # Remove measurements, parentheses, and common modifiers
-    ingredient = re.sub(r'\d+(?:\.\d+)?\s*(?:cups?|tbsp|tsp|oz|lbs?|g|kg|ml|l|cloves?|pieces?|slices?)', '', ingredient, flags=re.IGNORECASE)
-    ingredient = re.sub(r'\([^)]*\)', '', ingredient)  # Remove parentheses
-    ingredient = re.sub(r'\b(?:fresh|dried|chopped|minced|diced|sliced|grated|to taste|optional)\b', '', ingredient, flags=re.IGNORECASE)
-    ingredient = re.sub(r'[,.]', '', ingredient)  # Remove commas and periods
-    ingredient = ingredient.strip().lower()
-    return ingredient
-
-def calculate_recipe_match(recipe_ingredients: List[str], available_ingredients: List[str]) -> tuple:
-    """Calculate how well a recipe matches available ingredients"""
-    normalized_recipe_ingredients = [normalize_ingredient(ing) for ing in recipe_ingredients]
-    normalized_available = [normalize_ingredient(ing) for ing in available_ingredients]
-    
-    matching_ingredients = []
-    missing_ingredients = []
-    
-    for recipe_ing, original_recipe_ing in zip(normalized_recipe_ingredients, recipe_ingredients):
-        found_match = False
-        for available_ing in normalized_available:
-            # Check if available ingredient contains recipe ingredient or vice versa
-            if (recipe_ing in available_ing) or (available_ing in recipe_ing) or (recipe_ing == available_ing):
-                matching_ingredients.append(original_recipe_ing)
-                found_match = True
-                break
-        
-        if not found_match:
-            missing_ingredients.append(original_recipe_ing)
+        async with recipes_collection.watch(full_document="updateLookup") as stream:
+            recipe_change_stream_open = True
+            suggestion_cache.local.ttl = None
+            # Read after the stream opened, so any write it misses is reported by the stream
+            await recipe_keys.get(recipes_collection)
+            async for change in stream:
+                await apply_recipe_change(change)
+    except (PyMongoError, TypeError, NotImplementedError) as e:
+        # Standalone servers and local stand-ins such as mongomock have no change streams;
+        # local writes, their pantry notifications and the TTLs still apply
+        logger.info("Recipe change stream unavailable: %s", e)
+    finally:
+        recipe_change_stream_open = False
+        suggestion_cache.local.ttl = SUGGESTION_CACHE_TTL
+        # Local writes are not recorded in it, so a reopened stream reads it again
+        recipe_keys.reset()
+
+# Shared catalog: writes here are republished for the other workers, whose new versions are followed
+catalog_publisher: Optional[asyncio.Task] = None
+catalog_follower: Optional[asyncio.Task] = None
+catalog_changed_at: Optional[float] = None
+
+def schedule_catalog_publish():
+    global catalog_publisher, catalog_changed_at
+    if shared_catalog is None:
+        return
+    catalog_changed_at = time.time()
+    if catalog_publisher is None or catalog_publisher.done():
+        catalog_publisher = asyncio.ensure_future(publish_shared_catalog())
+
+async def publish_shared_catalog():
+    """Republish once writes settle; writes made during a publish trigger another"""
+    global catalog_changed_at
+    while catalog_changed_at is not None:
+        await asyncio.sleep(SHARED_CATALOG_PUBLISH_DELAY)
+        changed_at, catalog_changed_at = catalog_changed_at, None
+        try:
+            await shared_catalog.publish(recipes_collection, newer_than=changed_at)
+        except (PyMongoError, OSError) as e:
+            logger.warning("Could not publish the shared catalog: %s", e)
+
+async def follow_shared_catalog():
+    """Move this worker's index onto catalog versions published by any worker"""
+    stamp = shared_catalog.pointer_stamp()
+    while True:
+        await asyncio.sleep(SHARED_CATALOG_POLL_INTERVAL)
+        current_stamp = shared_catalog.pointer_stamp()
+        if current_stamp == stamp:
+            continue
+        stamp = current_stamp
+        index = ingredient_index.index
+        catalog = await asyncio.to_thread(shared_catalog.open_current)
+        if index is None or catalog is None:
+            continue
+        if index.catalog is None or catalog.version > index.catalog.version:
+            index.rebase(catalog)
+            invalidate_suggestions()
+
+@app.on_event("startup")
+async def start_catalog_follower():
+    global catalog_follower
+    if shared_catalog is not None:
+        catalog_follower = asyncio.ensure_future(follow_shared_catalog())
+
+@app.on_event("shutdown")
+async def stop_catalog_tasks():
+    for task in (catalog_follower, catalog_publisher):
+        if task is not None:
+            task.cancel()
+
+# Recipe detail cache, invalidated by update and delete
+recipe_cache = ReadThroughCache(
+    TTLCache(max_entries=RECIPE_CACHE_MAX_ENTRIES, ttl=RECIPE_CACHE_TTL),
+    shared=(
+        MongoCacheTier(db.recipe_cache, retention=RECIPE_CACHE_TTL or 86400)
+        if RECIPE_CACHE_SHARED else None
+    ),
+    encode=lambda recipe: recipe.model_dump(),
+    decode=Recipe.model_validate,
+)
+
+def recipe_cache_key(recipe_id: str) -> str:
+    return f"recipe:{recipe_id}"
+
+def recipe_etag(recipe: Recipe) -> str:
+    # Every write bumps updated_at, so it identifies the version of the recipe
+    return f'W/"{recipe.updated_at.isoformat()}"'
+
+@app.on_event("startup")
+async def start_recipe_change_watcher():
+    global recipe_change_watcher
+    if RECIPE_CHANGE_STREAM:
+        recipe_change_watcher = asyncio.ensure_future(watch_recipe_changes())
+
+@app.on_event("shutdown")
+async def stop_recipe_change_watcher():
+    if recipe_change_watcher is not None:
+        recipe_change_watcher.cancel()
+
+# Suggestion helpers
+async def fetch_recipes_by_id(recipe_ids: List[str], projection: Optional[dict] = None) -> Dict[str, dict]:
+    """Load the given recipes in one query, keyed by id"""
+    cursor = recipes_collection.find({"id": {"$in": recipe_ids}}, projection)
+    return {recipe["id"]: recipe async for recipe in cursor}
+
+def suggestion_projection(view: RecipeView) -> dict:
+    # Matching and missing lists come from the raw and stored normalized ingredients
+    if view == "summary":
+        return {**RECIPE_VIEWS[view][1], "ingredients": 1, "normalized_ingredients": 1, "derived_version": 1}
+    return {"_id": 0, "ingredient_tokens": 0, "ingredient_count": 0}
+
+def encode_suggestion(recipe_data: dict, match_score: float, matching_ingredients: List[str],
+                      missing_ingredients: List[str], view: RecipeView = "full") -> bytes:
+    """A ``RecipeSuggestion`` as JSON; the recipe comes from its cached fragment"""
+    return json_object([
+        ("recipe", recipe_fragments.encode(RECIPE_VIEWS[view][0], recipe_data)),
+        ("match_score", dumps(match_score)),
+        ("matching_ingredients", dumps(matching_ingredients)),
+        ("missing_ingredients", dumps(missing_ingredients)),
+    ])
+
+def build_suggestions(ranked: List[Tuple[str, float]], recipes_by_id: Dict[str, dict],
+                      available_ingredients: List[str], view: RecipeView = "full") -> bytes:
+    """Encode a ``RecipeSuggestion`` array for ranked recipes, skipping any deleted since ranking"""
+    suggestions = []
     
-    # Calculate match score (percentage of ingredients available)
-    if len(normalized_recipe_ingredients) == 0:
-        match_score = 0.0
-    else:
-        match_score = len(matching_ingredients) / len(normalized_recipe_ingredients)
+    for recipe_id, _ in ranked:
+        recipe_data = recipes_by_id.get(recipe_id)
+        if recipe_data is None:
+            continue
+        match = calculate_recipe_match(recipe_data["ingredients"], available_ingredients, stored_normalized(recipe_data))
+        suggestions.append(encode_suggestion(recipe_data, *match, view=view))
     
-    return match_score, matching_ingredients, missing_ingredients
+    return json_array(suggestions)
+
+async def rank_in_mongo(available_ingredients: List[str], max_results: Optional[int],
+                        projection: dict) -> Tuple[List[Tuple[str, float]], Dict[str, dict]]:
+    """Score in an aggregation pipeline; the winners come back with the ranking"""
+    matches = await aggregate_top_matches(recipes_collection, available_ingredients, max_results, projection)
+    return [(recipe["id"], score) for recipe, score in matches], {recipe["id"]: recipe for recipe, _ in matches}
+
+async def rank_pantry_batch(index: IngredientIndex,
+                            pantries: List[Tuple[List[str], Optional[int]]]) -> List[List[Tuple[str, float]]]:
+    """Rank pantries on the scoring pool; overload and missed deadlines become 503s"""
+    try:
+        return await scoring_pool.rank(index, pantries, SUGGESTION_ENGINES[SUGGESTION_ENGINE])
+    except (Overloaded, DeadlineExceeded) as e:
+        raise HTTPException(status_code=503, detail=str(e),
+                            headers={"Retry-After": str(SUGGESTION_RETRY_AFTER)}) from None
+
+# Rankings redone after dropping winners that turn out to be deleted, before answering short
+STALE_RANK_ATTEMPTS = 3
+
+async def rank_and_fetch(pantries: List[Tuple[List[str], Optional[int]]],
+                         projection: dict) -> Tuple[List[List[Tuple[str, float]]], Dict[str, dict]]:
+    """Rank pantries on the in-memory index and load the winning recipes.
+    
+    A winner the collection no longer has was deleted without this worker
+    hearing of it (e.g. a shared catalog file older than the delete). It is
+    dropped from the index and the pantries are ranked again, so the
+    response is not left short by rows that no longer exist.
+    """
+    for attempt in range(STALE_RANK_ATTEMPTS):
+        index = await current_index(ingredient_index)
+        batch_ranked = await rank_pantry_batch(index, pantries)
+        winner_ids = list(dict.fromkeys(recipe_id for ranked in batch_ranked for recipe_id, _ in ranked))
+        recipes_by_id = await fetch_recipes_by_id(winner_ids, projection)
+        deleted = [recipe_id for recipe_id in winner_ids if recipe_id not in recipes_by_id]
+        if not deleted:
+            break
+        logger.info("Dropping %s deleted recipes from the ingredient index", len(deleted))
+        for recipe_id in deleted:
+            ingredient_index.remove(recipe_id)
+        invalidate_suggestions()
+    return batch_ranked, recipes_by_id
+
+@app.on_event("shutdown")
+async def shutdown_scoring_pool():
+    scoring_pool.shutdown()
+
+def cache_metrics():
+    """Hit/miss counters for every response cache, read at scrape time"""
+    hits = Counter("recipecore_cache_hits_total", "Cache lookups answered from the cache", ("cache",))
+    misses = Counter("recipecore_cache_misses_total", "Cache lookups that had to load", ("cache",))
+    ratio = Gauge("recipecore_cache_hit_ratio", "Share of lookups answered from the cache", ("cache",))
+    caches = {
+        "youtube": youtube_cache.stats,
+        "recipe": recipe_cache.stats,
+        "suggestions": suggestion_cache.stats,
+        "recipe_fragments": recipe_fragments.stats,
+        **{f"featured_{view}": response.stats for view, response in featured_responses.items()},
+    }
+    for name, stats in caches.items():
+        hits.inc(stats.hits + stats.stale_hits, cache=name)
+        misses.inc(stats.misses, cache=name)
+        ratio.set(stats.hit_ratio, cache=name)
+    normalized = normalize_ingredient.cache_info()
+    lookups = normalized.hits + normalized.misses
+    hits.inc(normalized.hits, cache="normalize_ingredient")
+    misses.inc(normalized.misses, cache="normalize_ingredient")
+    ratio.set(normalized.hits / lookups if lookups else 0.0, cache="normalize_ingredient")
+    return [hits, misses, ratio]
+
+def scoring_metrics():
+    """Suggestion scoring pool occupancy and shed load"""
+    admitted = Gauge("recipecore_scoring_requests_admitted", "Suggestion requests running or queued for scoring")
+    rejected = Counter("recipecore_scoring_rejected_total", "Suggestion requests turned away by a full queue")
+    timed_out = Counter("recipecore_scoring_timeouts_total", "Suggestion requests that missed their deadline")
+    admitted.set(scoring_pool.admitted)
+    rejected.inc(scoring_pool.rejected)
+    timed_out.inc(scoring_pool.timed_out)
+    return [admitted, rejected, timed_out]
+
+def pantry_metrics():
+    """Live saved-pantry match streams and what they were sent"""
+    subscribers = Gauge("recipecore_pantry_stream_subscribers", "Open saved-pantry match streams")
+    delivered = Counter("recipecore_pantry_matches_total", "Recipe matches queued for pantry streams")
+    dropped = Counter("recipecore_pantry_matches_dropped_total", "Matches dropped because a stream fell behind")
+    subscribers.set(pantry_notifier.subscribers)
+    delivered.inc(pantry_notifier.delivered)
+    dropped.inc(pantry_notifier.dropped)
+    return [subscribers, delivered, dropped]
+
+metrics_registry.add_collector(cache_metrics)
+metrics_registry.add_collector(scoring_metrics)
+metrics_registry.add_collector(pantry_metrics)
 
 # API Routes
 
@@ -207,107 +745,299 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "message": "RecipeCore API is running"}
 
+@app.get("/api/metrics")
+async def get_metrics():
+    """Prometheus text exposition of request, Mongo, YouTube and cache metrics"""
+    return Response(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
 # YouTube endpoints
 @app.get("/api/youtube/search")
-async def search_youtube(q: str, max_results: int = 10):
+async def search_youtube(q: str, response: Response, max_results: int = 10):
     """Search YouTube videos for cooking content"""
-    videos = search_youtube_videos(q, max_results)
+    videos, cache_status = await search_youtube_videos(q, max_results)
+    response.headers["X-Cache"] = cache_status
     return {"videos": videos}
 
 @app.get("/api/youtube/video/{video_id}")
-async def get_youtube_video(video_id: str):
+async def get_youtube_video(video_id: str, response: Response):
     """Get details for a specific YouTube video"""
-    video = get_video_details(video_id)
+    video, cache_status = await get_video_details(video_id)
+    response.headers["X-Cache"] = cache_status
     return {"video": video}
 
+@app.get("/api/youtube/videos")
+async def get_youtube_videos(ids: str):
+    """Get details for several videos at once (comma-separated ids)"""
+    video_ids = list(dict.fromkeys(video_id.strip() for video_id in ids.split(",") if video_id.strip()))
+    if not video_ids:
+        raise HTTPException(status_code=400, detail="Please provide at least one video id")
+    if len(video_ids) > 4 * MAX_VIDEO_IDS_PER_REQUEST:
+        raise HTTPException(status_code=400, detail=f"At most {4 * MAX_VIDEO_IDS_PER_REQUEST} video ids per call")
+    
+    videos = await get_videos_details(video_ids)
+    return {"videos": [videos[video_id] for video_id in video_ids if video_id in videos]}
+
+@app.get("/api/youtube/cache/stats")
+async def get_youtube_cache_stats():
+    """Hit/miss counters and hit ratio for the YouTube response cache"""
+    return {"entries": len(youtube_cache.local), **youtube_cache.stats.as_dict()}
+
 # Recipe CRUD endpoints
 @app.post("/api/recipes", response_model=Recipe)
 async def create_recipe(recipe: RecipeCreate):
     """Create a new recipe"""
-    recipe_data = Recipe(**recipe.dict()).dict()
+    recipe_data = recipe_document(Recipe(**recipe.dict()))
     result = await recipes_collection.insert_one(recipe_data)
     
     if not result.inserted_id:
         raise HTTPException(status_code=500, detail="Failed to create recipe")
     
-    created_recipe = await recipes_collection.find_one({"id": recipe_data["id"]})
-    return Recipe(**created_recipe)
+    # The inserted document is exactly recipe_data, so answer without reading it back
+    index_recipe(recipe_data)
+    return Recipe(**recipe_data)
 
 @app.get("/api/recipes")
-async def get_recipes(skip: int = 0, limit: int = 20, search: Optional[str] = None):
-    """Get all recipes with optional search"""
-    filter_query = {}
+async def get_recipes(request: Request, skip: int = 0, limit: int = 20, search: Optional[str] = None,
+                      cursor: Optional[str] = None, view: RecipeView = "full"):
+    """Get all recipes with optional search.
+    
+    Browsing pages newest first; pass the returned ``next_cursor`` as ``cursor``
+    to continue from the last recipe seen instead of skipping over earlier pages.
+    ``view=summary`` returns only the fields a recipe card shows. Pages larger
+    than ``LIST_STREAM_THRESHOLD`` are streamed, and ``Accept: application/x-ndjson``
+    streams the recipes one per line (without ``next_cursor``).
+    """
+    model, projection = RECIPE_VIEWS[view]
+    ndjson = wants_ndjson(request)
     
     if search:
-        filter_query = {
-            "$or": [
-                {"title": {"$regex": search, "$options": "i"}},
-                {"description": {"$regex": search, "$options": "i"}},
-                {"cuisine": {"$regex": search, "$options": "i"}},
-                {"ingredients": {"$elemMatch": {"$regex": search, "$options": "i"}}}
-            ]
-        }
+        # Ranked token search over title, description, cuisine and ingredients
+        index = await current_index(search_index)
+        recipe_ids, _ = index.search(search, skip=max(skip, 0), limit=max(limit, 0))
+        recipes_by_id = await fetch_recipes_by_id(recipe_ids, projection)
+        recipes = [recipes_by_id[recipe_id] for recipe_id in recipe_ids if recipe_id in recipes_by_id]
+        if ndjson or limit > LIST_STREAM_THRESHOLD:
+            async def ranked_recipes():
+                for recipe in recipes:
+                    yield recipe
+            return recipe_list_response(ranked_recipes(), model, ndjson)
+        return json_response(json_object([("recipes", json_array(recipe_fragments.encode(model, recipe)
+                                                                  for recipe in recipes))]))
     
-    cursor = recipes_collection.find(filter_query).skip(skip).limit(limit).sort("created_at", -1)
-    recipes = await cursor.to_list(length=limit)
+    filter_query = {}
+    if cursor:
+        try:
+            filter_query = after_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
     
-    return {"recipes": [Recipe(**recipe) for recipe in recipes]}
+    db_cursor = recipes_collection.find(filter_query, projection).sort(RECIPE_LIST_SORT).limit(limit)
+    if not cursor:
+        db_cursor = db_cursor.skip(skip)
+    if ndjson or limit > LIST_STREAM_THRESHOLD:
+        return recipe_list_response(db_cursor, model, ndjson, page_size=limit)
+    recipes = await db_cursor.to_list(length=limit)
+    
+    next_cursor = encode_cursor(recipes[-1]) if recipes and len(recipes) == limit else None
+    return json_response(json_object([
+        ("recipes", json_array(recipe_fragments.encode(model, recipe) for recipe in recipes)),
+        ("next_cursor", dumps(next_cursor)),
+    ]))
+
+# Bulk import/export (must come before parameterized routes)
+@app.post("/api/recipes/import")
+async def import_recipes(request: Request):
+    """Import recipes from a streamed NDJSON body, one recipe per line.
+    
+    Lines are validated and written in unordered batches; invalid or rejected
+    lines are reported by line number without stopping the import, as are
+    lines longer than ``BULK_MAX_LINE_BYTES``. Lines may
+    carry ``id`` and timestamps (e.g. from an export) or omit them. Write
+    errors surface when their batch is flushed, after later lines have been
+    validated, so the lowest ``BULK_MAX_REPORTED_ERRORS`` lines are kept and
+    reported in line order.
+    """
+    inserted = 0
+    failed = 0
+    # Max-heap on line number: the first entry is the latest reported line
+    errors: List[Tuple[int, int, Any]] = []
+    
+    def report(line_number: int, detail):
+        nonlocal failed
+        failed += 1
+        entry = (-line_number, failed, detail)
+        if len(errors) < BULK_MAX_REPORTED_ERRORS:
+            heapq.heappush(errors, entry)
+        elif errors and line_number < -errors[0][0]:
+            heapq.heapreplace(errors, entry)
+    
+    async def flush(batch: List[Tuple[int, dict]]):
+        nonlocal inserted
+        documents = [document for _, document in batch]
+        rejected = {}
+        try:
+            await recipes_collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            rejected = {error["index"]: error.get("errmsg", "Write failed") for error in e.details.get("writeErrors", [])}
+        for position, (line_number, document) in enumerate(batch):
+            if position in rejected:
+                report(line_number, rejected[position])
+            else:
+                inserted += 1
+                index_recipe(document)
+    
+    batch: List[Tuple[int, dict]] = []
+    async for line_number, line in iter_ndjson_lines(request.stream(), BULK_MAX_LINE_BYTES):
+        if line is None:
+            report(line_number, f"Line longer than {BULK_MAX_LINE_BYTES} bytes")
+            continue
+        try:
+            payload = json.loads(line)
+        except ValueError as e:
+            report(line_number, f"Invalid JSON: {str(e)}")
+            continue
+        try:
+            recipe = Recipe.model_validate(payload)
+        except ValidationError as e:
+            report(line_number, e.errors(include_url=False, include_context=False))
+            continue
+        batch.append((line_number, recipe_document(recipe)))
+        if len(batch) >= BULK_BATCH_SIZE:
+            await flush(batch)
+            batch = []
+    if batch:
+        await flush(batch)
+    
+    return {
+        "inserted": inserted,
+        "failed": failed,
+        "errors": [{"line": -line, "detail": detail} for line, _, detail in sorted(errors, reverse=True)],
+    }
+
+@app.get("/api/recipes/export")
+async def export_recipes():
+    """Stream every recipe as NDJSON, oldest first, without loading the collection"""
+    async def stream():
+        cursor = recipes_collection.find({}, EXPORT_PROJECTION).sort("created_at", 1).batch_size(BULK_BATCH_SIZE)
+        async for recipe in cursor:
+            yield ndjson_line(recipe)
+    
+    return StreamingResponse(
+        stream(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="recipes.ndjson"'},
+    )
 
 # Featured/trending recipes (must come before parameterized routes)
 @app.get("/api/recipes/featured")
-async def get_featured_recipes():
-    """Get featured recipes (most recent for now)"""
-    cursor = recipes_collection.find({}).sort("created_at", -1).limit(6)
-    recipes = await cursor.to_list(length=6)
+async def get_featured_recipes(request: Request, view: RecipeView = "full"):
+    """Get featured recipes (most recent for now).
     
-    return {"recipes": [Recipe(**recipe) for recipe in recipes]}
+    Served from pre-rendered bytes rebuilt after writes; a matching
+    ``If-None-Match`` gets a 304 without touching the database.
+    """
+    body, etag, status = await featured_responses[view].get()
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "X-Cache": status}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return json_response(body, headers=headers)
 
 # Smart recipe suggestions endpoint (must come before parameterized routes)
-@app.post("/api/recipes/suggestions")
-async def get_recipe_suggestions(request: IngredientSuggestionRequest):
-    """Get recipe suggestions based on available ingredients"""
+@app.post("/api/recipes/suggestions", response_model=RecipeSuggestionList)
+async def get_recipe_suggestions(request: IngredientSuggestionRequest, view: RecipeView = "full"):
+    """Get recipe suggestions based on available ingredients.
+    
+    The rendered body is cached under the normalized pantry, so the same
+    ingredients in any order or casing share one scoring pass until the next
+    recipe write; identical concurrent misses wait for the same pass.
+    """
     if not request.available_ingredients:
         raise HTTPException(status_code=400, detail="Please provide at least one ingredient")
     
-    # Get all recipes from database
-    cursor = recipes_collection.find({})
-    all_recipes = await cursor.to_list(length=None)
+    async def load() -> bytes:
+        if SUGGESTION_ENGINE == MONGO_SUGGESTION_ENGINE:
+            ranked, recipes_by_id = await rank_in_mongo(
+                request.available_ingredients, request.max_results, suggestion_projection(view)
+            )
+        else:
+            # Rank only recipes that share at least one ingredient, then fetch the winners only
+            [ranked], recipes_by_id = await rank_and_fetch(
+                [(request.available_ingredients, request.max_results)], suggestion_projection(view)
+            )
+        return json_object([
+            ("suggestions", build_suggestions(ranked, recipes_by_id, request.available_ingredients, view)),
+        ])
     
-    suggestions = []
+    key = (catalog_version, pantry_key(request.available_ingredients), request.max_results, view)
+    body, status = await suggestion_cache.get_or_load(key, load)
+    return json_response(body, headers={"X-Cache": status})
+
+@app.post("/api/recipes/suggestions/batch")
+async def get_recipe_suggestions_batch(payloads: List[Any]):
+    """Get recipe suggestions for many pantries in one call.
     
-    for recipe_data in all_recipes:
-        recipe = Recipe(**recipe_data)
-        match_score, matching_ingredients, missing_ingredients = calculate_recipe_match(
-            recipe.ingredients, request.available_ingredients
-        )
-        
-        # Only include recipes with at least 20% ingredient match
-        if match_score >= 0.2:
-            suggestion = RecipeSuggestion(
-                recipe=recipe,
-                match_score=match_score,
-                matching_ingredients=matching_ingredients,
-                missing_ingredients=missing_ingredients
-            )
-            suggestions.append(suggestion)
+    Each entry is an ingredient suggestion request; results come back in the
+    same order, and an invalid entry yields an error without failing the batch.
+    """
+    results: List[Optional[bytes]] = [None] * len(payloads)
+    pending = []
     
-    # Sort by match score (highest first)
-    suggestions.sort(key=lambda x: x.match_score, reverse=True)
+    for position, payload in enumerate(payloads):
+        try:
+            item = IngredientSuggestionRequest.model_validate(payload)
+        except ValidationError as e:
+            results[position] = dumps({"error": {"status_code": 422, "detail": e.errors(include_url=False, include_context=False)}})
+            continue
+        if not item.available_ingredients:
+            results[position] = dumps({"error": {"status_code": 400, "detail": "Please provide at least one ingredient"}})
+            continue
+        pending.append((position, item))
     
-    # Limit results
-    suggestions = suggestions[:request.max_results]
+    batch_ranked: List[List[Tuple[str, float]]] = []
+    recipes_by_id: Dict[str, dict] = {}
+    if pending and SUGGESTION_ENGINE == MONGO_SUGGESTION_ENGINE:
+        semaphore = asyncio.Semaphore(SUGGESTION_BATCH_MONGO_CONCURRENCY)
+        
+        async def rank_one(item: IngredientSuggestionRequest):
+            async with semaphore:
+                return await rank_in_mongo(item.available_ingredients, item.max_results, suggestion_projection("full"))
+        
+        pipelines = await asyncio.gather(*[rank_one(item) for _, item in pending])
+        batch_ranked = [ranked for ranked, _ in pipelines]
+        recipes_by_id = {recipe_id: recipe for _, recipes in pipelines for recipe_id, recipe in recipes.items()}
+    elif pending:
+        pantries = [(item.available_ingredients, item.max_results) for _, item in pending]
+        batch_ranked, recipes_by_id = await rank_and_fetch(pantries, suggestion_projection("full"))
     
-    return {"suggestions": suggestions}
+    for (position, item), ranked in zip(pending, batch_ranked):
+        try:
+            suggestions = build_suggestions(ranked, recipes_by_id, item.available_ingredients)
+        except Exception as e:
+            results[position] = dumps({"error": {"status_code": 500, "detail": f"Failed to build suggestions: {str(e)}"}})
+            continue
+        results[position] = json_object([("suggestions", suggestions)])
+    
+    return json_response(json_object([("results", json_array(results))]))
 
 @app.get("/api/recipes/{recipe_id}", response_model=Recipe)
-async def get_recipe(recipe_id: str):
-    """Get a specific recipe by ID"""
-    recipe = await recipes_collection.find_one({"id": recipe_id})
+async def get_recipe(recipe_id: str, request: Request, response: Response):
+    """Get a specific recipe by ID.
     
-    if not recipe:
-        raise HTTPException(status_code=404, detail="Recipe not found")
+    Served through the recipe cache; the ``ETag`` tracks ``updated_at``, so a
+    matching ``If-None-Match`` gets a 304.
+    """
+    async def load():
+        recipe = await recipes_collection.find_one({"id": recipe_id}, EXPORT_PROJECTION)
+        if not recipe:
+            raise HTTPException(status_code=404, detail="Recipe not found")
+        return Recipe(**recipe)
     
-    return Recipe(**recipe)
+    recipe, status = await recipe_cache.get_or_load(recipe_cache_key(recipe_id), load)
+    headers = {"ETag": recipe_etag(recipe), "Cache-Control": "no-cache", "X-Cache": status}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return recipe
 
 @app.put("/api/recipes/{recipe_id}", response_model=Recipe)
 async def update_recipe(recipe_id: str, recipe_update: RecipeUpdate):
@@ -318,16 +1048,21 @@ async def update_recipe(recipe_id: str, recipe_update: RecipeUpdate):
         raise HTTPException(status_code=400, detail="No update data provided")
     
     update_data["updated_at"] = datetime.now(timezone.utc)
+    if "ingredients" in update_data:
+        update_data.update(derived_fields(update_data["ingredients"]))
     
-    result = await recipes_collection.update_one(
+    # One atomic round-trip that returns the document as written
+    updated_recipe = await recipes_collection.find_one_and_update(
         {"id": recipe_id},
-        {"$set": update_data}
+        {"$set": update_data},
+        return_document=ReturnDocument.AFTER
     )
     
-    if result.matched_count == 0:
+    if updated_recipe is None:
         raise HTTPException(status_code=404, detail="Recipe not found")
     
-    updated_recipe = await recipes_collection.find_one({"id": recipe_id})
+    await recipe_cache.invalidate(recipe_cache_key(recipe_id))
+    index_recipe(updated_recipe)
     return Recipe(**updated_recipe)
 
 @app.delete("/api/recipes/{recipe_id}")
@@ -338,8 +1073,94 @@ async def delete_recipe(recipe_id: str):
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Recipe not found")
     
+    await recipe_cache.invalidate(recipe_cache_key(recipe_id))
+    unindex_recipe(recipe_id)
     return {"message": "Recipe deleted successfully"}
 
+# Saved pantries and their match streams
+@app.post("/api/pantries", response_model=Pantry)
+async def create_pantry(pantry: PantryCreate):
+    """Save a pantry; open its match stream to hear about recipes added for it"""
+    pantry_data = Pantry(**pantry.dict()).dict()
+    await pantries_collection.insert_one(pantry_data)
+    return Pantry(**pantry_data)
+
+@app.get("/api/pantries/{pantry_id}", response_model=Pantry)
+async def get_pantry(pantry_id: str):
+    """Get a saved pantry by ID"""
+    pantry = await pantries_collection.find_one({"id": pantry_id}, {"_id": 0})
+    if not pantry:
+        raise HTTPException(status_code=404, detail="Pantry not found")
+    return Pantry(**pantry)
+
+@app.put("/api/pantries/{pantry_id}", response_model=Pantry)
+async def update_pantry(pantry_id: str, pantry_update: PantryUpdate):
+    """Update a saved pantry; open match streams score later recipes against the new ingredients"""
+    update_data = {k: v for k, v in pantry_update.dict().items() if v is not None}
+    
+    if not update_data:
+        raise HTTPException(status_code=400, detail="No update data provided")
+    
+    update_data["updated_at"] = datetime.now(timezone.utc)
+    updated_pantry = await pantries_collection.find_one_and_update(
+        {"id": pantry_id},
+        {"$set": update_data},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    
+    if updated_pantry is None:
+        raise HTTPException(status_code=404, detail="Pantry not found")
+    
+    pantry_notifier.update(updated_pantry)
+    return Pantry(**updated_pantry)
+
+@app.delete("/api/pantries/{pantry_id}")
+async def delete_pantry(pantry_id: str):
+    """Delete a saved pantry and end its open match streams"""
+    result = await pantries_collection.delete_one({"id": pantry_id})
+    
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Pantry not found")
+    
+    pantry_notifier.close(pantry_id)
+    return {"message": "Pantry deleted successfully"}
+
+@app.get("/api/pantries/{pantry_id}/matches")
+async def stream_pantry_matches(pantry_id: str):
+    """Stream recipes created or updated from now on that match a saved pantry, as Server-Sent Events.
+    
+    Each ``match`` event carries a recipe suggestion (summary view) scored
+    against the pantry. Only the new or edited recipe is scored, never the
+    whole catalog; idle streams get a keep-alive comment every
+    ``PANTRY_STREAM_HEARTBEAT`` seconds, and deleting the pantry ends them.
+    """
+    pantry = await pantries_collection.find_one({"id": pantry_id}, {"_id": 0})
+    if not pantry:
+        raise HTTPException(status_code=404, detail="Pantry not found")
+    
+    async def events():
+        queue = pantry_notifier.subscribe(pantry)
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), PANTRY_STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                if item is None:
+                    return
+                recipe, (_, match_score, matching, missing) = item
+                yield sse_event("match", encode_suggestion(recipe, match_score, matching, missing, view="summary"))
+        finally:
+            pantry_notifier.unsubscribe(pantry_id, queue)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
@@ -0,0 +1,476 @@
+import asyncio
+import json
+import logging
+import mmap
+import os
+import time
+import zlib
+from collections import abc
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from catalog import load_ingredient_index
+from matching import DERIVED_SCHEMA_VERSION, IngredientIndex, IngredientMatcher, normalize_ingredients, stored_normalized
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single worker, no cross-process lock needed
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"RCCAT001"
+POINTER_NAME = "CURRENT"
+LOCK_NAME = "publish.lock"
+ALIGNMENT = 8
+# Writes are committed before they are applied locally, so a scan that starts
+# after that moment sees them; the margin covers clock differences between processes
+CLOCK_SKEW = 1.0
+
+
+def _id_hash(key: bytes) -> int:
+    return zlib.crc32(key)
+
+
+def _packed_strings(values: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    encoded = [value.encode() for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def write_catalog(path: str, recipe_ids: Sequence[str], normalized: Sequence[List[str]],
+                  version: int, as_of: float):
+    """Write an index as an array-backed catalog file.
+
+    Rows are recipes in index order. ``indptr``/``indices`` hold each row's
+    normalized ingredients as vocabulary ids (duplicates kept, like the
+    Python scorer); ``postings`` maps each vocabulary id to the sorted rows
+    containing it; ``id_table`` is an open-addressing hash of recipe ids to
+    rows, so lookups need no per-worker dictionary.
+    """
+    vocabulary: Dict[str, int] = {}
+    indptr = np.zeros(len(recipe_ids) + 1, dtype=np.int64)
+    indices: List[int] = []
+    postings: List[List[int]] = []
+    for row, names in enumerate(normalized):
+        for name in names:
+            indices.append(vocabulary.setdefault(name, len(vocabulary)))
+        for vocabulary_id in dict.fromkeys(indices[indptr[row]:]):
+            if vocabulary_id == len(postings):
+                postings.append([])
+            postings[vocabulary_id].append(row)
+        indptr[row + 1] = len(indices)
+
+    id_offsets, id_bytes = _packed_strings(recipe_ids)
+    vocabulary_offsets, vocabulary_bytes = _packed_strings(list(vocabulary))
+    table = np.full(max(2, 1 << (2 * len(recipe_ids)).bit_length()), -1, dtype=np.int32)
+    mask = len(table) - 1
+    for row, recipe_id in enumerate(recipe_ids):
+        slot = _id_hash(recipe_id.encode()) & mask
+        while table[slot] >= 0:
+            slot = (slot + 1) & mask
+        table[slot] = row
+
+    posting_lengths = [len(rows) for rows in postings]
+    postings_indptr = np.zeros(len(postings) + 1, dtype=np.int64)
+    np.cumsum(posting_lengths, out=postings_indptr[1:])
+    row_lengths = np.diff(indptr)
+    arrays = {
+        "id_offsets": id_offsets,
+        "id_bytes": id_bytes,
+        "vocabulary_offsets": vocabulary_offsets,
+        "vocabulary_bytes": vocabulary_bytes,
+        "indptr": indptr,
+        "indices": np.asarray(indices, dtype=np.int32),
+        "rows": np.repeat(np.arange(len(recipe_ids), dtype=np.int32), row_lengths),
+        "postings_indptr": postings_indptr,
+        "postings": np.asarray([row for rows in postings for row in rows], dtype=np.int32),
+        "id_table": table,
+    }
+
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = {"offset": offset, "dtype": array.dtype.str, "length": len(array)}
+        offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+    header = json.dumps({
+        "version": version,
+        "as_of": as_of,
+        "derived_version": DERIVED_SCHEMA_VERSION,
+        "recipes": len(recipe_ids),
+        "arrays": layout,
+    }).encode()
+    header += b" " * (-(len(MAGIC) + 8 + len(header)) % ALIGNMENT)
+
+    with open(path, "wb") as handle:
+        handle.write(MAGIC)
+        handle.write(len(header).to_bytes(8, "little"))
+        handle.write(header)
+        for array in arrays.values():
+            handle.write(array.tobytes())
+            handle.write(b"\0" * (-array.nbytes % ALIGNMENT))
+        handle.flush()
+        os.fsync(handle.fileno())
+
+
+class MappedCatalog:
+    """Read-only view of a catalog file; every array is a zero-copy view of the mapping.
+
+    Only the ingredient vocabulary is decoded into Python strings. Pickles as
+    its path, so worker processes map the same file instead of copying it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as handle:
+            self._buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._buffer[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a catalog file")
+        header_length = int.from_bytes(self._buffer[len(MAGIC):len(MAGIC) + 8], "little")
+        data_start = len(MAGIC) + 8 + header_length
+        header = json.loads(self._buffer[len(MAGIC) + 8:data_start])
+        self.version: int = header["version"]
+        self.as_of: float = header["as_of"]
+        self.derived_version: int = header["derived_version"]
+
+        for name, spec in header["arrays"].items():
+            setattr(self, name, np.frombuffer(self._buffer, dtype=np.dtype(spec["dtype"]),
+                                              count=spec["length"], offset=data_start + spec["offset"]))
+        self._ids_start = data_start + header["arrays"]["id_bytes"]["offset"]
+        self.vocabulary = [
+            self.vocabulary_bytes[start:end].tobytes().decode()
+            for start, end in zip(self.vocabulary_offsets[:-1].tolist(), self.vocabulary_offsets[1:].tolist())
+        ]
+        self.recipe_ids = _RecipeIds(self)
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+    def __reduce__(self):
+        return MappedCatalog, (self.path,)
+
+    def _id_bytes(self, row: int) -> bytes:
+        start, end = self.id_offsets[row:row + 2].tolist()
+        return self._buffer[self._ids_start + start:self._ids_start + end]
+
+    def recipe_id(self, row: int) -> str:
+        return self._id_bytes(row).decode()
+
+    def row(self, recipe_id: str) -> Optional[int]:
+        """Row of ``recipe_id``, or None when it is not in the file"""
+        key = recipe_id.encode()
+        mask = len(self.id_table) - 1
+        slot = _id_hash(key) & mask
+        while True:
+            row = int(self.id_table[slot])
+            if row < 0:
+                return None
+            if self._id_bytes(row) == key:
+                return row
+            slot = (slot + 1) & mask
+
+    def normalized(self, row: int) -> List[str]:
+        start, end = self.indptr[row:row + 2].tolist()
+        vocabulary = self.vocabulary
+        return [vocabulary[name] for name in self.indices[start:end].tolist()]
+
+    def candidate_rows(self, matcher: IngredientMatcher) -> np.ndarray:
+        """Sorted rows sharing at least one ingredient with the request"""
+        parts = [
+            self.postings[self.postings_indptr[position]:self.postings_indptr[position + 1]]
+            for position, name in enumerate(self.vocabulary) if matcher.matches(name)
+        ]
+        if not parts:
+            return np.empty(0, dtype=np.int32)
+        return np.unique(np.concatenate(parts))
+
+
+class _RecipeIds(abc.Sequence):
+    """Recipe ids by row, decoded on access"""
+
+    def __init__(self, catalog: MappedCatalog):
+        self._catalog = catalog
+
+    def __len__(self) -> int:
+        return len(self._catalog)
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self._catalog.recipe_id(position) for position in range(*row.indices(len(self)))]
+        return self._catalog.recipe_id(int(row))
+
+
+class SharedIngredientIndex:
+    """``IngredientIndex`` over a shared catalog file plus this worker's writes since it was taken.
+
+    Reads merge the mapped rows with a small local overlay: recipes written
+    here replace their row in place (keeping its rank order, as an update
+    does in ``IngredientIndex``), deletes hide rows, new recipes follow the
+    last row. ``rebase`` moves to a newer file and drops the local changes
+    its scan already contains.
+    """
+
+    PROJECTION = IngredientIndex.PROJECTION
+
+    def __init__(self, catalog: Optional[MappedCatalog] = None):
+        self.catalog = catalog
+        self.version = 0
+        # recipe id -> (applied at, normalized ingredients or None for a delete)
+        self._changes: Dict[str, Tuple[float, Optional[List[str]]]] = {}
+        self._overlay = IngredientIndex()
+        self._hidden: Set[int] = set()
+        self._in_place: Dict[str, int] = {}
+
+    @property
+    def pristine(self) -> bool:
+        """True when every read is served straight from the file"""
+        return not self._hidden and not len(self._overlay)
+
+    def rebase(self, catalog: MappedCatalog):
+        """Switch to ``catalog``, keeping only the changes made after its scan started"""
+        changes = self._changes
+        self.catalog = catalog
+        self._changes = {}
+        self._overlay = IngredientIndex()
+        self._hidden = set()
+        self._in_place = {}
+        for recipe_id, (applied_at, normalized) in changes.items():
+            if applied_at < catalog.as_of - CLOCK_SKEW:
+                continue
+            self._changes[recipe_id] = (applied_at, normalized)
+            if normalized is None:
+                self._remove(recipe_id)
+            else:
+                self._add(recipe_id, normalized)
+        self.version += 1
+
+    def frozen(self) -> "SharedIngredientIndex":
+        """Copy that later writes do not touch, sharing the mapped file; cheap to pickle"""
+        copy = SharedIngredientIndex(self.catalog)
+        copy.version = self.version
+        copy._changes = dict(self._changes)
+        for recipe_id in self._overlay.recipe_ids():
+            normalized = self._overlay.normalized(recipe_id)
+            copy._overlay.add(recipe_id, normalized, normalized)
+        copy._hidden = set(self._hidden)
+        copy._in_place = dict(self._in_place)
+        return copy
+
+    def _base_row(self, recipe_id: str) -> Optional[int]:
+        if self.catalog is None:
+            return None
+        row = self.catalog.row(recipe_id)
+        return None if row is None or row in self._hidden else row
+
+    def __len__(self) -> int:
+        base = len(self.catalog) if self.catalog is not None else 0
+        return base - len(self._hidden) + len(self._overlay)
+
+    def __contains__(self, recipe_id: str) -> bool:
+        return recipe_id in self._overlay or self._base_row(recipe_id) is not None
+
+    def add(self, recipe_id: str, ingredients: List[str], normalized: Optional[List[str]] = None):
+        if normalized is None or len(normalized) != len(ingredients):
+            normalized = normalize_ingredients(ingredients)
+        self._changes[recipe_id] = (time.time(), normalized)
+        self._add(recipe_id, normalized)
+        self.version += 1
+
+    def _add(self, recipe_id: str, normalized: List[str]):
+        if recipe_id not in self._overlay:
+            row = self._base_row(recipe_id)
+            if row is not None:
+                self._hidden.add(row)
+                self._in_place[recipe_id] = row
+        self._overlay.add(recipe_id, normalized, normalized)
+
+    def add_document(self, doc: dict):
+        normalized = stored_normalized(doc)
+        if normalized is None:
+            normalized = normalize_ingredients(doc.get("ingredients") or [])
+        if doc["id"] in self and self.normalized(doc["id"]) == normalized:
+            return
+        self.add(doc["id"], normalized, normalized)
+
+    def remove(self, recipe_id: str):
+        if recipe_id not in self:
+            return
+        self._changes[recipe_id] = (time.time(), None)
+        self._remove(recipe_id)
+        self.version += 1
+
+    def _remove(self, recipe_id: str):
+        if recipe_id in self._overlay:
+            self._overlay.remove(recipe_id)
+            self._in_place.pop(recipe_id, None)
+            return
+        row = self._base_row(recipe_id)
+        if row is not None:
+            self._hidden.add(row)
+
+    def order(self, recipe_id: str) -> int:
+        if recipe_id in self._in_place:
+            return self._in_place[recipe_id]
+        if recipe_id in self._overlay:
+            return len(self.catalog or ()) + self._overlay.order(recipe_id)
+        row = self._base_row(recipe_id)
+        if row is None:
+            raise KeyError(recipe_id)
+        return row
+
+    def normalized(self, recipe_id: str) -> List[str]:
+        if recipe_id in self._overlay:
+            return self._overlay.normalized(recipe_id)
+        row = self._base_row(recipe_id)
+        if row is None:
+            raise KeyError(recipe_id)
+        return self.catalog.normalized(row)
+
+    def _base_ids(self, rows: Iterable[int]) -> List[Tuple[int, str]]:
+        return [(row, self.catalog.recipe_id(row)) for row in rows if row not in self._hidden]
+
+    def recipe_ids(self) -> List[str]:
+        base = self._base_ids(range(len(self.catalog))) if self.catalog is not None else []
+        return self._merge(base, self._overlay.recipe_ids())
+
+    def candidates(self, matcher: IngredientMatcher) -> List[str]:
+        base = self._base_ids(self.catalog.candidate_rows(matcher).tolist()) if self.catalog is not None else []
+        return self._merge(base, self._overlay.candidates(matcher))
+
+    def _merge(self, base: List[Tuple[int, str]], overlay_ids: List[str]) -> List[str]:
+        if not overlay_ids:
+            return [recipe_id for _, recipe_id in base]
+        merged = base + [(self.order(recipe_id), recipe_id) for recipe_id in overlay_ids]
+        merged.sort()
+        return [recipe_id for _, recipe_id in merged]
+
+
+def updated_since(catalog: MappedCatalog) -> dict:
+    """Query for recipes written since ``catalog``'s scan started; backed by the ``updated_at`` index"""
+    return {"updated_at": {"$gte": datetime.fromtimestamp(catalog.as_of - CLOCK_SKEW, tz=timezone.utc)}}
+
+
+class SharedCatalogStore:
+    """Directory of versioned catalog files with an atomically swapped ``CURRENT`` pointer.
+
+    One worker at a time publishes (under a file lock): it scans the
+    collection, writes ``catalog-<version>.bin`` and replaces the pointer
+    with ``os.replace``, so readers see either the old or the new file,
+    never a partial one. Files mapped by running workers stay readable after
+    they are pruned from the directory.
+    """
+
+    def __init__(self, directory: str, keep: int = 3):
+        self.directory = directory
+        self.keep = keep
+        self._publish_lock = asyncio.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def pointer(self) -> str:
+        return os.path.join(self.directory, POINTER_NAME)
+
+    def pointer_stamp(self) -> Optional[Tuple[int, int]]:
+        """Changes whenever the pointer is swapped; cheap enough to poll"""
+        try:
+            stat = os.stat(self.pointer)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def open_current(self) -> Optional[MappedCatalog]:
+        """Map the file the pointer names; None when nothing usable is published"""
+        try:
+            with open(self.pointer) as handle:
+                name = handle.read().strip()
+            catalog = MappedCatalog(os.path.join(self.directory, name))
+        except (FileNotFoundError, ValueError) as e:
+            if not isinstance(e, FileNotFoundError):
+                logger.warning("Ignoring unreadable catalog file: %s", e)
+            return None
+        if catalog.derived_version != DERIVED_SCHEMA_VERSION:
+            return None
+        return catalog
+
+    async def publish(self, collection, newer_than: float = 0.0) -> MappedCatalog:
+        """Scan ``collection`` into a new catalog version and make it current.
+
+        Skipped when the current file's scan started after ``newer_than``,
+        since it already contains every write made before then.
+        """
+        async with self._publish_lock:
+            lock = await asyncio.to_thread(self._lock_directory)
+            try:
+                current = await asyncio.to_thread(self.open_current)
+                if current is not None and current.as_of > newer_than + CLOCK_SKEW:
+                    return current
+
+                as_of = time.time()
+                index = IngredientIndex()
+                await load_ingredient_index(collection, index)
+                version = (current.version if current is not None else 0) + 1
+                recipe_ids = index.recipe_ids()
+                normalized = [index.normalized(recipe_id) for recipe_id in recipe_ids]
+                del index
+                catalog = await asyncio.to_thread(self._write, recipe_ids, normalized, version, as_of)
+                logger.info("Published catalog version %s (%s recipes)", version, len(recipe_ids))
+                return catalog
+            finally:
+                lock.close()
+
+    async def load(self, collection, index: SharedIngredientIndex):
+        """``LiveIndex`` loader: map the current file, publishing one first if there is none.
+
+        Recipes updated since the file's scan started are read on top, so a
+        snapshot left by a stopped deployment is still safe to start from.
+        Deletes leave no trace to catch up on; when the recipe count shows
+        some, the collection is scanned and published again instead. A
+        delete offset by an insert keeps the count, so its row stays until a
+        suggestion ranks it and finds it gone (``server.rank_and_fetch``).
+        """
+        catalog = await asyncio.to_thread(self.open_current)
+        if catalog is None:
+            catalog = await self.publish(collection)
+        index.rebase(catalog)
+
+        cursor = collection.find(updated_since(catalog), {"_id": 0, "ingredients": 1, **index.PROJECTION})
+        async for doc in cursor:
+            index.add_document(doc)
+
+        if len(index) != await collection.estimated_document_count():
+            index.rebase(await self.publish(collection, newer_than=time.time()))
+
+    def _lock_directory(self):
+        handle = open(os.path.join(self.directory, LOCK_NAME), "a")
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        return handle
+
+    def _write(self, recipe_ids: List[str], normalized: List[List[str]], version: int,
+               as_of: float) -> MappedCatalog:
+        name = f"catalog-{version:08d}.bin"
+        path = os.path.join(self.directory, name)
+        write_catalog(path + ".tmp", recipe_ids, normalized, version, as_of)
+        os.replace(path + ".tmp", path)
+
+        pointer_tmp = self.pointer + ".tmp"
+        with open(pointer_tmp, "w") as handle:
+            handle.write(name)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(pointer_tmp, self.pointer)
+        self._prune(name)
+        return MappedCatalog(path)
+
+    def _prune(self, current: str):
+        published = sorted(name for name in os.listdir(self.directory)
+                           if name.startswith("catalog-") and name.endswith(".bin"))
+        for name in published[:-self.keep]:
+            if name != current:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
@@ -0,0 +1,100 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from matching import IngredientIndex, IngredientMatcher, normalize_ingredients
+from shared_catalog import SharedIngredientIndex
+
+
+class IncidenceMatrix:
+    """Recipe x ingredient-vocabulary incidence matrix in CSR form.
+
+    Row ``i`` holds the vocabulary ids of the i-th indexed recipe's normalized
+    ingredients (duplicates included, so counts match the Python scorer).
+    Scoring a request is one sparse matrix-vector product against the vector
+    of vocabulary names the request's ingredients match. A shared index with
+    no local changes already stores this layout, so its arrays are used as is.
+    """
+
+    def __init__(self, index: IngredientIndex):
+        self.source = index
+        self.version = index.version
+        if isinstance(index, SharedIngredientIndex) and index.catalog is not None and index.pristine:
+            catalog = index.catalog
+            self.recipe_ids = catalog.recipe_ids
+            self.vocabulary = catalog.vocabulary
+            self.indptr = catalog.indptr
+            self.indices = catalog.indices
+            self.row_lengths = np.diff(self.indptr)
+            self.rows = catalog.rows
+            return
+
+        self.recipe_ids = index.recipe_ids()
+
+        vocabulary: Dict[str, int] = {}
+        indptr = [0]
+        indices: List[int] = []
+        for recipe_id in self.recipe_ids:
+            for name in index.normalized(recipe_id):
+                indices.append(vocabulary.setdefault(name, len(vocabulary)))
+            indptr.append(len(indices))
+
+        self.vocabulary = list(vocabulary)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.row_lengths = np.diff(self.indptr)
+        # Row number of every stored entry, for the bincount-based product
+        self.rows = np.repeat(np.arange(len(self.recipe_ids)), self.row_lengths)
+
+    def is_current(self, index: IngredientIndex) -> bool:
+        return self.source is index and self.version == index.version
+
+    def scores(self, matcher: IngredientMatcher) -> np.ndarray:
+        """Match score of every row against one request"""
+        hits = np.fromiter(
+            (matcher.matches(name) for name in self.vocabulary),
+            dtype=np.float64,
+            count=len(self.vocabulary),
+        )
+        matched = np.bincount(self.rows, weights=hits[self.indices], minlength=len(self.recipe_ids))
+        scores = np.zeros(len(self.recipe_ids), dtype=np.float64)
+        np.divide(matched, self.row_lengths, out=scores, where=self.row_lengths > 0)
+        return scores
+
+
+_matrix: Optional[IncidenceMatrix] = None
+
+
+def incidence_matrix(index: IngredientIndex) -> IncidenceMatrix:
+    """Return the matrix for ``index``, rebuilding it after recipe changes"""
+    global _matrix
+    if _matrix is None or not _matrix.is_current(index):
+        _matrix = IncidenceMatrix(index)
+    return _matrix
+
+
+def top_k(scores: np.ndarray, max_results: Optional[int], min_score: float = 0.2) -> np.ndarray:
+    """Row positions of the best scores, ties broken by row order"""
+    eligible = np.flatnonzero(scores >= min_score)
+    bounded = max_results is not None and max_results >= 0
+
+    if bounded and eligible.size > max_results:
+        if max_results == 0:
+            return eligible[:0]
+        eligible_scores = scores[eligible]
+        best = np.argpartition(-eligible_scores, max_results - 1)[:max_results]
+        # Keep every row tied with the K-th score so row order decides among them
+        kth_score = eligible_scores[best].min()
+        eligible = eligible[eligible_scores >= kth_score]
+
+    ranked = eligible[np.lexsort((eligible, -scores[eligible]))]
+    return ranked[:max_results]
+
+
+def vector_top_matches(index: IngredientIndex, available_ingredients: List[str],
+                       max_results: Optional[int], min_score: float = 0.2) -> List[Tuple[str, float]]:
+    """Vectorized equivalent of ``matching.top_matches``"""
+    matrix = incidence_matrix(index)
+    matcher = IngredientMatcher(normalize_ingredients(available_ingredients))
+    scores = matrix.scores(matcher)
+    return [(matrix.recipe_ids[row], float(scores[row])) for row in top_k(scores, max_results, min_score)]
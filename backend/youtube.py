@@ -0,0 +1,254 @@
+import asyncio
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+import httpx
+from fastapi import HTTPException
+from pydantic import BaseModel
+
+DEFAULT_YOUTUBE_API_BASE_URL = "https://www.googleapis.com/youtube/v3"
+# Upper bound on ids per ``videos`` request imposed by the Data API
+MAX_VIDEO_IDS_PER_REQUEST = 50
+
+
+class YouTubeVideo(BaseModel):
+    video_id: str
+    title: str
+    thumbnail: str
+    channel_title: str
+    duration: Optional[str] = None
+
+
+class YouTubeClient:
+    """Async YouTube Data API client sharing one keep-alive connection pool.
+
+    At most ``max_concurrency`` upstream calls run at once; extra callers
+    wait for a slot instead of opening more sockets. ``base_url`` and
+    ``transport`` can be swapped to point the client at a local stub.
+    ``on_call(path, seconds, status)`` is told the latency of every upstream
+    call, with status ``"error"`` when no response arrived.
+    """
+
+    def __init__(self, api_key: Optional[str], base_url: str = DEFAULT_YOUTUBE_API_BASE_URL,
+                 timeout: float = 10.0, max_connections: int = 20, max_concurrency: int = 10,
+                 transport: Optional[httpx.AsyncBaseTransport] = None,
+                 on_call: Optional[Callable[[str, float, str], None]] = None):
+        self.api_key = api_key
+        self.on_call = on_call
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        )
+        self._transport = transport
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=self._limits,
+                transport=self._transport,
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def get(self, path: str, params: dict, timeout: Optional[float] = None) -> dict:
+        """GET an API resource, mapping transport and HTTP failures to a 500"""
+        if not self.api_key:
+            raise HTTPException(status_code=500, detail="YouTube API key not configured")
+
+        try:
+            async with self._semaphore:
+                started = time.perf_counter()
+                status = "error"
+                try:
+                    response = await self.http.get(
+                        path,
+                        params={**params, "key": self.api_key},
+                        timeout=self.timeout if timeout is None else timeout,
+                    )
+                    status = str(response.status_code)
+                finally:
+                    if self.on_call is not None:
+                        self.on_call(path, time.perf_counter() - started, status)
+            response.raise_for_status()
+            return response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            raise HTTPException(status_code=500, detail=f"YouTube API error: {str(e)}")
+
+    async def search_videos(self, query: str, max_results: int = 10,
+                            timeout: Optional[float] = None) -> List[YouTubeVideo]:
+        """Search YouTube videos using the YouTube Data API"""
+        params = {
+            "part": "snippet",
+            "q": query,
+            "type": "video",
+            "maxResults": max_results,
+        }
+        data = await self.get("/search", params, timeout)
+
+        videos = []
+        for item in data.get("items", []):
+            video = YouTubeVideo(
+                video_id=item["id"]["videoId"],
+                title=item["snippet"]["title"],
+                thumbnail=item["snippet"]["thumbnails"]["medium"]["url"],
+                channel_title=item["snippet"]["channelTitle"]
+            )
+            videos.append(video)
+
+        return videos
+
+    async def video_details(self, video_id: str, timeout: Optional[float] = None) -> YouTubeVideo:
+        """Get detailed information about a specific YouTube video"""
+        params = {
+            "part": "snippet,contentDetails",
+            "id": video_id,
+        }
+        data = await self.get("/videos", params, timeout)
+
+        if not data.get("items"):
+            raise HTTPException(status_code=404, detail="Video not found")
+
+        item = data["items"][0]
+        return YouTubeVideo(
+            video_id=video_id,
+            title=item["snippet"]["title"],
+            thumbnail=item["snippet"]["thumbnails"]["medium"]["url"],
+            channel_title=item["snippet"]["channelTitle"],
+            duration=item["contentDetails"]["duration"]
+        )
+
+    async def videos_details(self, video_ids: List[str],
+                             timeout: Optional[float] = None) -> Dict[str, YouTubeVideo]:
+        """Get details for up to 50 videos in one call; unknown ids are left out"""
+        params = {
+            "part": "snippet,contentDetails",
+            "id": ",".join(video_ids),
+        }
+        data = await self.get("/videos", params, timeout)
+
+        videos = {}
+        for item in data.get("items", []):
+            videos[item["id"]] = YouTubeVideo(
+                video_id=item["id"],
+                title=item["snippet"]["title"],
+                thumbnail=item["snippet"]["thumbnails"]["medium"]["url"],
+                channel_title=item["snippet"]["channelTitle"],
+                duration=item["contentDetails"]["duration"]
+            )
+        return videos
+
+
+class VideoBatcher:
+    """Coalesce video-detail lookups into multi-id ``videos`` requests.
+
+    Ids requested by any caller within ``window`` seconds are combined and
+    fetched ``max_batch`` at a time, so hydrating a page of search results,
+    or many concurrent single-video lookups, costs one upstream round-trip
+    per 50 distinct ids instead of one per video.
+    """
+
+    def __init__(self, client: YouTubeClient, window: float = 0.005,
+                 max_batch: int = MAX_VIDEO_IDS_PER_REQUEST):
+        self.client = client
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def get_many(self, video_ids: Iterable[str]) -> Dict[str, YouTubeVideo]:
+        """Fetch details for ``video_ids``; ids YouTube does not know are omitted"""
+        unique_ids = list(dict.fromkeys(video_ids))
+        # Shielded because futures are shared with other callers
+        futures = [asyncio.shield(self._enqueue(video_id)) for video_id in unique_ids]
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return {video_id: video for video_id, video in zip(unique_ids, results) if video is not None}
+
+    async def get_one(self, video_id: str) -> YouTubeVideo:
+        video = await asyncio.shield(self._enqueue(video_id))
+        if video is None:
+            raise HTTPException(status_code=404, detail="Video not found")
+        return video
+
+    async def fill_durations(self, videos: List[YouTubeVideo]) -> List[YouTubeVideo]:
+        """Set ``duration`` on search results that lack it, in one batched lookup"""
+        missing = [video.video_id for video in videos if video.duration is None]
+        if missing:
+            details = await self.get_many(missing)
+            for video in videos:
+                if video.duration is None and video.video_id in details:
+                    video.duration = details[video.video_id].duration
+        return videos
+
+    def _enqueue(self, video_id: str) -> asyncio.Future:
+        future = self._pending.get(video_id)
+        if future is not None:
+            return future
+
+        loop = asyncio.get_running_loop()
+        future = self._pending[video_id] = loop.create_future()
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        pending = list(self._pending.items())
+        self._pending = {}
+        for start in range(0, len(pending), self.max_batch):
+            task = asyncio.ensure_future(self._fetch(dict(pending[start:start + self.max_batch])))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _fetch(self, batch: Dict[str, asyncio.Future]):
+        try:
+            videos = await self.client.videos_details(list(batch))
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for video_id, future in batch.items():
+            if not future.done():
+                future.set_result(videos.get(video_id))
+
+
+def encode_videos(value):
+    """Turn cached search results or a single video into BSON-friendly dicts"""
+    if isinstance(value, list):
+        return [video.model_dump() for video in value]
+    return value.model_dump()
+
+
+def decode_videos(value):
+    if isinstance(value, list):
+        return [YouTubeVideo(**video) for video in value]
+    return YouTubeVideo(**value)
+
+
+def search_cache_key(query: str, max_results: int) -> str:
+    # YouTube search is case-insensitive, so "Butter Chicken" and "butter chicken" share an entry
+    return f"search:{max_results}:{' '.join(query.split()).lower()}"
+
+
+def video_cache_key(video_id: str) -> str:
+    return f"video:{video_id}"
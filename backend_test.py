@@ -4,6 +4,7 @@ RecipeCore Backend API Testing Suite
 Tests all backend endpoints including YouTube integration and Recipe CRUD operations
 """
 
+import os
 import requests
 import json
 import sys
@@ -282,8 +283,9 @@ class RecipeCoreAPITester:
             return False
 
 def main():
-    """Main function to run the tests"""
-    tester = RecipeCoreAPITester()
+    """Main function to run the tests (pass a base URL or set BACKEND_URL to test a local server)"""
+    base_url = sys.argv[1] if len(sys.argv) > 1 else os.environ.get("BACKEND_URL")
+    tester = RecipeCoreAPITester(base_url) if base_url else RecipeCoreAPITester()
     success = tester.run_all_tests()
     return 0 if success else 1
 
@@ -0,0 +1,95 @@
+"""Synthetic recipe catalogs for benchmarks.
+
+Documents have the same shape ``create_recipe`` stores, so they can be
+inserted straight into a recipes collection or fed to the in-memory indexes.
+"""
+
+import os
+import random
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from matching import derived_fields  # noqa: E402
+
+BASE_INGREDIENTS = [
+    "chicken", "chicken breast", "beef", "pork", "salmon", "shrimp", "tofu", "egg", "eggs",
+    "milk", "butter", "cream", "cheese", "parmesan", "mozzarella", "yogurt", "flour", "sugar",
+    "brown sugar", "honey", "salt", "black pepper", "olive oil", "vegetable oil", "garlic",
+    "onion", "red onion", "shallot", "ginger", "tomato", "tomato paste", "potato", "carrot",
+    "celery", "bell pepper", "chili", "spinach", "basil", "parsley", "cilantro", "thyme",
+    "rosemary", "oregano", "cumin", "turmeric", "paprika", "cinnamon", "rice", "pasta",
+    "noodles", "bread", "lemon", "lime", "soy sauce", "vinegar", "coconut milk", "peas",
+    "beans", "lentils", "mushroom", "zucchini", "eggplant", "corn", "avocado", "peanut",
+]
+QUANTITIES = ["", "1 cup ", "2 cups ", "1 tbsp ", "2 tsp ", "200 g ", "1 lb ", "3 cloves "]
+MODIFIERS = ["", "fresh ", "chopped ", "diced ", "minced "]
+CUISINES = ["Italian", "Indian", "Mexican", "Chinese", "Thai", "French", "American",
+            "Japanese", "Greek", "Spanish", "Korean", "Moroccan"]
+DISHES = ["Curry", "Stew", "Salad", "Soup", "Stir Fry", "Pasta", "Tacos", "Pie", "Bowl",
+          "Casserole", "Roast", "Skillet", "Risotto", "Noodles", "Sandwich", "Bake"]
+DESCRIPTORS = ["Spicy", "Creamy", "Smoky", "Quick", "Rustic", "Classic", "Zesty", "Hearty",
+               "Herby", "Crispy", "Golden", "Weeknight"]
+
+
+def generate_recipe(rng: random.Random, created_at: datetime) -> dict:
+    main = rng.sample(BASE_INGREDIENTS, rng.randint(4, 12))
+    ingredients = [f"{rng.choice(QUANTITIES)}{rng.choice(MODIFIERS)}{name}" for name in main]
+    cuisine = rng.choice(CUISINES)
+    title = f"{rng.choice(DESCRIPTORS)} {main[0].title()} {rng.choice(DISHES)}"
+    return {
+        "id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "title": title,
+        "description": f"A {cuisine.lower()} {title.lower()} with {main[1]} and {main[2]}.",
+        "ingredients": ingredients,
+        **derived_fields(ingredients),
+        "instructions": [f"Step {step} for {title}." for step in range(1, rng.randint(3, 8))],
+        "prep_time": rng.randint(5, 60),
+        "cook_time": rng.randint(0, 180),
+        "servings": rng.randint(1, 8),
+        "difficulty": rng.choice(["Easy", "Medium", "Hard"]),
+        "cuisine": cuisine,
+        "youtube_videos": [],
+        "image_url": None,
+        "created_at": created_at,
+        "updated_at": created_at,
+    }
+
+
+def generate_recipes(count: int, seed: int = 0) -> Iterator[dict]:
+    """Yield ``count`` deterministic recipe documents, oldest first"""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for number in range(count):
+        yield generate_recipe(rng, start + timedelta(seconds=number))
+
+
+def random_pantry(rng: random.Random, size: int = 5) -> List[str]:
+    return rng.sample(BASE_INGREDIENTS, size)
+
+
+# Named catalog sizes accepted by the benchmark scripts' --recipes option
+CATALOG_SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+
+def catalog_size(value: str) -> int:
+    """Parse a catalog size given as a count ("25000") or a name ("100k")"""
+    return CATALOG_SIZES.get(value.lower()) or int(value)
+
+
+async def seed_collection(collection, count: int, seed: int = 0, batch_size: int = 1000) -> int:
+    """Insert a generated catalog in batches without holding it all in memory"""
+    batch = []
+    for doc in generate_recipes(count, seed):
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            await collection.insert_many(batch)
+            batch = []
+    if batch:
+        await collection.insert_many(batch)
+    return count
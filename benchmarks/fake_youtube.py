@@ -0,0 +1,57 @@
+"""Local stand-in for the YouTube Data API ``search`` and ``videos`` resources.
+
+In-process, pass ``httpx.ASGITransport(app=app)`` as the ``YouTubeClient``
+transport. Against a local uvicorn, serve it next to the API:
+
+    uvicorn benchmarks.fake_youtube:app --port 8002
+    YOUTUBE_API_BASE_URL=http://localhost:8002/youtube/v3 YOUTUBE_API_KEY=benchmark uvicorn server:app
+
+Answers are deterministic for a given query or id. ``FAKE_YOUTUBE_LATENCY``
+(seconds) adds a fixed delay per call to imitate the real round-trip.
+"""
+
+import asyncio
+import hashlib
+import os
+
+from fastapi import FastAPI
+
+LATENCY = float(os.environ.get("FAKE_YOUTUBE_LATENCY", "0.0"))
+
+app = FastAPI(title="Fake YouTube Data API")
+app.state.calls = 0
+
+
+def video_id_for(query: str, position: int) -> str:
+    return hashlib.sha1(f"{query}:{position}".encode()).hexdigest()[:11]
+
+
+def snippet(video_id: str) -> dict:
+    return {
+        "title": f"Cooking video {video_id}",
+        "channelTitle": "Benchmark Kitchen",
+        "thumbnails": {"medium": {"url": f"https://i.ytimg.com/vi/{video_id}/mqdefault.jpg"}},
+    }
+
+
+async def answer(payload: dict) -> dict:
+    app.state.calls += 1
+    if LATENCY:
+        await asyncio.sleep(LATENCY)
+    return payload
+
+
+@app.get("/youtube/v3/search")
+async def search(q: str = "", maxResults: int = 10):
+    items = [{"id": {"videoId": video_id_for(q, position)}, "snippet": snippet(video_id_for(q, position))}
+             for position in range(min(maxResults, 50))]
+    return await answer({"items": items})
+
+
+@app.get("/youtube/v3/videos")
+async def videos(id: str = ""):
+    # Every well-formed id "exists"; durations vary with the id
+    items = [{"id": video_id, "snippet": snippet(video_id),
+              "contentDetails": {"duration": f"PT{sum(map(ord, video_id)) % 30 + 1}M"}}
+             for video_id in id.split(",") if len(video_id) == 11]
+    return await answer({"items": items})
@@ -0,0 +1,102 @@
+"""Per-request peak memory of the recipe list endpoint, buffered vs streamed, full vs summary.
+
+    python benchmarks/list_memory_benchmark.py --recipes 20000 --page 5000 --mongo-url mongodb://localhost:27017
+
+Each scenario requests one large page from the app in-process and reads the
+body chunk by chunk, recording the Python heap peak (``tracemalloc``) while
+the request runs. "buffered" raises ``LIST_STREAM_THRESHOLD`` above the page
+size so the handler takes the ``to_list`` path; "streamed" lowers it to zero.
+Results are printed as JSON.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.catalog import generate_recipes  # noqa: E402
+
+import httpx  # noqa: E402
+import server  # noqa: E402
+
+# (label, stream threshold, query params, headers)
+SCENARIOS = [
+    ("buffered_full", None, {}, {}),
+    ("buffered_summary", None, {"view": "summary"}, {}),
+    ("streamed_full", 0, {}, {}),
+    ("streamed_summary", 0, {"view": "summary"}, {}),
+    ("ndjson_summary", 0, {"view": "summary"}, {"Accept": "application/x-ndjson"}),
+]
+
+
+def open_collection(args):
+    if args.in_memory:
+        from mongomock_motor import AsyncMongoMockClient
+        return AsyncMongoMockClient()["list_memory_benchmark"]["recipes"], None
+    from motor.motor_asyncio import AsyncIOMotorClient
+    client = AsyncIOMotorClient(args.mongo_url)
+    return client[args.database]["recipes"], client
+
+
+async def measure(http, page, threshold, params, headers):
+    """Return (peak_bytes, body_bytes, seconds) for one list request"""
+    server.LIST_STREAM_THRESHOLD = page + 1 if threshold is None else threshold
+    tracemalloc.start()
+    try:
+        started = time.perf_counter()
+        body_bytes = 0
+        async with http.stream("GET", "/api/recipes", params={"limit": page, **params}, headers=headers) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes():
+                body_bytes += len(chunk)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak, body_bytes, elapsed
+
+
+async def main(args):
+    collection, client = open_collection(args)
+    server.recipes_collection = collection
+    results = {"recipes": args.recipes, "page": args.page}
+    try:
+        await collection.drop()
+        docs = list(generate_recipes(args.recipes, seed=1))
+        for start in range(0, len(docs), 1000):
+            await collection.insert_many(docs[start:start + 1000])
+        del docs
+
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as http:
+            # Warm up imports and pydantic schemas outside the measured requests
+            await measure(http, 1, None, {}, {})
+            for label, threshold, params, headers in SCENARIOS:
+                peak, body_bytes, elapsed = await measure(http, args.page, threshold, params, headers)
+                results[label] = {
+                    "peak_kib": round(peak / 1024, 1),
+                    "body_kib": round(body_bytes / 1024, 1),
+                    "seconds": round(elapsed, 3),
+                }
+    finally:
+        await collection.drop()
+        if client is not None:
+            client.close()
+
+    json.dump(results, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipes", type=int, default=20000)
+    parser.add_argument("--page", type=int, default=5000)
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--database", default="recipecore_list_memory_benchmark")
+    parser.add_argument("--in-memory", action="store_true", help="use mongomock instead of a server")
+    asyncio.run(main(parser.parse_args()))
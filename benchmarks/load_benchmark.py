@@ -0,0 +1,236 @@
+"""Concurrent load scenarios for every API endpoint, in-process or against a running server.
+
+    python benchmarks/load_benchmark.py --in-memory --recipes 1k
+    python benchmarks/load_benchmark.py --recipes 100k --mongo-url mongodb://localhost:27017
+    python benchmarks/load_benchmark.py --base-url http://localhost:8001 --seed-catalog --recipes 10k
+
+In-process (the default) the FastAPI ``app`` is driven through
+``httpx.ASGITransport`` with its Mongo collection pointed at a scratch
+database (or mongomock with ``--in-memory``) and YouTube calls answered by
+``benchmarks/fake_youtube.py``. With ``--base-url`` requests go to a local
+uvicorn instead; start it with ``YOUTUBE_API_BASE_URL`` pointing at the fake
+YouTube server, and pass ``--seed-catalog`` with the same ``--mongo-url`` and
+``--database`` as its ``MONGO_URL``/``DB_NAME`` to load the catalog first.
+
+Each scenario sends ``--requests`` requests from ``--concurrency`` workers
+after ``--warmup`` unmeasured ones. Non-2xx/304 responses count as errors.
+Write scenarios modify the catalog, so run against a scratch database.
+Results are JSON with p50/p95/p99 latency and requests/second per scenario.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import fake_youtube  # noqa: E402
+from benchmarks.catalog import (  # noqa: E402
+    BASE_INGREDIENTS,
+    CUISINES,
+    DISHES,
+    catalog_size,
+    generate_recipe,
+    random_pantry,
+    seed_collection,
+)
+from benchmarks.report import latency_summary, run_metadata  # noqa: E402
+
+import httpx  # noqa: E402
+
+SEARCH_TERMS = [*(name.split()[0] for name in BASE_INGREDIENTS[:20]), *(c.lower() for c in CUISINES),
+                *(d.lower() for d in DISHES), "chick", "spicy chicken", "creamy pasta"]
+VIDEO_QUERIES = [f"{cuisine} {dish} recipe" for cuisine in CUISINES for dish in DISHES]
+
+
+class Workload:
+    """Request factories for each scenario, fed by the ids of the seeded catalog"""
+
+    def __init__(self, recipe_ids, seed: int):
+        self.recipe_ids = recipe_ids
+        self.rng = random.Random(seed)
+
+    def health(self):
+        return "GET", "/api/health", {}
+
+    def list_recipes(self):
+        return "GET", "/api/recipes", {"params": {"limit": 20, "skip": self.rng.randint(0, 100)}}
+
+    def list_summary(self):
+        return "GET", "/api/recipes", {"params": {"limit": 20, "view": "summary"}}
+
+    def list_large_stream(self):
+        return "GET", "/api/recipes", {"params": {"limit": 1000, "view": "summary"}}
+
+    def search(self):
+        return "GET", "/api/recipes", {"params": {"search": self.rng.choice(SEARCH_TERMS), "limit": 20}}
+
+    def featured(self):
+        return "GET", "/api/recipes/featured", {}
+
+    def get_recipe(self):
+        return "GET", f"/api/recipes/{self.rng.choice(self.recipe_ids)}", {}
+
+    def suggestions(self):
+        pantry = random_pantry(self.rng, self.rng.randint(2, 10))
+        return "POST", "/api/recipes/suggestions", {"json": {"available_ingredients": pantry, "max_results": 10}}
+
+    def suggestions_batch(self):
+        pantries = [{"available_ingredients": random_pantry(self.rng, self.rng.randint(2, 10)), "max_results": 5}
+                    for _ in range(16)]
+        return "POST", "/api/recipes/suggestions/batch", {"json": pantries}
+
+    def youtube_search(self):
+        return "GET", "/api/youtube/search", {"params": {"q": self.rng.choice(VIDEO_QUERIES), "max_results": 6}}
+
+    def youtube_video(self):
+        video_id = fake_youtube.video_id_for(self.rng.choice(VIDEO_QUERIES), self.rng.randint(0, 5))
+        return "GET", f"/api/youtube/video/{video_id}", {}
+
+    def create_recipe(self):
+        doc = generate_recipe(self.rng, None)
+        body = {key: value for key, value in doc.items()
+                if key in ("title", "description", "ingredients", "instructions", "prep_time",
+                           "cook_time", "servings", "difficulty", "cuisine")}
+        return "POST", "/api/recipes", {"json": body}
+
+    def update_recipe(self):
+        body = {"prep_time": self.rng.randint(5, 60)}
+        return "PUT", f"/api/recipes/{self.rng.choice(self.recipe_ids)}", {"json": body}
+
+
+SCENARIOS = [
+    "health", "list_recipes", "list_summary", "list_large_stream", "search", "featured", "get_recipe",
+    "suggestions", "suggestions_batch", "youtube_search", "youtube_video", "create_recipe", "update_recipe",
+]
+
+
+async def run_scenario(http: httpx.AsyncClient, make_request, requests: int, concurrency: int, warmup: int):
+    """Send ``requests`` requests from ``concurrency`` workers; return the latency summary"""
+    latencies = []
+    errors = 0
+    counter = itertools.count()
+
+    async def send():
+        method, url, kwargs = make_request()
+        started = time.perf_counter()
+        try:
+            response = await http.request(method, url, **kwargs)
+            ok = response.is_success or response.status_code == 304
+        except httpx.HTTPError:
+            ok = False
+        return time.perf_counter() - started, ok
+
+    for _ in range(warmup):
+        await send()
+
+    async def worker():
+        nonlocal errors
+        while next(counter) < requests:
+            latency, ok = await send()
+            latencies.append(latency)
+            if not ok:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return latency_summary(latencies, elapsed=time.perf_counter() - started, errors=errors)
+
+
+def open_collection(args):
+    if args.in_memory:
+        from mongomock_motor import AsyncMongoMockClient
+        return AsyncMongoMockClient()[args.database]["recipes"], None
+    from motor.motor_asyncio import AsyncIOMotorClient
+    client = AsyncIOMotorClient(args.mongo_url)
+    return client[args.database]["recipes"], client
+
+
+def in_process_client(collection) -> httpx.AsyncClient:
+    """Point the app at ``collection`` and the fake YouTube server; return a client for it"""
+    import server
+    from youtube import VideoBatcher, YouTubeClient
+
+    server.recipes_collection = collection
+    server.ingredient_index.reset()
+    server.search_index.reset()
+    server.invalidate_featured()
+    server.suggestion_cache.clear()
+    server.recipe_fragments.clear()
+    server.recipe_cache.local.clear()
+    server.youtube_cache.local.clear()
+    server.youtube_client = YouTubeClient(
+        "benchmark-key",
+        base_url="http://youtube.benchmark/youtube/v3",
+        max_connections=server.YOUTUBE_MAX_CONNECTIONS,
+        max_concurrency=server.YOUTUBE_MAX_CONCURRENCY,
+        transport=httpx.ASGITransport(app=fake_youtube.app),
+        on_call=server.request_metrics.observe_youtube,
+    )
+    server.video_batcher = VideoBatcher(server.youtube_client, window=server.YOUTUBE_BATCH_WINDOW)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://benchmark")
+
+
+async def main(args):
+    seeding = args.base_url is None or args.seed_catalog
+    collection, mongo_client = open_collection(args) if seeding else (None, None)
+    scenarios = args.scenarios or SCENARIOS
+    report = {
+        "meta": run_metadata(benchmark="load", target=args.base_url or "in-process", recipes=args.recipes,
+                             requests=args.requests, concurrency=args.concurrency, seed=args.seed),
+        "scenarios": {},
+    }
+    try:
+        if seeding:
+            await collection.drop()
+            await seed_collection(collection, args.recipes, seed=args.seed)
+        if args.base_url is None:
+            import server
+            http = in_process_client(collection)
+            await server.ensure_recipe_indexes()
+        else:
+            http = httpx.AsyncClient(base_url=args.base_url, timeout=60,
+                                     limits=httpx.Limits(max_connections=args.concurrency))
+
+        async with http:
+            page = await http.get("/api/recipes", params={"limit": 500, "view": "summary"})
+            page.raise_for_status()
+            workload = Workload([recipe["id"] for recipe in page.json()["recipes"]], args.seed)
+            for name in scenarios:
+                report["scenarios"][name] = await run_scenario(
+                    http, getattr(workload, name), args.requests, args.concurrency, args.warmup)
+    finally:
+        if seeding and not args.keep:
+            await collection.drop()
+        if mongo_client is not None:
+            mongo_client.close()
+
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(report, handle, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipes", type=catalog_size, default="10k", help="catalog size, e.g. 1k, 100k, 1m or 25000")
+    parser.add_argument("--requests", type=int, default=500, help="measured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, help="run only these scenarios")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--base-url", help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--seed-catalog", action="store_true", help="with --base-url, load the catalog into Mongo first")
+    parser.add_argument("--keep", action="store_true", help="leave the seeded catalog in place afterwards")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--database", default="recipecore_load_benchmark")
+    parser.add_argument("--in-memory", action="store_true", help="use mongomock instead of a server")
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    asyncio.run(main(parser.parse_args()))
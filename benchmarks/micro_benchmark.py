@@ -0,0 +1,98 @@
+"""Micro-benchmarks for ingredient normalization, matching and suggestion ranking.
+
+    python benchmarks/micro_benchmark.py --recipes 10k --rounds 50 --output micro.json
+
+Each case runs ``--rounds`` timed rounds of a batch of calls; the reported
+latencies are per call (round time / calls per round), so p50/p95/p99 show
+round-to-round spread. ``normalize_ingredient`` is measured with a cold
+cache (cleared every round) and a warm one. Ranking cases score random
+pantries against a generated catalog of ``--recipes`` recipes. Results are
+printed (or written) as JSON.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.catalog import catalog_size, generate_recipes, random_pantry  # noqa: E402
+from benchmarks.report import latency_summary, run_metadata  # noqa: E402
+from matching import (  # noqa: E402
+    IngredientIndex,
+    calculate_recipe_match,
+    normalize_ingredient,
+    normalize_ingredients,
+    top_matches,
+)
+from vector_scoring import incidence_matrix, vector_top_matches  # noqa: E402
+
+
+def measure(call, rounds: int, per_round: int, before_round=None) -> dict:
+    """Time ``per_round`` calls of ``call(i)`` for each round; return per-call latency stats"""
+    samples = []
+    total = 0.0
+    for _ in range(rounds):
+        if before_round is not None:
+            before_round()
+        started = time.perf_counter()
+        for i in range(per_round):
+            call(i)
+        elapsed = time.perf_counter() - started
+        total += elapsed
+        samples.append(elapsed / per_round)
+    return latency_summary(samples, elapsed=total / per_round)
+
+
+def main(args):
+    rng = random.Random(args.seed)
+    docs = list(generate_recipes(args.recipes, seed=args.seed))
+    raw_ingredients = [ingredient for doc in docs[:2000] for ingredient in doc["ingredients"]]
+    recipe_lists = [doc["ingredients"] for doc in docs[:2000]]
+    pantries = [random_pantry(rng, rng.randint(2, 10)) for _ in range(256)]
+
+    index = IngredientIndex()
+    for doc in docs:
+        index.add_document(doc)
+    incidence_matrix(index)  # built once per catalog version, not per request
+    del docs
+
+    rounds = args.rounds
+    cases = {
+        "normalize_ingredient_cold": measure(
+            lambda i: normalize_ingredient(raw_ingredients[i % len(raw_ingredients)]),
+            rounds, 1000, before_round=normalize_ingredient.cache_clear),
+        "normalize_ingredient_warm": measure(
+            lambda i: normalize_ingredient(raw_ingredients[i % len(raw_ingredients)]), rounds, 1000),
+        "normalize_ingredients": measure(
+            lambda i: normalize_ingredients(recipe_lists[i % len(recipe_lists)]), rounds, 500),
+        "calculate_recipe_match": measure(
+            lambda i: calculate_recipe_match(recipe_lists[i % len(recipe_lists)], pantries[i % len(pantries)]),
+            rounds, 500),
+        "top_matches": measure(
+            lambda i: top_matches(index, pantries[i % len(pantries)], 10), rounds, args.rank_calls),
+        "vector_top_matches": measure(
+            lambda i: vector_top_matches(index, pantries[i % len(pantries)], 10), rounds, args.rank_calls),
+    }
+
+    report = {"meta": run_metadata(benchmark="micro", recipes=args.recipes, rounds=rounds, seed=args.seed),
+              "cases": cases}
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(report, handle, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipes", type=catalog_size, default="10k", help="catalog size, e.g. 1k, 100k, 1m or 25000")
+    parser.add_argument("--rounds", type=int, default=30)
+    parser.add_argument("--rank-calls", type=int, default=20, help="ranking calls per round")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    main(parser.parse_args())
@@ -0,0 +1,51 @@
+"""Latency summaries and run metadata shared by the benchmark scripts.
+
+Every summary uses the same keys so JSON reports from different commits can
+be diffed or loaded side by side.
+"""
+
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def latency_summary(samples: List[float], elapsed: Optional[float] = None, errors: int = 0) -> Dict[str, float]:
+    """p50/p95/p99/max in milliseconds for samples in seconds, plus throughput over ``elapsed``"""
+    if not samples:
+        return {"count": 0, "errors": errors}
+    ordered = sorted(samples)
+    summary = {
+        "count": len(ordered),
+        "errors": errors,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 4),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 4),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 4),
+        "max_ms": round(ordered[-1] * 1000, 4),
+    }
+    if elapsed:
+        summary["per_sec"] = round(len(ordered) / elapsed, 1)
+    return summary
+
+
+def run_metadata(**settings) -> dict:
+    """Commit, interpreter and platform of this run, plus the benchmark's own settings"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        **settings,
+    }
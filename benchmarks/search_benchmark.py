@@ -0,0 +1,115 @@
+"""Compare the legacy ``$regex`` recipe search with the in-memory token index.
+
+    python benchmarks/search_benchmark.py --recipes 100000 --mongo-url mongodb://localhost:27017
+
+Recipes are written to a scratch database (dropped afterwards). Each query
+is timed both ways: the old four-way ``$or`` of case-insensitive regexes,
+and ``SearchIndex.search`` plus the ``$in`` fetch of the page it returns.
+Results are printed as JSON.
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.catalog import generate_recipes  # noqa: E402
+from search import SearchIndex  # noqa: E402
+
+QUERIES = ["chicken", "curry", "spicy", "italian", "garlic", "coconut milk", "chick", "zesty salmon"]
+
+
+def regex_filter(search: str) -> dict:
+    # The pre-index query, with the raw input escaped so it is at least a literal
+    pattern = re.escape(search)
+    return {
+        "$or": [
+            {"title": {"$regex": pattern, "$options": "i"}},
+            {"description": {"$regex": pattern, "$options": "i"}},
+            {"cuisine": {"$regex": pattern, "$options": "i"}},
+            {"ingredients": {"$elemMatch": {"$regex": pattern, "$options": "i"}}},
+        ]
+    }
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(samples):
+    return {
+        "p50_ms": round(statistics.median(samples) * 1000, 3),
+        "p95_ms": round(percentile(samples, 0.95) * 1000, 3),
+    }
+
+
+def open_collection(args):
+    if args.in_memory:
+        import mongomock
+        return mongomock.MongoClient()["search_benchmark"]["recipes"], None
+    from pymongo import MongoClient
+    client = MongoClient(args.mongo_url)
+    return client[args.database]["recipes"], client
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipes", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--database", default="recipecore_search_benchmark")
+    parser.add_argument("--in-memory", action="store_true", help="use mongomock instead of a server")
+    args = parser.parse_args()
+
+    collection, client = open_collection(args)
+    collection.drop()
+    index = SearchIndex()
+    batch = []
+    for doc in generate_recipes(args.recipes):
+        index.add_document(doc)
+        batch.append(doc)
+        if len(batch) == 5000:
+            collection.insert_many(batch)
+            batch = []
+    if batch:
+        collection.insert_many(batch)
+    collection.create_index("id", unique=True)
+    collection.create_index([("created_at", -1)])
+
+    results = {"recipes": args.recipes, "limit": args.limit, "queries": {}}
+    try:
+        for query in QUERIES:
+            regex_times, index_times = [], []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                list(collection.find(regex_filter(query)).sort("created_at", -1).limit(args.limit))
+                regex_times.append(time.perf_counter() - started)
+
+                started = time.perf_counter()
+                recipe_ids, total = index.search(query, limit=args.limit)
+                list(collection.find({"id": {"$in": recipe_ids}}))
+                index_times.append(time.perf_counter() - started)
+
+            results["queries"][query] = {
+                "matches": total,
+                "regex": summarize(regex_times),
+                "token_index": summarize(index_times),
+            }
+    finally:
+        collection.drop()
+        if client is not None:
+            client.close()
+
+    json.dump(results, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Response serialization throughput for recipe lists and suggestions.
+
+    python benchmarks/serialization_benchmark.py --rounds 50 --output serialization.json
+
+Encodes ``{"recipes": [...]}`` bodies of 20 and 1000 recipes (the default
+page and a large streamed one) and suggestion bodies of 20 and 1000 matches,
+from documents shaped as the recipes collection returns them. Each size is
+encoded three ways:
+
+- ``pydantic``: validate every document into a model and let FastAPI's
+  ``jsonable_encoder`` and ``json.dumps`` render it, as the endpoints did
+- ``fragments_cold``: orjson fragments with an empty fragment cache
+- ``fragments_warm``: the same recipes again, served from cached fragments
+
+Reports per-body latency and ``bytes_per_sec`` of response body produced.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.catalog import generate_recipes, random_pantry  # noqa: E402
+from benchmarks.report import latency_summary, run_metadata  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from starlette.responses import JSONResponse as StarletteJSONResponse  # noqa: E402
+
+import server  # noqa: E402
+from encoding import FragmentCache  # noqa: E402
+from matching import calculate_recipe_match, stored_normalized  # noqa: E402
+
+SIZES = (20, 1000)
+
+
+def stored(doc: dict) -> dict:
+    # Mongo hands datetimes back naive, in UTC
+    return {**doc, "created_at": doc["created_at"].replace(tzinfo=None),
+            "updated_at": doc["updated_at"].replace(tzinfo=None)}
+
+
+def measure(render, rounds: int, before_round=None) -> dict:
+    """Time ``render()`` once per round; return latency stats and body bytes per second"""
+    samples = []
+    size = 0
+    for _ in range(rounds):
+        if before_round is not None:
+            before_round()
+        started = time.perf_counter()
+        size = len(render())
+        samples.append(time.perf_counter() - started)
+    summary = latency_summary(samples, elapsed=sum(samples))
+    summary["body_bytes"] = size
+    summary["bytes_per_sec"] = round(size * len(samples) / sum(samples))
+    return summary
+
+
+def pydantic_list(docs):
+    content = {"recipes": [server.Recipe.model_validate(doc) for doc in docs], "next_cursor": None}
+    return StarletteJSONResponse(jsonable_encoder(content)).body
+
+
+def pydantic_suggestions(docs, pantry):
+    suggestions = []
+    for doc in docs:
+        match_score, matching, missing = calculate_recipe_match(doc["ingredients"], pantry, stored_normalized(doc))
+        suggestions.append(server.RecipeSuggestion(
+            recipe=server.Recipe.model_validate(doc), match_score=match_score,
+            matching_ingredients=matching, missing_ingredients=missing,
+        ))
+    return StarletteJSONResponse(jsonable_encoder({"suggestions": suggestions})).body
+
+
+def fragment_list(docs):
+    return server.json_object([
+        ("recipes", server.json_array(server.recipe_fragments.encode(server.Recipe, doc) for doc in docs)),
+        ("next_cursor", server.dumps(None)),
+    ])
+
+
+def fragment_suggestions(docs, pantry):
+    ranked = [(doc["id"], 0.0) for doc in docs]
+    by_id = {doc["id"]: doc for doc in docs}
+    return server.json_object([("suggestions", server.build_suggestions(ranked, by_id, pantry))])
+
+
+def main(args):
+    rng = random.Random(args.seed)
+    docs = [stored(doc) for doc in generate_recipes(max(SIZES), seed=args.seed)]
+    pantry = random_pantry(rng, 6)
+    server.recipe_fragments = FragmentCache(max_entries=2 * max(SIZES))
+
+    cases = {}
+    for size in SIZES:
+        page = docs[:size]
+        same = (pydantic_list(page) == fragment_list(page)
+                and pydantic_suggestions(page, pantry) == fragment_suggestions(page, pantry))
+        if not same:
+            raise SystemExit(f"Encoders disagree on {size} recipes")
+        for name, pydantic_render, fragment_render in (
+            ("list", lambda: pydantic_list(page), lambda: fragment_list(page)),
+            ("suggestions", lambda: pydantic_suggestions(page, pantry), lambda: fragment_suggestions(page, pantry)),
+        ):
+            cases[f"{name}_{size}_pydantic"] = measure(pydantic_render, args.rounds)
+            cases[f"{name}_{size}_fragments_cold"] = measure(fragment_render, args.rounds,
+                                                             before_round=server.recipe_fragments.clear)
+            cases[f"{name}_{size}_fragments_warm"] = measure(fragment_render, args.rounds)
+
+    report = {"meta": run_metadata(benchmark="serialization", rounds=args.rounds, seed=args.seed), "cases": cases}
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(report, handle, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    main(parser.parse_args())
@@ -0,0 +1,116 @@
+"""Write throughput of the recipe create/update paths, before and after single-round-trip writes.
+
+    python benchmarks/write_benchmark.py --writes 5000 --concurrency 32 --mongo-url mongodb://localhost:27017
+
+"before" replays the old handlers' driver calls (``insert_one`` + ``find_one``,
+``update_one`` + ``find_one``); "after" replays the current ones (``insert_one``
+answered from memory, ``find_one_and_update`` with ``ReturnDocument.AFTER``).
+Results are printed as JSON.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.catalog import generate_recipes  # noqa: E402
+from pymongo import ReturnDocument  # noqa: E402
+
+
+async def create_before(collection, doc):
+    await collection.insert_one(doc)
+    return await collection.find_one({"id": doc["id"]})
+
+
+async def create_after(collection, doc):
+    await collection.insert_one(doc)
+    return doc
+
+
+async def update_before(collection, recipe_id):
+    await collection.update_one({"id": recipe_id}, {"$set": {"updated_at": datetime.now(timezone.utc)}})
+    return await collection.find_one({"id": recipe_id})
+
+
+async def update_after(collection, recipe_id):
+    return await collection.find_one_and_update(
+        {"id": recipe_id},
+        {"$set": {"updated_at": datetime.now(timezone.utc)}},
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def run_phase(operation, items, concurrency):
+    """Run ``operation`` over ``items`` with bounded concurrency; return (seconds, latencies)"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(item):
+        async with semaphore:
+            started = time.perf_counter()
+            await operation(item)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[one(item) for item in items])
+    return time.perf_counter() - started, latencies
+
+
+def summarize(count, elapsed, latencies):
+    ordered = sorted(latencies)
+    return {
+        "ops_per_sec": round(count / elapsed, 1),
+        "p50_ms": round(statistics.median(ordered) * 1000, 3),
+        "p99_ms": round(ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))] * 1000, 3),
+    }
+
+
+def open_collection(args):
+    if args.in_memory:
+        from mongomock_motor import AsyncMongoMockClient
+        return AsyncMongoMockClient()["write_benchmark"]["recipes"], None
+    from motor.motor_asyncio import AsyncIOMotorClient
+    client = AsyncIOMotorClient(args.mongo_url)
+    return client[args.database]["recipes"], client
+
+
+async def main(args):
+    collection, client = open_collection(args)
+    results = {"writes": args.writes, "concurrency": args.concurrency}
+    try:
+        for label, create, update in (("before", create_before, update_before),
+                                      ("after", create_after, update_after)):
+            await collection.drop()
+            await collection.create_index("id", unique=True)
+            docs = list(generate_recipes(args.writes, seed=1))
+            create_elapsed, create_latencies = await run_phase(
+                lambda doc: create(collection, doc), docs, args.concurrency)
+            update_elapsed, update_latencies = await run_phase(
+                lambda recipe_id: update(collection, recipe_id), [doc["id"] for doc in docs], args.concurrency)
+            results[label] = {
+                "create": summarize(args.writes, create_elapsed, create_latencies),
+                "update": summarize(args.writes, update_elapsed, update_latencies),
+            }
+    finally:
+        await collection.drop()
+        if client is not None:
+            client.close()
+
+    json.dump(results, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writes", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--database", default="recipecore_write_benchmark")
+    parser.add_argument("--in-memory", action="store_true", help="use mongomock instead of a server")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,46 @@
+import os
+import sys
+
+import pytest
+
+# The backend is run from its own directory (``uvicorn server:app``), so its
+# modules import each other as top-level names.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+from matching import derived_fields  # noqa: E402
+
+
+def recipe_payload(title, ingredients, **fields) -> dict:
+    """A minimal valid ``RecipeCreate`` body"""
+    return {"title": title, "description": "", "ingredients": ingredients, "instructions": ["Cook"],
+            "prep_time": 5, "cook_time": 10, "servings": 2, "difficulty": "Easy", **fields}
+
+
+def stored_recipe(recipe_id, ingredients, title=None, **fields) -> dict:
+    """A recipe document as the API stores it, derived match fields included"""
+    return {"id": recipe_id, **recipe_payload(title or recipe_id.title(), ingredients),
+            **derived_fields(ingredients), **fields}
+
+
+@pytest.fixture
+def app_client(monkeypatch):
+    """The app on an empty mongomock database, with in-memory indexes and caches reset; ``(server, http)``"""
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    import httpx
+
+    import server
+    from pantries import PantryNotifier
+
+    database = mongomock_motor.AsyncMongoMockClient()["recipecore_test"]
+    monkeypatch.setattr(server, "recipes_collection", database["recipes"])
+    monkeypatch.setattr(server, "pantries_collection", database["pantries"])
+    monkeypatch.setattr(server, "pantry_notifier", PantryNotifier())
+    monkeypatch.setattr(server, "SUGGESTION_ENGINE", "python")
+    server.ingredient_index.reset()
+    server.search_index.reset()
+    server.recipe_keys.reset()
+    server.invalidate_featured()
+    server.invalidate_suggestions()
+    server.recipe_cache.local.clear()
+    server.recipe_fragments.clear()
+    return server, httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://test")
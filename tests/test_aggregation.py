@@ -0,0 +1,96 @@
+"""Aggregation-pipeline suggestions agree with the Python scorer on exact-name catalogs."""
+
+import asyncio
+import random
+
+import pytest
+
+from aggregation import aggregate_top_matches
+from matching import IngredientIndex, calculate_recipe_match, derived_fields, top_matches
+from tests.conftest import stored_recipe
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+# No name contains another, so substring and exact matching coincide
+NAMES = ["milk", "flour", "sugar", "butter", "salt", "garlic", "onion", "tomato", "basil",
+         "rice", "beans", "cheese", "cream", "chicken", "lemon", "ginger"]
+PREFIXES = ["", "2 cups ", "1 tbsp ", "fresh ", "chopped "]
+
+
+def build_catalog(rng: random.Random, size: int):
+    recipes = []
+    for number in range(size):
+        ingredients = [rng.choice(PREFIXES) + rng.choice(NAMES) for _ in range(rng.randint(0, 6))]
+        recipes.append({"id": f"recipe-{number}", "ingredients": ingredients, **derived_fields(ingredients)})
+    return recipes
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_pipeline_matches_python_scoring(seed):
+    rng = random.Random(seed)
+    recipes = build_catalog(rng, 150)
+    index = IngredientIndex()
+    for recipe in recipes:
+        index.add_document(recipe)
+    pantries = [
+        ([rng.choice(PREFIXES) + name for name in rng.sample(NAMES, rng.randint(1, 6))],
+         rng.choice([0, 1, 5, 20, None, -3]))
+        for _ in range(40)
+    ]
+
+    async def scenario():
+        collection = mongomock_motor.AsyncMongoMockClient()["aggregation"]["recipes"]
+        await collection.insert_many([dict(recipe) for recipe in recipes])
+        return [await aggregate_top_matches(collection, available, max_results, {"_id": 0})
+                for available, max_results in pantries]
+
+    by_id = {recipe["id"]: recipe for recipe in recipes}
+    for (available, max_results), matches in zip(pantries, asyncio.run(scenario())):
+        ranked = [(recipe["id"], score) for recipe, score in matches]
+        assert ranked == top_matches(index, available, max_results)
+        for recipe_id, score in ranked:
+            assert score == calculate_recipe_match(by_id[recipe_id]["ingredients"], available)[0]
+
+
+@pytest.mark.parametrize("engine", ["python", "mongo"])
+def test_batch_answers_in_request_order_with_per_item_errors(app_client, monkeypatch, engine):
+    server, http = app_client
+    monkeypatch.setattr(server, "SUGGESTION_ENGINE", engine)
+    monkeypatch.setattr(server, "SUGGESTION_BATCH_MONGO_CONCURRENCY", 2)
+    rank_in_mongo = server.rank_in_mongo
+    running, most_running = [0], [0]
+
+    async def counted_rank_in_mongo(*args):
+        running[0] += 1
+        most_running[0] = max(most_running[0], running[0])
+        try:
+            await asyncio.sleep(0.01)
+            return await rank_in_mongo(*args)
+        finally:
+            running[0] -= 1
+
+    monkeypatch.setattr(server, "rank_in_mongo", counted_rank_in_mongo)
+    payloads = [
+        {"available_ingredients": ["chicken", "lemon"]},
+        {"available_ingredients": "chicken"},
+        {"available_ingredients": ["flour", "milk"], "max_results": 1},
+        {"available_ingredients": []},
+        {"available_ingredients": ["rice"]},
+        {"available_ingredients": ["chicken"], "max_results": 2},
+    ]
+
+    async def scenario():
+        await server.recipes_collection.insert_many([
+            stored_recipe(recipe_id, ingredients)
+            for recipe_id, ingredients in [("roast", ["chicken", "lemon", "garlic"]), ("pancakes", ["flour", "milk"]),
+                                           ("scones", ["flour", "milk", "butter"]), ("curry", ["chicken", "rice"])]
+        ])
+        response = await http.post("/api/recipes/suggestions/batch", json=payloads)
+        return response.status_code, response.json()["results"]
+
+    status_code, results = asyncio.run(scenario())
+    assert status_code == 200 and len(results) == len(payloads)
+    assert [[suggestion["recipe"]["id"] for suggestion in result["suggestions"]] if "suggestions" in result
+            else result["error"]["status_code"] for result in results] == [["roast", "curry"], 422, ["pancakes"], 400, ["curry"], ["curry", "roast"]]
+    assert results[0]["suggestions"][0]["match_score"] == pytest.approx(2 / 3)
+    assert most_running[0] == (2 if engine == "mongo" else 0)
@@ -0,0 +1,99 @@
+"""NDJSON import and export: per-line errors in line order, and round trips that rebuild derived fields."""
+
+import asyncio
+import json
+
+from bulk import iter_ndjson_lines
+from matching import DERIVED_FIELDS, derived_fields
+from tests.conftest import recipe_payload
+
+
+def recipe_line(title, ingredients, **fields) -> str:
+    return json.dumps(recipe_payload(title, ingredients, **fields))
+
+
+def test_import_reports_bad_lines_in_line_order(app_client, monkeypatch):
+    server, http = app_client
+    monkeypatch.setattr(server, "BULK_BATCH_SIZE", 3)
+    body = "\n".join([
+        recipe_line("Roast", ["chicken"], id="roast"),
+        recipe_line("Roast again", ["chicken"], id="roast"),
+        recipe_line("No servings", ["rice"], servings="several"),
+        "{not json",
+        "",
+        recipe_line("Pancakes", ["flour", "milk"], id="pancakes"),
+    ])
+
+    async def scenario():
+        await server.ensure_recipe_indexes()
+        return await http.post("/api/recipes/import", content=body.encode())
+
+    result = asyncio.run(scenario()).json()
+    assert (result["inserted"], result["failed"]) == (2, 3)
+    # The duplicate on line 2 is only rejected when its batch is written, after line 3 was validated
+    assert [error["line"] for error in result["errors"]] == [2, 3, 4]
+    assert "E11000" in result["errors"][0]["detail"]
+    assert result["errors"][1]["detail"][0]["loc"] == ["servings"]
+    assert result["errors"][2]["detail"].startswith("Invalid JSON")
+
+
+def test_import_keeps_the_lowest_lines_when_errors_are_capped(app_client, monkeypatch):
+    server, http = app_client
+    monkeypatch.setattr(server, "BULK_BATCH_SIZE", 5)
+    monkeypatch.setattr(server, "BULK_MAX_REPORTED_ERRORS", 2)
+    body = "\n".join([recipe_line("First", ["egg"], id="first"), recipe_line("Again", ["egg"], id="first"),
+                      "[", "[", "["])
+
+    async def scenario():
+        await server.ensure_recipe_indexes()
+        return await http.post("/api/recipes/import", content=body.encode())
+
+    result = asyncio.run(scenario()).json()
+    assert result["failed"] == 4 and [error["line"] for error in result["errors"]] == [2, 3]
+
+
+def test_overlong_lines_are_skipped_up_to_their_newline():
+    async def chunks():
+        for chunk in (b'{"a": 1}\n' + b"x" * 6, b"x" * 20, b"xx\n", b"\n{}\n" + b"y" * 12, b"y"):
+            yield chunk
+
+    async def scenario():
+        return [entry async for entry in iter_ndjson_lines(chunks(), max_line_length=10)]
+
+    # The long line spans three chunks and the unterminated last line is also too long
+    assert asyncio.run(scenario()) == [(1, b'{"a": 1}'), (2, None), (4, b"{}"), (5, None)]
+
+
+def test_import_reports_overlong_lines(app_client, monkeypatch):
+    server, http = app_client
+    monkeypatch.setattr(server, "BULK_MAX_LINE_BYTES", 200)
+    body = "\n".join([recipe_line("Roast", ["chicken"]), recipe_line("Feast", ["rice"] * 50),
+                      recipe_line("Pancakes", ["flour"])])
+
+    result = asyncio.run(http.post("/api/recipes/import", content=body.encode())).json()
+    assert (result["inserted"], result["failed"]) == (2, 1)
+    assert result["errors"] == [{"line": 2, "detail": "Line longer than 200 bytes"}]
+
+
+def test_export_then_import_round_trips_and_rebuilds_derived_fields(app_client):
+    server, http = app_client
+
+    async def scenario():
+        await http.post("/api/recipes", json=json.loads(recipe_line("Roast", ["1 Chicken", "Lemons"])))
+        await http.post("/api/recipes", json=json.loads(recipe_line("Bread", ["flour", "water"])))
+        exported = (await http.get("/api/recipes/export")).content
+        originals = await server.recipes_collection.find({}, {"_id": 0}).to_list(None)
+
+        await server.recipes_collection.delete_many({})
+        result = (await http.post("/api/recipes/import", content=exported)).json()
+        imported = await server.recipes_collection.find({}, {"_id": 0}).to_list(None)
+        return exported, originals, result, imported
+
+    exported, originals, result, imported = asyncio.run(scenario())
+    lines = [json.loads(line) for line in exported.decode().splitlines()]
+    assert [line["title"] for line in lines] == ["Roast", "Bread"]
+    assert not any(field in line for line in lines for field in DERIVED_FIELDS)
+    assert result == {"inserted": 2, "failed": 0, "errors": []}
+    assert sorted(imported, key=lambda doc: doc["id"]) == sorted(originals, key=lambda doc: doc["id"])
+    for doc in imported:
+        assert {field: doc[field] for field in DERIVED_FIELDS} == derived_fields(doc["ingredients"])
@@ -0,0 +1,223 @@
+"""Read-through cache: expiry, LRU eviction, coalescing and stale refresh; materialized responses."""
+
+import asyncio
+
+import pytest
+
+from cache import (
+    HIT,
+    MISS,
+    STALE,
+    MaterializedResponse,
+    MongoCacheTier,
+    ReadThroughCache,
+    TTLCache,
+    etag_matches,
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(max_entries=2, ttl=None)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert len(cache) == 2
+
+
+def test_ttl_cache_evicts_to_stay_within_byte_budget():
+    cache = TTLCache(max_entries=10, ttl=None, max_bytes=10)
+    cache.set("a", b"1234")
+    cache.set("b", b"1234")
+    cache.get("a")
+    cache.set("c", b"1234")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1234" and cache.get("c") == b"1234"
+    cache.set("a", b"12")
+    assert cache.size == 6
+    cache.set("big", b"x" * 11)
+    assert len(cache) == 0 and cache.size == 0
+
+
+def test_clear_drops_loads_in_flight():
+    async def loader():
+        await asyncio.sleep(0.01)
+        return "old"
+
+    async def scenario():
+        cache = ReadThroughCache(TTLCache(ttl=None))
+        pending = asyncio.ensure_future(cache.get_or_load("key", loader))
+        await asyncio.sleep(0)
+        cache.clear()
+        return await pending, cache.local.get("key")
+
+    assert asyncio.run(scenario()) == (("old", MISS), None)
+
+
+def test_concurrent_misses_share_one_load():
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def scenario():
+        cache = ReadThroughCache(TTLCache(ttl=60))
+        results = await asyncio.gather(*[cache.get_or_load("key", loader) for _ in range(10)])
+        again = await cache.get_or_load("key", loader)
+        return cache, results, again
+
+    cache, results, again = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert results == [("value", MISS)] * 10
+    assert again == ("value", HIT)
+    assert cache.stats.coalesced == 9
+
+
+def test_stale_value_is_served_while_refreshing():
+    clock = Clock()
+    versions = iter(["v1", "v2"])
+
+    async def loader():
+        return next(versions)
+
+    async def scenario():
+        cache = ReadThroughCache(TTLCache(ttl=10, stale_ttl=100, clock=clock))
+        first = await cache.get_or_load("key", loader)
+        clock.now += 50
+        stale = await cache.get_or_load("key", loader)
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        refreshed = await cache.get_or_load("key", loader)
+        clock.now += 500
+        expired_lookup = cache.local.lookup("key")
+        return first, stale, refreshed, expired_lookup
+
+    first, stale, refreshed, expired_lookup = asyncio.run(scenario())
+    assert first == ("v1", MISS)
+    assert stale == ("v1", STALE)
+    assert refreshed == ("v2", HIT)
+    assert expired_lookup[0] is None
+
+
+def test_failed_loads_are_not_cached():
+    attempts = []
+
+    async def loader():
+        attempts.append(1)
+        raise RuntimeError("upstream down")
+
+    async def scenario():
+        cache = ReadThroughCache(TTLCache(ttl=60))
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                await cache.get_or_load("key", loader)
+
+    asyncio.run(scenario())
+    assert len(attempts) == 2
+
+
+def test_shared_tier_serves_other_workers():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+
+    async def scenario():
+        collection = mongomock_motor.AsyncMongoMockClient()["cache"]["entries"]
+        writer = ReadThroughCache(TTLCache(ttl=60), shared=MongoCacheTier(collection, retention=60))
+        reader = ReadThroughCache(TTLCache(ttl=60), shared=MongoCacheTier(collection, retention=60))
+
+        async def loader():
+            return {"videos": ["abc"]}
+
+        async def unexpected():
+            raise AssertionError("should come from the shared tier")
+
+        await writer.get_or_load("search:butter chicken", loader)
+        return await reader.get_or_load("search:butter chicken", unexpected), reader.stats.shared_hits
+
+    (value, status), shared_hits = asyncio.run(scenario())
+    assert value == {"videos": ["abc"]} and status == HIT
+    assert shared_hits == 1
+
+
+def test_invalidate_drops_both_tiers_and_in_flight_loads():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    versions = iter(["before write", "after write"])
+
+    async def loader():
+        await asyncio.sleep(0.01)
+        return next(versions)
+
+    async def scenario():
+        collection = mongomock_motor.AsyncMongoMockClient()["cache"]["entries"]
+        cache = ReadThroughCache(TTLCache(ttl=60), shared=MongoCacheTier(collection, retention=60))
+        pending = asyncio.ensure_future(cache.get_or_load("recipe:1", loader))
+        await asyncio.sleep(0)
+        await cache.invalidate("recipe:1")
+        overtaken = await pending
+        shared_after_race = await cache.shared.get("recipe:1")
+        reloaded = await cache.get_or_load("recipe:1", loader)
+        await cache.invalidate("recipe:1")
+        return overtaken, shared_after_race, reloaded, await cache.shared.get("recipe:1")
+
+    overtaken, shared_after_race, reloaded, shared_after_invalidate = asyncio.run(scenario())
+    assert overtaken == ("before write", MISS)
+    assert shared_after_race is None
+    assert reloaded == ("after write", MISS)
+    assert shared_after_invalidate is None
+
+def test_materialized_response_renders_once_until_invalidated():
+    renders = []
+
+    async def render():
+        renders.append(1)
+        await asyncio.sleep(0.01)
+        return f"body-{len(renders)}".encode()
+
+    async def scenario():
+        response = MaterializedResponse(render)
+        first = await asyncio.gather(*[response.get() for _ in range(5)])
+        hit = await response.get()
+        response.invalidate()
+        rebuilt = await response.get()
+        return first, hit, rebuilt
+
+    first, hit, rebuilt = asyncio.run(scenario())
+    assert len(renders) == 2
+    assert {result[0] for result in first} == {b"body-1"} and first[0][2] == MISS
+    assert hit[:2] == first[0][:2] and hit[2] == HIT
+    assert rebuilt[0] == b"body-2" and rebuilt[1] != hit[1]
+
+
+def test_render_overtaken_by_a_write_is_not_kept():
+    versions = iter([b"old", b"new"])
+
+    async def render():
+        await asyncio.sleep(0.01)
+        return next(versions)
+
+    async def scenario():
+        response = MaterializedResponse(render)
+        pending = asyncio.ensure_future(response.get())
+        await asyncio.sleep(0)
+        response.invalidate()
+        return (await pending)[0], (await response.get())[0]
+
+    assert asyncio.run(scenario()) == (b"old", b"new")
+
+
+def test_etag_matches_if_none_match_lists_and_weak_tags():
+    assert etag_matches('"a", W/"b"', '"b"')
+    assert etag_matches("*", '"b"')
+    assert not etag_matches('"a"', '"b"')
+    assert not etag_matches(None, '"b"')
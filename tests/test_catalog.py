@@ -0,0 +1,216 @@
+"""Live recipe indexes: lazy loading, reloads by age, and writes made outside this worker."""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from catalog import LiveIndex, scan_collection
+from matching import IngredientIndex
+from tests.conftest import recipe_payload, stored_recipe
+
+
+def test_index_older_than_max_age_is_refreshed_in_the_background():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    now = [0.0]
+    scanning = []
+
+    async def held_scan(collection, index):
+        await scan_collection(collection, index)
+        if scanning:
+            scanning[0].set()
+            await scanning[1].wait()
+
+    live = LiveIndex(IngredientIndex, load=held_scan, clock=lambda: now[0])
+
+    async def scenario():
+        collection = mongomock_motor.AsyncMongoMockClient()["recipecore_test"]["recipes"]
+        await collection.insert_one(stored_recipe("first", ["egg"]))
+        loaded = await live.get(collection, max_age=10)
+        await collection.insert_one(stored_recipe("second", ["egg"]))
+        now[0] = 5
+        cached = await live.get(collection, max_age=10)
+        unbounded = await live.get(collection)
+        now[0] = 10
+        scanning.extend([asyncio.Event(), asyncio.Event()])
+        # Expired: still answered from the loaded index while one refresh runs
+        expired = await live.get(collection, max_age=10)
+        refreshing = live.refreshing
+        assert await live.get(collection, max_age=10) is loaded and live.refreshing is refreshing
+        # A write applied while the refresh reads the collection is replayed onto the new index
+        await scanning[0].wait()
+        live.upsert(stored_recipe("third", ["egg"]))
+        scanning[1].set()
+        await refreshing
+        return loaded, cached, unbounded, expired, await live.get(collection, max_age=10)
+
+    loaded, cached, unbounded, expired, refreshed = asyncio.run(scenario())
+    assert loaded is cached is unbounded is expired
+    assert refreshed is not loaded and refreshed.recipe_ids() == ["first", "second", "third"]
+    assert live.loaded_at == 10
+
+
+def suggested_ids(http, max_results):
+    async def request():
+        response = await http.post("/api/recipes/suggestions",
+                                   json={"available_ingredients": ["chicken"], "max_results": max_results})
+        return [suggestion["recipe"]["id"] for suggestion in response.json()["suggestions"]]
+    return request()
+
+
+def test_change_stream_writes_from_other_workers_reach_the_index(app_client):
+    server, http = app_client
+
+    async def scenario():
+        collection = server.recipes_collection
+        local = stored_recipe("local", ["chicken"])
+        await collection.insert_one(local)
+        # As the watcher does when the stream opens
+        await server.recipe_keys.get(collection)
+        before = await suggested_ids(http, 5)
+        index = server.ingredient_index.index
+
+        # Written by another worker: this one only hears about it from the change stream
+        elsewhere = stored_recipe("elsewhere", ["chicken", "rice"])
+        await collection.insert_one(elsewhere)
+        await server.apply_recipe_change({"operationType": "insert", "fullDocument": elsewhere})
+        after_insert = await suggested_ids(http, 6)
+
+        await collection.delete_one({"id": "local"})
+        await server.apply_recipe_change({"operationType": "delete", "documentKey": {"_id": local["_id"]}})
+        after_delete = await suggested_ids(http, 7)
+        # Deletes are applied to the loaded indexes, not by reloading them
+        same_index = server.ingredient_index.index is index
+        return before, after_insert, after_delete, same_index
+
+    before, after_insert, after_delete, same_index = asyncio.run(scenario())
+    assert before == ["local"]
+    assert after_insert == ["local", "elsewhere"]
+    assert after_delete == ["elsewhere"]
+    assert same_index
+
+
+def test_own_deletes_reported_by_the_change_stream_are_not_applied_twice(app_client):
+    server, http = app_client
+
+    async def scenario():
+        collection = server.recipes_collection
+        created = (await http.post("/api/recipes", json=recipe_payload("Soup", ["leek"]))).json()
+        await server.recipe_keys.get(collection)
+        stored = await collection.find_one({"id": created["id"]})
+        index = await server.current_index(server.ingredient_index)
+        search = await server.current_index(server.search_index)
+
+        await http.delete(f"/api/recipes/{created['id']}")
+        await server.apply_recipe_change({"operationType": "delete", "documentKey": {"_id": stored["_id"]}})
+        return index, search
+
+    index, search = asyncio.run(scenario())
+    assert server.ingredient_index.index is index and server.search_index.index is search
+    assert len(index) == 0 and len(server.recipe_keys.index) == 0
+
+
+def test_index_is_refreshed_by_age_without_a_change_stream(app_client, monkeypatch):
+    server, http = app_client
+    monkeypatch.setattr(server, "INDEX_RELOAD_TTL", 0)
+
+    async def scenario():
+        await server.recipes_collection.insert_one(stored_recipe("local", ["chicken"]))
+        before = await suggested_ids(http, 5)
+        await server.recipes_collection.insert_one(stored_recipe("elsewhere", ["chicken"]))
+        during = await suggested_ids(http, 6)
+        await server.ingredient_index.refreshing
+        return before, during, await suggested_ids(http, 7)
+
+    before, during, after = asyncio.run(scenario())
+    assert before == during == ["local"] and after == ["local", "elsewhere"]
+
+
+def test_change_stream_keeps_cached_recipes_current(app_client):
+    server, http = app_client
+
+    async def scenario():
+        collection = server.recipes_collection
+        soup = {**stored_recipe("soup", ["leek"]), "updated_at": datetime(2024, 1, 1)}
+        await collection.insert_one(soup)
+        await server.recipe_keys.get(collection)
+        first = await http.get("/api/recipes/soup")
+
+        # Another worker edits, then deletes, the recipe this worker has cached
+        edited = await collection.find_one_and_update(
+            {"id": "soup"}, {"$set": {"title": "Leek soup", "updated_at": datetime(2024, 2, 1)}},
+            projection={"_id": 0}, return_document=True)
+        await server.apply_recipe_change({"operationType": "update", "fullDocument": edited})
+        after_update = await http.get("/api/recipes/soup")
+        await collection.delete_one({"id": "soup"})
+        await server.apply_recipe_change({"operationType": "delete", "documentKey": {"_id": soup["_id"]}})
+        after_delete = await http.get("/api/recipes/soup")
+        return first, after_update, after_delete
+
+    first, after_update, after_delete = asyncio.run(scenario())
+    assert first.json()["title"] == "Soup"
+    assert after_update.json()["title"] == "Leek soup" and after_update.headers["ETag"] != first.headers["ETag"]
+    assert after_delete.status_code == 404
+
+
+def test_cached_suggestions_follow_writes_from_other_workers(app_client, monkeypatch):
+    server, http = app_client
+
+    async def scenario():
+        collection = server.recipes_collection
+        await collection.insert_one(stored_recipe("local", ["chicken"]))
+        before = await suggested_ids(http, 5)
+        elsewhere = stored_recipe("elsewhere", ["chicken"])
+        await collection.insert_one(elsewhere)
+        await server.apply_recipe_change({"operationType": "insert", "fullDocument": elsewhere})
+        after_event = await suggested_ids(http, 5)
+
+        # Without a change stream the cached body expires after SUGGESTION_CACHE_TTL instead
+        monkeypatch.setattr(server, "INDEX_RELOAD_TTL", 0)
+        monkeypatch.setattr(server.suggestion_cache.local, "ttl", 0)
+        await collection.insert_one(stored_recipe("third", ["chicken"]))
+        await suggested_ids(http, 5)
+        await server.ingredient_index.refreshing
+        return before, after_event, await suggested_ids(http, 5)
+
+    before, after_event, after_ttl = asyncio.run(scenario())
+    assert before == ["local"]
+    assert after_event == ["local", "elsewhere"]
+    assert after_ttl == ["local", "elsewhere", "third"]
+
+
+class EmptyCursor:
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        raise StopAsyncIteration
+
+
+def test_open_change_stream_lifts_the_suggestion_ttl(app_client, monkeypatch):
+    server, _ = app_client
+    ttls = []
+
+    class Stream:
+        def watch(self, **kwargs):
+            return self
+
+        def find(self, *args):
+            return EmptyCursor()
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc_info):
+            return False
+
+        def __aiter__(self):
+            return self
+
+        async def __anext__(self):
+            ttls.append(server.suggestion_cache.local.ttl)
+            raise StopAsyncIteration
+
+    monkeypatch.setattr(server, "recipes_collection", Stream())
+    asyncio.run(server.watch_recipe_changes())
+    assert ttls == [None] and server.suggestion_cache.local.ttl == server.SUGGESTION_CACHE_TTL
@@ -0,0 +1,58 @@
+"""Recipe fragments: same bytes as the models, cached per recipe version."""
+
+from datetime import datetime, timezone
+from typing import List, Optional
+
+import orjson
+from pydantic import BaseModel
+
+from encoding import FragmentCache, JSONResponse, json_array, json_object
+
+
+class Card(BaseModel):
+    id: str
+    title: str
+    tags: List[str] = []
+    rating: Optional[float] = None
+    updated_at: datetime
+
+
+def stored_card(**fields) -> dict:
+    return {"_id": "object-id", "id": "card-1", "title": "Crème brûlée \"classic\"", "tags": ["dessert"],
+            "rating": 4.5, "updated_at": datetime(2024, 5, 1, 12, 30, 0, 123000), **fields}
+
+
+def test_fragments_match_the_model_encoding():
+    cache = FragmentCache()
+    for doc in (stored_card(), stored_card(updated_at=datetime(2024, 5, 1, tzinfo=timezone.utc)),
+                {"id": "card-2", "title": "Legacy", "updated_at": datetime(2023, 1, 1)}):
+        assert cache.encode(Card, doc) == Card.model_validate(doc).model_dump_json().encode()
+
+
+def test_fragments_are_reused_until_updated_at_changes():
+    cache = FragmentCache()
+    first = cache.encode(Card, stored_card())
+    assert cache.encode(Card, stored_card(title="Ignored while updated_at is unchanged")) is first
+    edited = cache.encode(Card, stored_card(title="Edited", updated_at=datetime(2024, 6, 1)))
+    assert orjson.loads(edited)["title"] == "Edited"
+    assert (cache.stats.hits, cache.stats.misses) == (1, 2)
+
+
+def test_invalidated_or_migrated_recipes_are_encoded_again():
+    cache = FragmentCache()
+    first = cache.encode(Card, stored_card())
+    # An import or a tool can rewrite a recipe and keep its updated_at
+    cache.invalidate("card-1")
+    rewritten = cache.encode(Card, stored_card(title="Rewritten"))
+    assert orjson.loads(rewritten)["title"] == "Rewritten" and rewritten is not first
+    assert cache.encode(Card, stored_card(title="Rewritten")) is rewritten
+    migrated = cache.encode(Card, stored_card(title="Migrated", derived_version=2))
+    assert orjson.loads(migrated)["title"] == "Migrated"
+    assert (cache.stats.hits, cache.stats.misses) == (1, 3)
+
+
+def test_assembled_bodies_are_valid_json():
+    cache = FragmentCache()
+    body = json_object([("cards", json_array([cache.encode(Card, stored_card())])), ("next", b"null")])
+    assert orjson.loads(body) == {"cards": [Card.model_validate(stored_card()).model_dump(mode="json")], "next": None}
+    assert JSONResponse({"at": datetime(2024, 1, 1, tzinfo=timezone.utc)}).body == b'{"at":"2024-01-01T00:00:00Z"}'
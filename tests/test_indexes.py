@@ -0,0 +1,84 @@
+"""Explain plans for the hot recipe queries must use the startup indexes.
+
+Needs a real MongoDB (``MONGO_URL``, default localhost); skipped otherwise.
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pymongo = pytest.importorskip("pymongo")
+
+import server  # noqa: E402
+from pagination import RECIPE_LIST_SORT, after_cursor, encode_cursor  # noqa: E402
+from shared_catalog import updated_since  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def collection():
+    client = pymongo.MongoClient(os.environ.get("MONGO_URL", "mongodb://localhost:27017"),
+                                 serverSelectionTimeoutMS=500)
+    try:
+        client.admin.command("ping")
+    except pymongo.errors.PyMongoError:
+        pytest.skip("MongoDB is not available")
+
+    collection = client["recipecore_index_test"]["recipes"]
+    collection.drop()
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    collection.insert_many([
+        {"id": f"recipe-{number:04d}", "title": f"Recipe {number}", "created_at": start + timedelta(minutes=number),
+         "updated_at": start + timedelta(minutes=number)}
+        for number in range(500)
+    ])
+    # The updated_at index is only created with SHARED_CATALOG_DIR set
+    for spec in [*server.RECIPE_INDEXES, server.UPDATED_AT_INDEX]:
+        collection.create_index(spec["keys"], name=spec["name"], unique=spec.get("unique", False))
+    yield collection
+    collection.drop()
+    client.close()
+
+
+def plan_stages(plan: dict):
+    """Yield ``(stage, indexName)`` for every stage of a winning plan"""
+    yield plan.get("stage"), plan.get("indexName")
+    for child_key in ("inputStage", "queryPlan"):
+        if child_key in plan:
+            yield from plan_stages(plan[child_key])
+    for child in plan.get("inputStages", []):
+        yield from plan_stages(child)
+
+
+def used_indexes(cursor) -> set:
+    winning_plan = cursor.explain()["queryPlanner"]["winningPlan"]
+    stages = list(plan_stages(winning_plan))
+    assert "COLLSCAN" not in {stage for stage, _ in stages}
+    return {index_name for stage, index_name in stages if stage == "IXSCAN"}
+
+
+def test_id_lookup_uses_unique_index(collection):
+    assert used_indexes(collection.find({"id": "recipe-0042"}).limit(1)) == {"id_unique"}
+
+
+def test_listing_and_keyset_page_use_created_at_index(collection):
+    assert used_indexes(collection.find({}).sort(RECIPE_LIST_SORT).limit(20)) == {"created_at_id"}
+
+    last = list(collection.find({}).sort(RECIPE_LIST_SORT).limit(20))[-1]
+    page = collection.find(after_cursor(encode_cursor(last))).sort(RECIPE_LIST_SORT).limit(20)
+    assert used_indexes(page) == {"created_at_id"}
+    assert [doc["id"] for doc in page.clone()][0] == "recipe-0479"
+
+
+def test_id_index_is_unique(collection):
+    with pytest.raises(pymongo.errors.DuplicateKeyError):
+        collection.insert_one({"id": "recipe-0001", "created_at": datetime.now(timezone.utc)})
+
+
+def test_shared_catalog_catch_up_uses_updated_at_index(collection):
+    class Catalog:
+        as_of = datetime(2024, 1, 1, 8, tzinfo=timezone.utc).timestamp()
+
+    cursor = collection.find(updated_since(Catalog), {"_id": 0, "id": 1, "updated_at": 1})
+    assert used_indexes(cursor) == {"updated_at"}
+    assert len(list(cursor.clone())) == 500 - 8 * 60
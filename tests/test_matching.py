@@ -0,0 +1,139 @@
+"""Differential tests for the automaton-based ingredient matcher."""
+
+import random
+import re
+from typing import List
+
+import pytest
+
+from matching import IngredientIndex, IngredientMatcher, calculate_recipe_match, pantry_key, top_matches
+
+
+def legacy_normalize_ingredient(ingredient: str) -> str:
+    ingredient = re.sub(r'\d+(?:\.\d+)?\s*(?:cups?|tbsp|tsp|oz|lbs?|g|kg|ml|l|cloves?|pieces?|slices?)', '', ingredient, flags=re.IGNORECASE)
+    ingredient = re.sub(r'\([^)]*\)', '', ingredient)
+    ingredient = re.sub(r'\b(?:fresh|dried|chopped|minced|diced|sliced|grated|to taste|optional)\b', '', ingredient, flags=re.IGNORECASE)
+    ingredient = re.sub(r'[,.]', '', ingredient)
+    return ingredient.strip().lower()
+
+
+def legacy_calculate_recipe_match(recipe_ingredients: List[str], available_ingredients: List[str]) -> tuple:
+    """The original pairwise substring implementation, kept as the oracle"""
+    normalized_recipe_ingredients = [legacy_normalize_ingredient(ing) for ing in recipe_ingredients]
+    normalized_available = [legacy_normalize_ingredient(ing) for ing in available_ingredients]
+
+    matching_ingredients = []
+    missing_ingredients = []
+    for recipe_ing, original_recipe_ing in zip(normalized_recipe_ingredients, recipe_ingredients):
+        found_match = False
+        for available_ing in normalized_available:
+            if (recipe_ing in available_ing) or (available_ing in recipe_ing) or (recipe_ing == available_ing):
+                matching_ingredients.append(original_recipe_ing)
+                found_match = True
+                break
+        if not found_match:
+            missing_ingredients.append(original_recipe_ing)
+
+    if len(normalized_recipe_ingredients) == 0:
+        match_score = 0.0
+    else:
+        match_score = len(matching_ingredients) / len(normalized_recipe_ingredients)
+    return match_score, matching_ingredients, missing_ingredients
+
+
+# A tiny alphabet makes overlapping substrings in both directions common
+FRAGMENTS = ["a", "b", "ab", "ba", "aab", "egg", "eggplant", "pea", "peanut", " ", "oil",
+             "olive oil", "2 cups ", "1 tbsp ", "(diced)", "fresh ", ",", ".", "Chicken", "chicken breast"]
+
+
+def random_ingredient(rng: random.Random) -> str:
+    return "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 4)))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_calculate_recipe_match_agrees_with_pairwise_scan(seed):
+    rng = random.Random(seed)
+    for _ in range(250):
+        recipe = [random_ingredient(rng) for _ in range(rng.randint(0, 8))]
+        available = [random_ingredient(rng) for _ in range(rng.randint(0, 6))]
+        assert calculate_recipe_match(recipe, available) == legacy_calculate_recipe_match(recipe, available)
+
+
+def legacy_rank(collection: dict, available_ingredients: List[str], max_results):
+    """The original suggestion ranking: score every recipe in collection order, keep >= 0.2, stable sort, slice"""
+    scored = []
+    for recipe_id, ingredients in collection.items():
+        match_score, _, _ = legacy_calculate_recipe_match(ingredients, available_ingredients)
+        if match_score >= 0.2:
+            scored.append((recipe_id, match_score))
+    scored.sort(key=lambda entry: entry[1], reverse=True)
+    return scored[:max_results]
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_top_matches_ranks_like_the_full_scan(seed):
+    rng = random.Random(seed)
+    index = IngredientIndex()
+    # Stands in for the collection: updates keep a recipe's place, re-inserts go to the end
+    collection = {}
+    for step in range(300):
+        recipe_id = f"recipe-{rng.randrange(60)}"
+        if rng.random() < 0.15:
+            index.remove(recipe_id)
+            collection.pop(recipe_id, None)
+        else:
+            ingredients = [random_ingredient(rng) for _ in range(rng.randint(0, 6))]
+            index.add(recipe_id, ingredients)
+            collection[recipe_id] = ingredients
+
+        if step % 10 == 0:
+            available = [random_ingredient(rng) for _ in range(rng.randint(1, 4))]
+            for max_results in (None, 0, 1, 3, 5, 100, -1, -3):
+                assert top_matches(index, available, max_results) == legacy_rank(collection, available, max_results)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_views_keep_ranking_the_index_as_it_was(seed):
+    rng = random.Random(seed)
+    index = IngredientIndex()
+    collection = {}
+    views = []
+    for step in range(300):
+        recipe_id = f"recipe-{rng.randrange(40)}"
+        if rng.random() < 0.2:
+            index.remove(recipe_id)
+            collection.pop(recipe_id, None)
+        else:
+            ingredients = [random_ingredient(rng) for _ in range(rng.randint(0, 6))]
+            index.add(recipe_id, ingredients)
+            collection[recipe_id] = ingredients
+        if step % 25 == 0:
+            view = index.view()
+            assert index.view() is view and view.version == index.version
+            views.append((view, dict(collection)))
+
+    for view, collection in views:
+        assert view.recipe_ids() == list(collection)
+        for _ in range(5):
+            available = [random_ingredient(rng) for _ in range(rng.randint(1, 4))]
+            assert top_matches(view, available, 5) == legacy_rank(collection, available, 5)
+
+
+def test_matcher_handles_both_containment_directions():
+    matcher = IngredientMatcher(["egg", "olive oil"])
+    assert matcher.matches("eggplant")
+    assert matcher.matches("oil")
+    assert matcher.matches("olive oil")
+    assert not matcher.matches("flour")
+
+
+def test_matcher_edge_cases_for_empty_names():
+    assert not IngredientMatcher([]).matches("")
+    assert IngredientMatcher(["salt"]).matches("")
+    assert IngredientMatcher([""]).matches("anything")
+
+
+def test_pantry_key_ignores_order_casing_and_repeats():
+    assert pantry_key(["Eggs", "milk", "2 cups flour"]) == pantry_key(["flour", "MILK", "eggs", "eggs"])
+    assert pantry_key(["milk", "Eggs"]) == ("eggs", "milk")
+    assert pantry_key(["milk", "eggs"]) != pantry_key(["milk"])
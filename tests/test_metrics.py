@@ -0,0 +1,101 @@
+"""Request metrics: exposition format, route-template labels, Mongo attribution and sampled profiles."""
+
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from metrics import Counter, Histogram, MetricsMiddleware, MetricsRegistry, RequestMetrics
+
+
+def make_app(profile_interval=None):
+    registry = MetricsRegistry()
+    metrics = RequestMetrics(registry)
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, metrics=metrics, profile_interval=profile_interval)
+    listener = metrics.mongo_listener()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: str):
+        # Two driver round-trips, reported the way pymongo reports them
+        for _ in range(2):
+            listener.succeeded(SimpleNamespace(command_name="find", duration_micros=1500))
+        return {"id": item_id}
+
+    @app.get("/slow")
+    async def slow():
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            pass
+        return {"done": True}
+
+    return app, registry, metrics
+
+
+def test_render_uses_prometheus_text_format():
+    registry = MetricsRegistry()
+    requests = registry.register(Counter("app_requests_total", "Requests", ("route",)))
+    latency = registry.register(Histogram("app_latency_seconds", "Latency", buckets=(0.1, 1.0)))
+    requests.inc(route='/a"b')
+    latency.observe(0.05)
+    latency.observe(0.5)
+
+    lines = registry.render().splitlines()
+    assert "# TYPE app_requests_total counter" in lines
+    assert 'app_requests_total{route="/a\\"b"} 1' in lines
+    assert 'app_latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'app_latency_seconds_bucket{le="1"} 2' in lines
+    assert 'app_latency_seconds_bucket{le="+Inf"} 2' in lines
+    assert "app_latency_seconds_count 2" in lines
+
+
+def test_requests_are_labelled_by_route_template_with_mongo_calls():
+    app, registry, metrics = make_app()
+    with TestClient(app) as client:
+        for item_id in ("a", "b", "c"):
+            assert client.get(f"/items/{item_id}").status_code == 200
+        assert client.get("/missing").status_code == 404
+
+    text = registry.render()
+    assert 'recipecore_http_requests_total{method="GET",route="/items/{item_id}",status="200"} 3' in text
+    assert 'recipecore_http_requests_total{method="GET",route="unmatched",status="404"} 1' in text
+    assert 'recipecore_http_request_mongo_calls_bucket{route="/items/{item_id}",le="2"} 3' in text
+    assert 'recipecore_mongo_commands_total{command="find",outcome="ok"} 6' in text
+    assert "recipecore_http_requests_in_flight 0" in text
+
+
+def test_mongo_events_outside_a_request_are_not_attributed():
+    registry = MetricsRegistry()
+    metrics = RequestMetrics(registry)
+
+    async def background():
+        metrics.observe_mongo("insert", 0.002, "ok")
+
+    asyncio.run(background())
+    text = registry.render()
+    assert 'recipecore_mongo_commands_total{command="insert",outcome="ok"} 1' in text
+    assert not any(line.startswith("recipecore_http_request_mongo_calls_") for line in text.splitlines())
+
+
+def test_profile_header_returns_sampled_stacks():
+    app, _, _ = make_app(profile_interval=0.001)
+    with TestClient(app) as client:
+        plain = client.get("/slow")
+        profiled = client.get("/slow", headers={"X-Profile": "1"})
+
+    assert plain.json() == {"done": True}
+    report = profiled.json()
+    assert report["status"] == 200
+    assert report["duration_ms"] >= 50
+    assert report["samples"] > 0
+    assert any("slow" in stack for stack in report["collapsed_stacks"])
+
+
+def test_profile_header_is_ignored_when_profiling_is_off():
+    app, _, _ = make_app()
+    with TestClient(app) as client:
+        response = client.get("/items/a", headers={"X-Profile": "1"})
+    assert json.loads(response.content) == {"id": "a"}
@@ -0,0 +1,67 @@
+"""Derived match data: write-time fields, backfill and index loading from stored data."""
+
+import asyncio
+
+import pytest
+
+from catalog import load_ingredient_index
+from matching import DERIVED_SCHEMA_VERSION, IngredientIndex, derived_fields, top_matches
+from migrations import backfill_derived_fields
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+def recipe(recipe_id, ingredients, **stored):
+    return {"id": recipe_id, "title": recipe_id, "ingredients": ingredients, **stored}
+
+
+def test_derived_fields_hold_normalized_names_tokens_and_count():
+    fields = derived_fields(["2 cups Flour", "fresh basil", "Olive Oil"])
+    assert fields == {
+        "normalized_ingredients": ["flour", "basil", "olive oil"],
+        "ingredient_tokens": ["basil", "flour", "oil", "olive"],
+        "ingredient_count": 3,
+        "derived_version": DERIVED_SCHEMA_VERSION,
+    }
+
+
+def test_backfill_updates_only_outdated_recipes():
+    async def scenario():
+        collection = mongomock_motor.AsyncMongoMockClient()["migrations"]["recipes"]
+        await collection.insert_many([
+            recipe("legacy", ["1 tbsp Salt"], normalized_ingredients=["1 tbsp salt"]),
+            recipe("old-version", ["Egg"], **{**derived_fields(["Egg"]), "derived_version": 0}),
+            recipe("current", ["Milk"], **derived_fields(["Milk"])),
+        ])
+        updated = await backfill_derived_fields(collection, batch_size=2)
+        again = await backfill_derived_fields(collection)
+        docs = {doc["id"]: doc async for doc in collection.find({}, {"_id": 0})}
+        return updated, again, docs
+
+    updated, again, docs = asyncio.run(scenario())
+    assert (updated, again) == (2, 0)
+    assert docs["legacy"]["normalized_ingredients"] == ["salt"]
+    assert all(doc["derived_version"] == DERIVED_SCHEMA_VERSION for doc in docs.values())
+
+
+def test_index_load_keeps_collection_order_across_outdated_recipes():
+    docs = [
+        recipe("a", ["egg", "milk"], **derived_fields(["egg", "milk"])),
+        recipe("b", ["Egg", "2 cups milk"]),
+        recipe("c", ["egg", "milk"], **derived_fields(["egg", "milk"])),
+    ]
+
+    async def scenario():
+        collection = mongomock_motor.AsyncMongoMockClient()["migrations"]["recipes"]
+        await collection.insert_many([dict(doc) for doc in docs])
+        index = IngredientIndex()
+        await load_ingredient_index(collection, index)
+        return index
+
+    index = asyncio.run(scenario())
+    reference = IngredientIndex()
+    for doc in docs:
+        reference.add(doc["id"], doc["ingredients"])
+    assert index.recipe_ids() == ["a", "b", "c"]
+    assert index.normalized("b") == ["egg", "milk"]
+    assert top_matches(index, ["egg", "milk"], 3) == top_matches(reference, ["egg", "milk"], 3)
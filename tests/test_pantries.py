@@ -0,0 +1,167 @@
+"""Saved pantries: incremental recipe matching, subscriber queues and the SSE match stream."""
+
+import asyncio
+import json
+import random
+
+import pytest
+
+from matching import calculate_recipe_match, derived_fields
+from pantries import PantryIndex, PantryNotifier
+from tests.conftest import recipe_payload
+
+NAMES = ["egg", "eggs", "milk", "flour", "sugar", "butter", "salt", "chicken", "chicken breast", "garlic",
+         "onion", "tomato", "basil", "olive oil", "rice", "cheese", "cream", "peanut", "pea", "2 cups flour"]
+
+
+def random_ingredients(rng: random.Random, most: int = 6):
+    return [rng.choice(NAMES) for _ in range(rng.randint(0, most))]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_index_matches_scoring_every_pantry(seed):
+    rng = random.Random(seed)
+    index = PantryIndex()
+    pantries = {}
+    for _ in range(120):
+        pantry_id = f"pantry-{rng.randrange(40)}"
+        if rng.random() < 0.2:
+            index.remove(pantry_id)
+            pantries.pop(pantry_id, None)
+        else:
+            pantries[pantry_id] = random_ingredients(rng, 4)
+            index.add(pantry_id, pantries[pantry_id])
+
+    for number in range(50):
+        ingredients = random_ingredients(rng)
+        recipe = {"id": f"recipe-{number}", "ingredients": ingredients}
+        if number % 2:
+            recipe.update(derived_fields(ingredients))
+        expected = []
+        for pantry_id in sorted(pantries):
+            match_score, matching, missing = calculate_recipe_match(ingredients, pantries[pantry_id])
+            if ingredients and match_score >= 0.2:
+                expected.append((pantry_id, match_score, matching, missing))
+        assert index.match(recipe) == expected
+
+
+def test_notifier_indexes_only_watched_pantries_and_drops_the_oldest_match():
+    async def scenario():
+        notifier = PantryNotifier(queue_size=2)
+        assert notifier.recipe_written({"id": "r0", "ingredients": ["egg"]}) == 0
+
+        first = notifier.subscribe({"id": "breakfast", "ingredients": ["egg", "milk"]})
+        second = notifier.subscribe({"id": "breakfast", "ingredients": ["egg", "milk"]})
+        for number in range(3):
+            notifier.recipe_written({"id": f"r{number}", "ingredients": ["egg", "flour"]})
+        notifier.unsubscribe("breakfast", second)
+        assert "breakfast" in notifier.index and notifier.subscribers == 1
+
+        notifier.update({"id": "breakfast", "ingredients": ["rice"]})
+        assert notifier.recipe_written({"id": "r3", "ingredients": ["egg"]}) == 0
+        notifier.close("breakfast")
+        return notifier, [first.get_nowait() for _ in range(first.qsize())]
+
+    notifier, received = asyncio.run(scenario())
+    # The queue held two items: r0 was dropped for r2, then r1 for the end-of-stream marker
+    assert [item[0]["id"] for item in received[:-1]] == ["r2"] and received[-1] is None
+    assert received[0][1] == ("breakfast", 0.5, ["egg"], ["flour"])
+    assert (notifier.delivered, notifier.dropped) == (6, 3)
+    assert len(notifier.index) == 0 and notifier.subscribers == 0
+
+
+def parse_events(body: str):
+    events = []
+    for message in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in message.splitlines() if not line.startswith(":"))
+        if fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_recipe_writes_are_streamed_to_saved_pantries(app_client):
+    server, http = app_client
+
+    async def scenario():
+        async with http:
+            pantry = (await http.post("/api/pantries", json={"name": "Weeknight",
+                                                            "ingredients": ["Chicken", "garlic"]})).json()
+            stream = asyncio.ensure_future(http.get(f"/api/pantries/{pantry['id']}/matches"))
+            while server.pantry_notifier.subscribers == 0:
+                await asyncio.sleep(0.01)
+
+            roast = (await http.post("/api/recipes", json=recipe_payload("Roast", ["1 chicken", "lemon"]))).json()
+            await http.post("/api/recipes", json=recipe_payload("Pancakes", ["flour", "eggs", "milk"]))
+            await http.put(f"/api/recipes/{roast['id']}", json={"ingredients": ["chicken", "garlic"]})
+            await http.put(f"/api/pantries/{pantry['id']}", json={"ingredients": ["flour"]})
+            await http.post("/api/recipes", json=recipe_payload("Bread", ["flour", "water", "salt"]))
+
+            assert (await http.delete(f"/api/pantries/{pantry['id']}")).status_code == 200
+            response = await asyncio.wait_for(stream, 5)
+            missing = await http.get("/api/pantries/unknown/matches")
+        return response, missing
+
+    response, missing = asyncio.run(scenario())
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_events(response.text)
+    assert [(event, data["recipe"]["title"], data["match_score"]) for event, data in events] == [
+        ("match", "Roast", 0.5), ("match", "Roast", 1.0), ("match", "Bread", pytest.approx(1 / 3))]
+    assert events[0][1]["matching_ingredients"] == ["1 chicken"] and "ingredients" not in events[0][1]["recipe"]
+    assert missing.status_code == 404
+    assert server.pantry_notifier.subscribers == 0
+
+
+def test_change_stream_falls_back_to_write_hooks_without_a_replica_set(app_client):
+    server, _ = app_client
+    asyncio.run(asyncio.wait_for(server.watch_recipe_changes(), 5))
+    assert server.recipe_change_stream_open is False
+
+
+class FakeChangeStream:
+    """Replays change events through ``watch()``, the way a replica set reports them"""
+
+    def __init__(self, changes, seen_open):
+        self.changes = changes
+        self.seen_open = seen_open
+
+    def watch(self, **kwargs):
+        return self
+
+    def find(self, *args):
+        # An empty collection: only the replayed changes reach the indexes
+        return FakeChangeStream([], [])
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        import server
+
+        self.seen_open.append(server.recipe_change_stream_open)
+        if not self.changes:
+            raise StopAsyncIteration
+        return self.changes.pop(0)
+
+
+def test_change_stream_notifies_pantries_for_writes_from_any_worker(app_client, monkeypatch):
+    server, _ = app_client
+    recipe = {"id": "elsewhere", "ingredients": ["chicken", "rice"], "updated_at": None}
+    changes = [{"operationType": "insert", "fullDocument": recipe},
+               {"operationType": "delete", "documentKey": {"_id": "object-id"}}]
+    seen_open = []
+    monkeypatch.setattr(server, "recipes_collection", FakeChangeStream(changes, seen_open))
+
+    async def scenario():
+        queue = server.pantry_notifier.subscribe({"id": "dinner", "ingredients": ["chicken"]})
+        await server.watch_recipe_changes()
+        return queue
+
+    queue = asyncio.run(scenario())
+    assert seen_open == [True, True, True] and server.recipe_change_stream_open is False
+    assert queue.qsize() == 1 and queue.get_nowait()[1] == ("dinner", 0.5, ["chicken"], ["rice"])
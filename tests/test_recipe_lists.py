@@ -0,0 +1,121 @@
+"""Recipe list bodies: streamed JSON and NDJSON pages, keyset cursors, and the summary view."""
+
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+from tests.conftest import stored_recipe
+
+CREATED = datetime(2024, 1, 1)
+FULL_ONLY_FIELDS = {"ingredients", "instructions", "youtube_videos"}
+
+
+def catalog(count: int):
+    return [stored_recipe(f"recipe-{number:02d}", ["chicken", f"spice {number}"], title=f"Recipe {number}",
+                          created_at=CREATED + timedelta(minutes=number), updated_at=CREATED, cuisine="Thai")
+            for number in range(count)]
+
+
+def test_streamed_pages_are_valid_json_ending_with_next_cursor(app_client, monkeypatch):
+    server, http = app_client
+    monkeypatch.setattr(server, "LIST_STREAM_THRESHOLD", 2)
+
+    async def scenario():
+        await server.recipes_collection.insert_many(catalog(7))
+        streamed = await http.get("/api/recipes", params={"limit": 3})
+        following = await http.get("/api/recipes", params={"limit": 3, "cursor": streamed.json()["next_cursor"]})
+        last = await http.get("/api/recipes", params={"limit": 3, "skip": 6})
+        buffered = await http.get("/api/recipes", params={"limit": 2})
+        return streamed, following, last, buffered
+
+    streamed, following, last, buffered = asyncio.run(scenario())
+    assert streamed.headers["content-type"] == "application/json"
+    body = json.loads(streamed.content)
+    assert list(body) == ["recipes", "next_cursor"] and streamed.content.endswith(b"}")
+    assert [recipe["id"] for recipe in body["recipes"]] == ["recipe-06", "recipe-05", "recipe-04"]
+    assert body["recipes"][0]["ingredients"] == ["chicken", "spice 6"]
+    assert [recipe["id"] for recipe in following.json()["recipes"]] == ["recipe-03", "recipe-02", "recipe-01"]
+    # A short page is the last one
+    assert last.json() == {"recipes": [last.json()["recipes"][0]], "next_cursor": None}
+    # Pages up to the threshold are not streamed and carry the same fields
+    assert [recipe["id"] for recipe in buffered.json()["recipes"]] == ["recipe-06", "recipe-05"]
+    assert buffered.json()["recipes"][0] == body["recipes"][0]
+
+
+def test_ndjson_lists_one_recipe_per_line(app_client):
+    server, http = app_client
+
+    async def scenario():
+        await server.recipes_collection.insert_many(catalog(4))
+        headers = {"Accept": "application/x-ndjson"}
+        listed = await http.get("/api/recipes", params={"limit": 3}, headers=headers)
+        summaries = await http.get("/api/recipes", params={"view": "summary"}, headers=headers)
+        searched = await http.get("/api/recipes", params={"search": "spice"}, headers=headers)
+        return listed, summaries, searched
+
+    listed, summaries, searched = asyncio.run(scenario())
+    assert listed.headers["content-type"] == "application/x-ndjson"
+    assert listed.text.endswith("\n")
+    lines = [json.loads(line) for line in listed.text.splitlines()]
+    assert [recipe["id"] for recipe in lines] == ["recipe-03", "recipe-02", "recipe-01"]
+    assert all("next_cursor" not in recipe for recipe in lines)
+    assert len(summaries.text.splitlines()) == 4
+    assert not FULL_ONLY_FIELDS & set(json.loads(summaries.text.splitlines()[0]))
+    assert len(searched.text.splitlines()) == 4
+
+
+def test_summary_views_leave_out_full_only_fields(app_client):
+    server, http = app_client
+
+    async def scenario():
+        await server.recipes_collection.insert_many(catalog(3))
+        listed = await http.get("/api/recipes", params={"view": "summary"})
+        searched = await http.get("/api/recipes", params={"view": "summary", "search": "chicken"})
+        featured = await http.get("/api/recipes/featured", params={"view": "summary"})
+        full_featured = await http.get("/api/recipes/featured")
+        suggested = await http.post("/api/recipes/suggestions", params={"view": "summary"},
+                                    json={"available_ingredients": ["chicken"]})
+        return listed, searched, featured, full_featured, suggested
+
+    listed, searched, featured, full_featured, suggested = asyncio.run(scenario())
+    summaries = (listed.json()["recipes"] + searched.json()["recipes"] + featured.json()["recipes"]
+                 + [suggestion["recipe"] for suggestion in suggested.json()["suggestions"]])
+    assert len(summaries) == 12
+    expected = {"id", "title", "description", "prep_time", "cook_time", "servings", "difficulty", "cuisine",
+                "image_url", "created_at", "updated_at"}
+    for summary in summaries:
+        assert set(summary) == expected and summary["cuisine"] == "Thai"
+    assert FULL_ONLY_FIELDS <= set(full_featured.json()["recipes"][0])
+    # The summary suggestion still reports which ingredients matched
+    assert suggested.json()["suggestions"][0]["matching_ingredients"] == ["chicken"]
+
+
+def test_cursor_pages_walk_ties_on_created_at_without_gaps_or_repeats(app_client):
+    server, http = app_client
+    # Recipes written in the same millisecond share created_at; the id breaks the tie
+    recipes = [stored_recipe(f"recipe-{number:02d}", ["egg"], created_at=CREATED, updated_at=CREATED)
+               for number in range(11)]
+    recipes += [stored_recipe(f"later-{number}", ["egg"], created_at=CREATED + timedelta(hours=1), updated_at=CREATED)
+                for number in range(3)]
+
+    async def scenario():
+        await server.recipes_collection.insert_many(recipes)
+        pages = []
+        cursor = None
+        while True:
+            params = {"limit": 4, **({"cursor": cursor} if cursor else {})}
+            body = (await http.get("/api/recipes", params=params)).json()
+            pages.append([recipe["id"] for recipe in body["recipes"]])
+            cursor = body["next_cursor"]
+            if cursor is None:
+                break
+        garbage = [(await http.get("/api/recipes", params={"cursor": token})) for token in ("not-a-cursor", "e30", "")]
+        return pages, garbage
+
+    pages, garbage = asyncio.run(scenario())
+    walked = [recipe_id for page in pages for recipe_id in page]
+    assert [len(page) for page in pages] == [4, 4, 4, 2]
+    assert walked == ["later-2", "later-1", "later-0"] + [f"recipe-{number:02d}" for number in range(10, -1, -1)]
+    # "e30" is base64 for {}: well-formed JSON, but no cursor fields; "" means no cursor at all
+    assert [response.status_code for response in garbage] == [400, 400, 200]
+    assert garbage[0].json() == {"detail": "Invalid cursor"}
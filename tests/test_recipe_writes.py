@@ -0,0 +1,43 @@
+"""Recipe writes: the create and update responses are the document as stored and as later read."""
+
+import asyncio
+from datetime import datetime, timezone
+
+from matching import DERIVED_FIELDS, derived_fields
+from tests.conftest import recipe_payload
+
+
+def as_json(stored: dict, model) -> dict:
+    """A stored document in the API's JSON form: the model's fields, naive datetimes as UTC"""
+    return model.model_validate(stored).model_dump(mode="json")
+
+
+def test_write_responses_match_the_stored_document_and_a_later_read(app_client):
+    server, http = app_client
+
+    async def scenario():
+        created = await http.post("/api/recipes", json=recipe_payload("Roast", ["1 Chicken", "Lemons"]))
+        recipe_id = created.json()["id"]
+        after_create = await server.recipes_collection.find_one({"id": recipe_id}, {"_id": 0})
+        read_after_create = await http.get(f"/api/recipes/{recipe_id}")
+
+        updated = await http.put(f"/api/recipes/{recipe_id}", json={"ingredients": ["2 Chickens", "thyme"]})
+        after_update = await server.recipes_collection.find_one({"id": recipe_id}, {"_id": 0})
+        read_after_update = await http.get(f"/api/recipes/{recipe_id}")
+        return created, after_create, read_after_create, updated, after_update, read_after_update
+
+    created, after_create, read_after_create, updated, after_update, read_after_update = asyncio.run(scenario())
+    assert created.status_code == 200 and updated.status_code == 200
+    assert created.json() == as_json(after_create, server.Recipe) == read_after_create.json()
+    assert updated.json() == as_json(after_update, server.Recipe) == read_after_update.json()
+
+    # updated_at moved on, at the millisecond precision Mongo keeps, and created_at did not
+    assert updated.json()["created_at"] == created.json()["created_at"]
+    assert updated.json()["updated_at"] >= created.json()["updated_at"]
+    for stored in (after_create, after_update):
+        assert isinstance(stored["updated_at"], datetime) and stored["updated_at"].microsecond % 1000 == 0
+        assert stored["updated_at"].tzinfo in (None, timezone.utc)
+    # The derived fields are stored for the ingredients the response reports
+    assert {field: after_create[field] for field in DERIVED_FIELDS} == derived_fields(created.json()["ingredients"])
+    assert {field: after_update[field] for field in DERIVED_FIELDS} == derived_fields(["2 Chickens", "thyme"])
+    assert updated.json()["ingredients"] == ["2 Chickens", "thyme"]
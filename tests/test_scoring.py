@@ -0,0 +1,193 @@
+"""Scoring pool: admission control, deadlines, snapshots, and an event loop left free for other requests."""
+
+import asyncio
+import itertools
+import statistics
+import threading
+import time
+
+import pytest
+
+from matching import IngredientIndex, top_matches
+from scoring import DeadlineExceeded, Overloaded, ScoringPool
+from tests.conftest import stored_recipe
+
+PANTRIES = [(["chicken", "garlic"], 5), (["flour", "eggs", "milk"], None), (["basil"], 0)]
+
+
+def make_index() -> IngredientIndex:
+    index = IngredientIndex()
+    index.add("pasta", ["pasta", "garlic", "basil", "olive oil"])
+    index.add("pancakes", ["flour", "eggs", "milk", "sugar"])
+    index.add("roast", ["chicken", "garlic", "lemon"])
+    return index
+
+
+@pytest.mark.parametrize("mode", ["thread", "process"])
+def test_pool_ranks_like_the_inline_scorer(mode):
+    index = make_index()
+    pool = ScoringPool(mode, workers=2, split_threshold=2)
+    try:
+        ranked = asyncio.run(pool.rank(index, PANTRIES, top_matches))
+        # A write after the first call must reach the workers with the next snapshot
+        index.add("garlic bread", ["bread", "garlic", "butter"])
+        ranked_after_write = asyncio.run(pool.rank(index, PANTRIES, top_matches))
+    finally:
+        pool.shutdown()
+
+    assert ranked == [top_matches(make_index(), available, limit) for available, limit in PANTRIES]
+    assert ranked_after_write == [top_matches(index, available, limit) for available, limit in PANTRIES]
+
+
+def test_thread_pool_fans_large_batches_out_to_processes():
+    index = make_index()
+    pool = ScoringPool("thread", workers=2, split_threshold=len(PANTRIES))
+    try:
+        single = asyncio.run(pool.rank(index, PANTRIES[:1], top_matches))
+        assert set(pool._executors) == {"thread"}
+        batch = asyncio.run(pool.rank(index, PANTRIES, top_matches))
+        assert set(pool._executors) == {"thread", "process"}
+    finally:
+        pool.shutdown()
+
+    assert single + batch[1:] == [top_matches(index, available, limit) for available, limit in PANTRIES]
+
+
+@pytest.mark.parametrize("mode", ["thread", "process"])
+def test_snapshot_is_reused_until_the_index_changes(mode):
+    index = make_index()
+    pool = ScoringPool(mode)
+    token, snapshot = pool.snapshot(index)
+    assert pool.snapshot(index)[0] == token
+    index.remove("roast")
+    new_token, new_snapshot = pool.snapshot(index)
+    assert new_token != token
+    if mode == "thread":
+        # Threads read the live index's containers instead of a rebuilt copy
+        assert isinstance(snapshot, IngredientIndex) and snapshot._postings is not index._postings
+        assert "roast" in snapshot and "roast" not in new_snapshot
+        assert new_snapshot._postings is index._postings
+    else:
+        assert "roast" in snapshot[0] and "roast" not in new_snapshot[0]
+
+
+def test_full_queue_is_rejected_without_waiting():
+    release = threading.Event()
+
+    def blocked(index, available, max_results):
+        release.wait(5)
+        return []
+
+    async def scenario():
+        pool = ScoringPool(workers=1, max_queue=1, retry_after=2)
+        running = [asyncio.ensure_future(pool.rank(make_index(), PANTRIES[:1], blocked)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        started = time.perf_counter()
+        with pytest.raises(Overloaded) as rejected:
+            await pool.rank(make_index(), PANTRIES[:1], blocked)
+        waited = time.perf_counter() - started
+        release.set()
+        await asyncio.gather(*running)
+        pool.shutdown()
+        return rejected.value, waited, pool
+
+    error, waited, pool = asyncio.run(scenario())
+    assert error.retry_after == 2
+    assert waited < 0.05
+    assert pool.rejected == 1 and pool.admitted == 0
+
+
+def test_slow_scoring_misses_its_deadline():
+    def slow(index, available, max_results):
+        time.sleep(0.3)
+        return []
+
+    pool = ScoringPool(workers=1, timeout=0.05)
+    started = time.perf_counter()
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(pool.rank(make_index(), PANTRIES[:1], slow))
+    pool.shutdown()
+    assert time.perf_counter() - started < 0.25
+    assert pool.timed_out == 1 and pool.admitted == 0
+
+
+def recipe_doc(number: int, ingredients) -> dict:
+    return stored_recipe(f"recipe-{number}", ingredients, title=f"Recipe {number}")
+
+
+def slow_top_matches(index, available, max_results):
+    # Stands in for a large catalog: pure-Python work that holds the GIL
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        pass
+    return top_matches(index, available, max_results)
+
+
+def test_health_latency_stays_flat_under_suggestion_load(app_client, monkeypatch):
+    server, http = app_client
+    collection = server.recipes_collection
+    monkeypatch.setitem(server.SUGGESTION_ENGINES, "python", slow_top_matches)
+    monkeypatch.setattr(server, "scoring_pool", ScoringPool("thread", workers=2, max_queue=64, timeout=30))
+
+    async def health_latencies(count):
+        latencies = []
+        for _ in range(count):
+            started = time.perf_counter()
+            response = await http.get("/api/health")
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 200
+            await asyncio.sleep(0.005)
+        return latencies
+
+    async def suggestion_load(worker, stop):
+        # A distinct pantry per request, so every one is scored rather than served from the cache
+        for number in itertools.count():
+            if stop.is_set():
+                return
+            pantry = ["chicken", "garlic", f"pepper {worker}-{number}"]
+            response = await http.post("/api/recipes/suggestions", json={"available_ingredients": pantry})
+            assert response.status_code == 200
+
+    async def scenario():
+        await collection.insert_many([recipe_doc(number, ["chicken", "garlic", f"spice {number}"])
+                                      for number in range(50)])
+        async with http:
+            idle = await health_latencies(40)
+            stop = asyncio.Event()
+            load = [asyncio.ensure_future(suggestion_load(worker, stop)) for worker in range(8)]
+            await asyncio.sleep(0.1)
+            loaded = await health_latencies(40)
+            stop.set()
+            await asyncio.gather(*load)
+        server.scoring_pool.shutdown()
+        return idle, loaded
+
+    idle, loaded = asyncio.run(scenario())
+    # Inline scoring would hold every health check behind several 50ms scoring runs. The bounds are
+    # relative to the unloaded baseline, with margins well below one run, since the scoring threads
+    # still contend for the interpreter and shared CI machines add their own jitter
+    def p95(latencies):
+        return statistics.quantiles(latencies, n=20)[-1]
+
+    assert statistics.median(loaded) < statistics.median(idle) * 3 + 0.025
+    assert p95(loaded) < p95(idle) * 3 + 0.045
+
+
+def test_overloaded_suggestions_get_503_with_retry_after(app_client, monkeypatch):
+    server, http = app_client
+    collection = server.recipes_collection
+    pool = ScoringPool(workers=1, max_queue=0)
+    pool.admitted = pool.capacity
+    monkeypatch.setattr(server, "scoring_pool", pool)
+
+    async def scenario():
+        await collection.insert_one(recipe_doc(1, ["chicken"]))
+        async with http:
+            single = await http.post("/api/recipes/suggestions", json={"available_ingredients": ["chicken"]})
+            batch = await http.post("/api/recipes/suggestions/batch", json=[{"available_ingredients": ["chicken"]}])
+        return single, batch
+
+    single, batch = asyncio.run(scenario())
+    for response in (single, batch):
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == str(server.SUGGESTION_RETRY_AFTER)
@@ -0,0 +1,133 @@
+"""Recipe search: token and prefix matching, weighted ranking, and the ``search`` list parameter."""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from search import SearchIndex
+from tests.conftest import stored_recipe
+
+CREATED = datetime(2024, 1, 1)
+
+
+def recipe(recipe_id, title, description="", ingredients=(), cuisine=None, age=0):
+    doc = {"id": recipe_id, "title": title, "description": description, "ingredients": list(ingredients),
+           "created_at": CREATED - timedelta(days=age)}
+    if cuisine is not None:
+        doc["cuisine"] = cuisine
+    return doc
+
+
+def build_index(*docs) -> SearchIndex:
+    index = SearchIndex()
+    for doc in docs:
+        index.add_document(doc)
+    return index
+
+
+def test_query_words_match_whole_terms_or_prefixes():
+    index = build_index(recipe("roast", "Roast chicken", ingredients=["1 chicken", "lemon"]),
+                        recipe("pie", "Chickpea pie", ingredients=["chickpeas"]),
+                        recipe("soup", "Leek soup", "No chicken stock needed"))
+    assert set(index.search("chick")[0]) == {"roast", "pie", "soup"}
+    assert index.search("chicken")[0] == ["roast", "soup"]
+    assert index.search("icken") == ([], 0)
+
+
+def test_short_words_only_match_whole_terms():
+    index = build_index(recipe("pie", "Pie"), recipe("pea", "Pea soup"), recipe("egg", "Egg fried rice"))
+    assert index.search("pi") == ([], 0)
+    assert index.search("pie") == (["pie"], 1)
+    assert index.search("e") == ([], 0)
+    assert index.search("egg")[0] == ["egg"]
+
+
+def test_pages_match_a_full_sort():
+    index = build_index(*[recipe(f"soup-{number}", "Soup" + " soup" * (number % 4), age=number % 7)
+                          for number in range(40)])
+    ranked, total = index.search("soup")
+    assert total == 40 and len(ranked) == 40
+    for skip, limit in ((0, 5), (3, 10), (35, 10), (40, 5)):
+        assert index.search("soup", skip=skip, limit=limit) == (ranked[skip:skip + limit], 40)
+
+
+def test_every_query_word_must_match():
+    index = build_index(recipe("roast", "Roast chicken", ingredients=["lemon"]),
+                        recipe("tart", "Lemon tart", ingredients=["butter"]))
+    assert index.search("lemon")[1] == 2
+    assert index.search("chicken lemon") == (["roast"], 1)
+    assert index.search("chicken butter") == ([], 0)
+
+
+def test_title_outranks_ingredients_and_cuisine_outranks_description():
+    index = build_index(recipe("in-description", "Stew", "Mild, with a little curry"),
+                        recipe("in-ingredients", "Stew", ingredients=["curry paste"]),
+                        recipe("in-title", "Curry"))
+    assert index.search("curry")[0] == ["in-title", "in-ingredients", "in-description"]
+
+    index = build_index(recipe("in-description", "Stew", "Thai inspired"), recipe("in-cuisine", "Stew", cuisine="Thai"))
+    assert index.search("thai")[0] == ["in-cuisine", "in-description"]
+
+
+def test_exact_words_outrank_prefixes_and_ties_go_to_the_newest():
+    index = build_index(recipe("prefix", "Peanut noodles"),
+                        recipe("old", "Pea soup", age=3),
+                        recipe("new", "Pea soup", age=1))
+    ids, total = index.search("pea")
+    assert ids == ["new", "old", "prefix"] and total == 3
+    assert index.search("pea", skip=1, limit=1) == (["old"], 3)
+
+
+def test_removed_and_readded_recipes_are_searched_as_they_are_now():
+    index = build_index(recipe("dish", "Fish tacos"), recipe("other", "Fish pie"))
+    index.remove("dish")
+    index.remove("unknown")
+    assert index.search("tacos") == ([], 0) and len(index) == 1
+
+    index.add_document(recipe("dish", "Beef tacos"))
+    index.add_document(recipe("other", "Cottage pie"))
+    assert index.search("tacos")[0] == ["dish"]
+    assert index.search("fish") == ([], 0)
+    assert index.search("pie")[0] == ["other"]
+
+
+@pytest.mark.parametrize("query", ["c++", "(", "[a-z]*", ".*", "\\", "?", "$^"])
+def test_regex_metacharacters_are_plain_text(query):
+    index = build_index(recipe("cpp", "C++ cookies"), recipe("other", "Anything (really)"))
+    ids, total = index.search(query)
+    assert total == len(ids)
+    if query == "c++":
+        assert ids == ["cpp"]
+    else:
+        assert ids == []
+
+
+def stored_search_recipe(recipe_id, title, ingredients, age):
+    return stored_recipe(recipe_id, ingredients, title=title, created_at=CREATED - timedelta(days=age),
+                         updated_at=CREATED)
+
+
+def test_recipe_list_search_parameter(app_client):
+    server, http = app_client
+
+    async def scenario():
+        await server.recipes_collection.insert_many([
+            stored_search_recipe("roast", "Roast chicken", ["chicken", "lemon"], age=2),
+            stored_search_recipe("salad", "Chicken salad", ["chicken", "lettuce"], age=1),
+            stored_search_recipe("tart", "Lemon tart", ["lemon", "butter"], age=0),
+        ])
+        pages = {}
+        for query in ("chick", "chicken lemon", "lemon", "c++", "(", "nothing"):
+            response = await http.get("/api/recipes", params={"search": query})
+            pages[query] = [found["id"] for found in response.json()["recipes"]]
+        paged = await http.get("/api/recipes", params={"search": "chicken", "skip": 1, "limit": 1})
+        summary = await http.get("/api/recipes", params={"search": "tart", "view": "summary"})
+        return pages, paged.json()["recipes"], summary.json()["recipes"]
+
+    pages, paged, summary = asyncio.run(scenario())
+    # "c++" is the word "c", too short to be taken as a prefix of "chicken"; "(" has no words at all
+    assert pages == {"chick": ["salad", "roast"], "chicken lemon": ["roast"], "lemon": ["tart", "roast"],
+                     "c++": [], "(": [], "nothing": []}
+    assert [found["id"] for found in paged] == ["roast"]
+    assert summary[0]["id"] == "tart" and "instructions" not in summary[0]
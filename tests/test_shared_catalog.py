@@ -0,0 +1,207 @@
+"""Shared catalog files: round trip, local overlay, version swaps and multi-worker publishing."""
+
+import asyncio
+import os
+import pickle
+import random
+import time
+from datetime import datetime
+
+import pytest
+
+from catalog import LiveIndex
+from matching import IngredientIndex, IngredientMatcher, normalize_ingredients, top_matches
+from scoring import ScoringPool
+from shared_catalog import MappedCatalog, SharedCatalogStore, SharedIngredientIndex, write_catalog
+from tests.conftest import stored_recipe
+from vector_scoring import IncidenceMatrix, vector_top_matches
+
+NAMES = ["egg", "eggs", "milk", "flour", "sugar", "butter", "salt", "chicken", "chicken breast", "garlic",
+         "onion", "tomato", "basil", "olive oil", "rice", "cheese", "cream", "peanut", "pea", "crème fraîche"]
+
+
+def random_ingredients(rng: random.Random):
+    return [rng.choice(NAMES) for _ in range(rng.randint(0, 6))]
+
+
+def build_pair(tmp_path, rng: random.Random, count: int = 60):
+    """A plain index and a shared index mapped from a file holding the same recipes"""
+    plain = IngredientIndex()
+    for number in range(count):
+        plain.add(f"recipe-{number}", random_ingredients(rng))
+    recipe_ids = plain.recipe_ids()
+    path = str(tmp_path / "catalog.bin")
+    write_catalog(path, recipe_ids, [plain.normalized(recipe_id) for recipe_id in recipe_ids], 1, time.time())
+    return plain, SharedIngredientIndex(MappedCatalog(path))
+
+
+def assert_same(plain, shared, rng: random.Random):
+    assert len(shared) == len(plain)
+    assert shared.recipe_ids() == plain.recipe_ids()
+    for recipe_id in plain.recipe_ids():
+        assert recipe_id in shared
+        assert shared.normalized(recipe_id) == plain.normalized(recipe_id)
+    for _ in range(20):
+        pantry = rng.sample(NAMES, rng.randint(1, 4))
+        matcher = IngredientMatcher(normalize_ingredients(pantry))
+        assert shared.candidates(matcher) == plain.candidates(matcher)
+        assert top_matches(shared, pantry, 5) == top_matches(plain, pantry, 5)
+        assert vector_top_matches(shared, pantry, None) == vector_top_matches(plain, pantry, None)
+
+
+def test_mapped_catalog_round_trips_the_index(tmp_path):
+    rng = random.Random(1)
+    plain, shared = build_pair(tmp_path, rng)
+    catalog = shared.catalog
+    assert catalog.version == 1 and shared.pristine
+    assert catalog.row("recipe-7") == 7 and catalog.row("missing") is None
+    assert list(catalog.recipe_ids[:3]) == ["recipe-0", "recipe-1", "recipe-2"]
+    assert_same(plain, shared, rng)
+    # The numpy engine scores the file's arrays without copying them
+    matrix = IncidenceMatrix(shared)
+    assert matrix.indices.base is not None and not matrix.indices.flags.writeable
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_local_writes_match_the_plain_index(tmp_path, seed):
+    rng = random.Random(seed)
+    plain, shared = build_pair(tmp_path, rng)
+    next_number = 60
+    for _ in range(80):
+        action = rng.random()
+        if action < 0.35:
+            recipe_id, next_number = f"recipe-{next_number}", next_number + 1
+        else:
+            recipe_id = f"recipe-{rng.randrange(next_number)}"
+        if action < 0.75:
+            ingredients = random_ingredients(rng)
+            plain.add(recipe_id, ingredients)
+            shared.add(recipe_id, ingredients)
+        else:
+            plain.remove(recipe_id)
+            shared.remove(recipe_id)
+    assert not shared.pristine
+    assert_same(plain, shared, rng)
+    assert_same(plain, pickle.loads(pickle.dumps(shared.frozen())), rng)
+
+
+def test_rebase_keeps_only_changes_newer_than_the_scan(tmp_path):
+    path = str(tmp_path / "catalog.bin")
+    write_catalog(path, ["a", "b"], [["egg"], ["milk"]], 1, time.time() - 60)
+    shared = SharedIngredientIndex(MappedCatalog(path))
+    shared.add("c", ["flour"])
+    shared.remove("a")
+    shared._changes["c"] = (time.time() - 30, ["flour"])
+
+    # The next file was scanned after "c" was written but before "a" was deleted
+    newer = str(tmp_path / "catalog-2.bin")
+    write_catalog(newer, ["a", "b", "c"], [["egg"], ["milk"], ["flour"]], 2, time.time() - 20)
+    version = shared.version
+    shared.rebase(MappedCatalog(newer))
+
+    assert shared.version > version
+    assert shared.recipe_ids() == ["b", "c"]
+    assert shared.order("c") == 2 and "a" not in shared
+
+
+def test_scoring_pool_workers_map_the_shared_file(tmp_path):
+    rng = random.Random(3)
+    plain, shared = build_pair(tmp_path, rng)
+    shared.add("recipe-extra", ["egg", "milk"])
+    plain.add("recipe-extra", ["egg", "milk"])
+    pantries = [(["egg", "milk"], 5), (["chicken", "garlic"], None)]
+    pool = ScoringPool("process", workers=1)
+    try:
+        ranked = asyncio.run(pool.rank(shared, pantries, top_matches))
+    finally:
+        pool.shutdown()
+    assert ranked == [top_matches(plain, available, limit) for available, limit in pantries]
+
+
+def test_store_publishes_versions_and_swaps_the_pointer(tmp_path):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+
+    async def scenario():
+        collection = mongomock_motor.AsyncMongoMockClient()["recipecore_test"]["recipes"]
+        await collection.insert_many([{"id": f"recipe-{number}", "ingredients": ["egg", f"spice {number}"]}
+                                      for number in range(5)])
+        store = SharedCatalogStore(str(tmp_path / "catalog"), keep=2)
+        assert store.open_current() is None and store.pointer_stamp() is None
+
+        # First worker: nothing published yet, so it scans and publishes version 1
+        first = SharedIngredientIndex()
+        await store.load(collection, first)
+        stamp = store.pointer_stamp()
+
+        # Second worker maps the same file without a full scan
+        second = SharedIngredientIndex()
+        await store.load(collection, second)
+
+        # A recent publish already covers writes made before its scan started
+        skipped = await store.publish(collection, newer_than=time.time() - 60)
+        await collection.insert_one({"id": "recipe-new", "ingredients": ["milk"]})
+        published = await store.publish(collection, newer_than=time.time())
+        await store.publish(collection, newer_than=time.time())
+        return store, first, second, stamp, skipped, published
+
+    store, first, second, stamp, skipped, published = asyncio.run(scenario())
+    assert first.catalog.version == second.catalog.version == skipped.version == 1
+    assert first.catalog.path == second.catalog.path and len(second) == 5
+    assert published.version == 2 and "recipe-new" not in first
+    assert store.pointer_stamp() != stamp and store.open_current().version == 3
+    assert sorted(name for name in os.listdir(store.directory) if name.endswith(".bin")) == [
+        "catalog-00000002.bin", "catalog-00000003.bin"]
+
+    first.rebase(store.open_current())
+    assert "recipe-new" in first and len(first) == 6
+
+
+def test_load_rescans_when_recipes_were_deleted_since_the_file(tmp_path):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+
+    async def scenario():
+        collection = mongomock_motor.AsyncMongoMockClient()["recipecore_test"]["recipes"]
+        await collection.insert_many([{"id": f"recipe-{number}", "ingredients": ["egg"]} for number in range(3)])
+        store = SharedCatalogStore(str(tmp_path / "catalog"))
+        await store.load(collection, SharedIngredientIndex())
+        await collection.delete_one({"id": "recipe-1"})
+
+        restarted = SharedIngredientIndex()
+        await store.load(collection, restarted)
+        return restarted
+
+    restarted = asyncio.run(scenario())
+    assert restarted.catalog.version == 2
+    assert restarted.recipe_ids() == ["recipe-0", "recipe-2"]
+
+
+def test_suggestions_drop_rows_deleted_behind_an_equal_count(tmp_path, app_client, monkeypatch):
+    server, http = app_client
+    store = SharedCatalogStore(str(tmp_path / "catalog"))
+
+    def recipe(number):
+        ingredients = ["egg", "milk"] if number != 1 else ["egg"]
+        return stored_recipe(f"recipe-{number}", ingredients, title=f"Recipe {number}",
+                             created_at=datetime(2024, 1, 1), updated_at=datetime(2024, 1, 1))
+
+    async def scenario():
+        collection = server.recipes_collection
+        await collection.insert_many([recipe(number) for number in range(3)])
+        await store.load(collection, SharedIngredientIndex())
+
+        # One recipe is deleted and an exported one imported with its old updated_at:
+        # the catch-up scan skips the import, and the count the file is checked against is unchanged
+        await collection.delete_one({"id": "recipe-1"})
+        await collection.insert_one(recipe(3))
+        live = LiveIndex(SharedIngredientIndex, load=store.load)
+        monkeypatch.setattr(server, "ingredient_index", live)
+        stale = (await live.get(collection)).recipe_ids()
+
+        response = await http.post("/api/recipes/suggestions", json={"available_ingredients": ["egg"], "max_results": 2})
+        return stale, [suggestion["recipe"]["id"] for suggestion in response.json()["suggestions"]], live.index
+
+    stale, suggested, index = asyncio.run(scenario())
+    assert stale == ["recipe-0", "recipe-1", "recipe-2"]
+    # recipe-1 ranks first (all of its ingredients match) but is gone, so the pantry is ranked again without it
+    assert suggested == ["recipe-0", "recipe-2"]
+    assert "recipe-1" not in index
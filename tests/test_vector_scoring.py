@@ -0,0 +1,45 @@
+"""The numpy engine must rank exactly like the Python reference scorer."""
+
+import random
+
+import pytest
+
+from matching import IngredientIndex, top_matches
+from vector_scoring import vector_top_matches
+
+PANTRY = ["egg", "eggs", "milk", "2 cups flour", "sugar", "butter", "salt", "chicken",
+          "chicken breast", "garlic (minced)", "olive oil", "oil", "rice", "pea", "peanut",
+          "eggplant", "fresh basil", "tomato", ""]
+
+
+def build_index(rng: random.Random, size: int) -> IngredientIndex:
+    index = IngredientIndex()
+    for number in range(size):
+        index.add(f"recipe-{number}", rng.choices(PANTRY, k=rng.randint(0, 7)))
+    # Exercise in-place updates and removals as well as fresh inserts
+    for number in rng.sample(range(size), size // 10):
+        if number % 2:
+            index.remove(f"recipe-{number}")
+        else:
+            index.add(f"recipe-{number}", rng.choices(PANTRY, k=rng.randint(1, 5)))
+    return index
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_numpy_engine_agrees_with_python_engine(seed):
+    rng = random.Random(seed)
+    index = build_index(rng, 400)
+    for _ in range(50):
+        available = rng.sample(PANTRY, rng.randint(1, 4))
+        max_results = rng.choice([None, 0, 1, 5, 20, 1000])
+        assert vector_top_matches(index, available, max_results) == top_matches(index, available, max_results)
+
+
+def test_numpy_engine_sees_index_updates():
+    index = IngredientIndex()
+    index.add("a", ["egg", "flour"])
+    assert vector_top_matches(index, ["egg"], 5) == [("a", 0.5)]
+
+    index.add("b", ["egg"])
+    index.remove("a")
+    assert vector_top_matches(index, ["egg"], 5) == [("b", 1.0)]
@@ -0,0 +1,157 @@
+"""YouTube client behaviour against an in-process fake of the Data API."""
+
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from youtube import VideoBatcher, YouTubeClient
+
+
+def snippet(video_id: str) -> dict:
+    return {
+        "title": f"Video {video_id}",
+        "channelTitle": "Test Kitchen",
+        "thumbnails": {"medium": {"url": f"https://img.example/{video_id}.jpg"}},
+    }
+
+
+class FakeYouTube:
+    """Minimal stand-in for the ``search`` and ``videos`` resources"""
+
+    def __init__(self, videos=("abc", "def")):
+        self.videos = {video_id: "PT5M" for video_id in videos}
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.delay = 0.0
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        self.calls.append(request)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            if request.url.params.get("key") != "test-key":
+                return httpx.Response(403, json={"error": "bad key"})
+            if request.url.path.endswith("/search"):
+                items = [{"id": {"videoId": video_id}, "snippet": snippet(video_id)} for video_id in self.videos]
+                return httpx.Response(200, json={"items": items})
+            if request.url.path.endswith("/videos"):
+                ids = request.url.params["id"].split(",")
+                items = [
+                    {"id": video_id, "snippet": snippet(video_id), "contentDetails": {"duration": self.videos[video_id]}}
+                    for video_id in ids if video_id in self.videos
+                ]
+                return httpx.Response(200, json={"items": items})
+            return httpx.Response(404)
+        finally:
+            self.in_flight -= 1
+
+    def client(self, **kwargs) -> YouTubeClient:
+        return YouTubeClient("test-key", base_url="http://youtube.test/v3",
+                             transport=httpx.MockTransport(self.handler), **kwargs)
+
+
+def test_search_and_video_details():
+    fake = FakeYouTube()
+
+    async def scenario():
+        client = fake.client()
+        videos = await client.search_videos("butter chicken recipe", 2)
+        video = await client.video_details("abc")
+        await client.aclose()
+        return videos, video
+
+    videos, video = asyncio.run(scenario())
+    assert [v.video_id for v in videos] == ["abc", "def"]
+    assert video.duration == "PT5M"
+    assert fake.calls[0].url.path == "/v3/search"
+
+
+def test_missing_video_is_404_and_upstream_failures_are_500():
+    fake = FakeYouTube()
+
+    def failing(request):
+        raise httpx.ConnectError("connection refused", request=request)
+
+    async def scenario():
+        client = fake.client()
+        with pytest.raises(HTTPException) as missing:
+            await client.video_details("nope")
+        forbidden = YouTubeClient("wrong-key", base_url="http://youtube.test/v3",
+                                  transport=httpx.MockTransport(fake.handler))
+        with pytest.raises(HTTPException) as rejected:
+            await forbidden.search_videos("soup")
+        broken = YouTubeClient("test-key", transport=httpx.MockTransport(failing))
+        with pytest.raises(HTTPException) as unreachable:
+            await broken.search_videos("soup")
+        unconfigured = YouTubeClient(None)
+        with pytest.raises(HTTPException) as no_key:
+            await unconfigured.search_videos("soup")
+        return missing.value, rejected.value, unreachable.value, no_key.value
+
+    missing, rejected, unreachable, no_key = asyncio.run(scenario())
+    assert missing.status_code == 404
+    assert rejected.status_code == 500
+    assert unreachable.status_code == 500 and "YouTube API error" in unreachable.detail
+    assert no_key.detail == "YouTube API key not configured"
+
+
+def test_upstream_concurrency_is_bounded():
+    fake = FakeYouTube()
+    fake.delay = 0.01
+
+    async def scenario():
+        client = fake.client(max_concurrency=3)
+        await asyncio.gather(*[client.video_details("abc") for _ in range(12)])
+        await client.aclose()
+
+    asyncio.run(scenario())
+    assert len(fake.calls) == 12
+    assert fake.max_in_flight == 3
+
+
+def test_batcher_groups_ids_into_fifty_per_call():
+    fake = FakeYouTube(videos=[f"v{number}" for number in range(120)])
+
+    async def scenario():
+        batcher = VideoBatcher(fake.client())
+        return await batcher.get_many([f"v{number}" for number in range(120)] + ["unknown", "v0"])
+
+    videos = asyncio.run(scenario())
+    assert len(videos) == 120 and "unknown" not in videos
+    assert sorted(len(call.url.params["id"].split(",")) for call in fake.calls) == [21, 50, 50]
+
+
+def test_batcher_combines_concurrent_callers():
+    fake = FakeYouTube(videos=["a", "b", "c"])
+
+    async def scenario():
+        batcher = VideoBatcher(fake.client(), window=0.01)
+        single, many = await asyncio.gather(batcher.get_one("a"), batcher.get_many(["b", "c", "a"]))
+        with pytest.raises(HTTPException) as missing:
+            await batcher.get_one("zzz")
+        return single, many, missing.value
+
+    single, many, missing = asyncio.run(scenario())
+    assert single.video_id == "a" and sorted(many) == ["a", "b", "c"]
+    assert missing.status_code == 404
+    # One combined request for a/b/c, one for the unknown id
+    assert [call.url.params["id"] for call in fake.calls] == ["a,b,c", "zzz"]
+
+
+def test_search_results_get_durations_in_one_round_trip():
+    fake = FakeYouTube(videos=["abc", "def", "ghi"])
+    fake.videos["def"] = "PT12M"
+
+    async def scenario():
+        client = fake.client()
+        videos = await client.search_videos("pasta")
+        return await VideoBatcher(client).fill_durations(videos)
+
+    videos = asyncio.run(scenario())
+    assert [video.duration for video in videos] == ["PT5M", "PT12M", "PT5M"]
+    assert [call.url.path for call in fake.calls] == ["/v3/search", "/v3/videos"]